@@ -0,0 +1,72 @@
+"""
+Бенчмарк макетов DOCX/PDF: число абзацев, время генерации и размер файла
+
+Запуск из корня репозитория:
+    python -m benchmarks.document_layout --segments 2000
+
+Макет segments - метка времени, спикер и текст отдельными абзацами для
+каждого сегмента, speakers - абзац на реплику спикера со встроенными метками.
+"""
+import argparse
+import time
+
+from src.config.settings import PROCESSING_CONFIG
+from src.services.subtitle_generator import SubtitleGenerator, DOCX_AVAILABLE, PDF_AVAILABLE
+from src.utils.speaker_paragraphs import iter_speaker_paragraphs
+from benchmarks.fixtures import make_segments
+
+LAYOUTS = ("segments", "speakers")
+
+
+def paragraph_count(segments, format_type: str, layout: str) -> int:
+    """Абзацев (flowables в PDF) на сегменты транскрипции"""
+    if layout == "speakers":
+        # Подпись спикера - начало абзаца реплики (в PDF - маркер того же абзаца)
+        return sum(1 for _ in iter_speaker_paragraphs(segments, PROCESSING_CONFIG['paragraph_max_chars']))
+    return sum(3 if segment.get('speaker') is not None else 2 for segment in segments)
+
+
+def best_time(func, repeats: int):
+    """Лучшее время из repeats запусков (мс) и результат последнего"""
+    best = float("inf")
+    result = None
+    for _ in range(repeats):
+        started_at = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - started_at)
+    return best * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--segments", nargs="+", type=int, default=[2000])
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    renderers = []
+    if DOCX_AVAILABLE:
+        renderers.append(("docx", SubtitleGenerator.render_docx))
+    if PDF_AVAILABLE:
+        renderers.append(("pdf", SubtitleGenerator.render_pdf))
+    if not renderers:
+        print("❌ python-docx и reportlab не установлены")
+        return
+
+    for count in args.segments:
+        segments = make_segments(count)
+        print(f"\n{count} сегментов")
+        print(f"{'формат':>6} | {'макет':>8} | {'абзацев':>8} | {'время, мс':>10} | {'размер, КБ':>10}")
+        print("-" * 56)
+        for format_type, render in renderers:
+            for layout in LAYOUTS:
+                elapsed_ms, content = best_time(
+                    lambda: render(segments, "bench", "bench.wav", layout=layout), args.repeats
+                )
+                print(
+                    f"{format_type:>6} | {layout:>8} | {paragraph_count(segments, format_type, layout):8d} | "
+                    f"{elapsed_ms:10.1f} | {len(content) / 1024:10.1f}"
+                )
+
+
+if __name__ == "__main__":
+    main()
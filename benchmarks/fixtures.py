@@ -0,0 +1,73 @@
+"""
+Синтетические транскрипции для бенчмарков
+
+Сегменты имеют ту же структуру, что и результат WhisperManager.transcribe_audio
+после выравнивания и диаризации: текст, время, спикер и пословные данные.
+"""
+import random
+from datetime import datetime
+from typing import List, Dict, Any
+
+from src.utils.word_columns import build_word_columns, strip_segment_words
+
+WORDS = (
+    "привет коллеги давайте обсудим итоги квартала выручка выросла на двенадцать процентов "
+    "но расходы на инфраструктуру тоже увеличились нужно пересмотреть бюджет и сроки "
+    "запуска нового продукта предлагаю перенести релиз на следующий месяц согласны "
+    "да но тогда маркетинг должен скорректировать план кампании"
+).split()
+
+
+def make_segments(count: int, words_per_segment: int = 14, speakers: int = 3, seed: int = 0) -> List[Dict[str, Any]]:
+    """Сегменты с пословным выравниванием общей длительностью около count * 5 секунд"""
+    rng = random.Random(seed)
+    segments = []
+    position = 0.0
+    speaker = 0
+
+    for _ in range(count):
+        # Спикер меняется примерно через каждые 3 сегмента
+        if rng.random() < 0.35:
+            speaker = rng.randrange(speakers)
+        speaker_name = f"SPEAKER_{speaker:02d}"
+
+        words = []
+        word_time = position
+        for _ in range(rng.randint(words_per_segment // 2, words_per_segment * 3 // 2)):
+            duration = rng.uniform(0.15, 0.6)
+            words.append({
+                "word": rng.choice(WORDS),
+                "start": round(word_time, 3),
+                "end": round(word_time + duration, 3),
+                "score": round(rng.uniform(0.5, 1.0), 3),
+                "speaker": speaker_name
+            })
+            word_time += duration + rng.uniform(0.0, 0.15)
+
+        segments.append({
+            "start": words[0]["start"],
+            "end": words[-1]["end"],
+            "text": " " + " ".join(word["word"] for word in words),
+            "speaker": speaker_name,
+            "words": words
+        })
+        position = word_time + rng.uniform(0.2, 1.5)
+
+    return segments
+
+
+def make_full_result(count: int, seed: int = 0) -> Dict[str, Any]:
+    """Полный JSON результат в формате TranscriptionProcessor.save_transcription_result"""
+    segments = make_segments(count, seed=seed)
+    now = datetime(2024, 1, 1).isoformat()
+    return {
+        "id": "benchmark",
+        "filename": "meeting.mp3",
+        "status": "completed",
+        "created_at": now,
+        "completed_at": now,
+        "segments": strip_segment_words(segments),
+        "words": build_word_columns(segments),
+        "language": "ru",
+        "s3_links": {}
+    }
@@ -0,0 +1,64 @@
+"""
+Бенчмарк полного JSON результата: размер и время разбора
+
+Запуск из корня репозитория:
+    python -m benchmarks.json_artifact --segments 2000 5000
+
+Сравниваются прежний формат (indent=2) и компактный JSON без сжатия, с gzip
+и с zstd. Время разбора включает распаковку; для компактного формата оно
+замеряется стандартным json и через src.utils.fast_json (orjson, если установлен).
+"""
+import argparse
+import gzip
+import json
+import time
+
+from src.utils import fast_json
+from benchmarks.fixtures import make_full_result
+
+
+def best_time(func, repeats: int) -> float:
+    """Лучшее время из repeats запусков, мс"""
+    best = float("inf")
+    for _ in range(repeats):
+        started_at = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started_at)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--segments", nargs="+", type=int, default=[2000, 5000])
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"JSON backend: {fast_json.JSON_BACKEND}, zstd: {'да' if fast_json.zstandard else 'нет'}")
+    for count in args.segments:
+        data = make_full_result(count)
+        legacy = json.dumps(data, ensure_ascii=False, indent=2).encode("utf-8")
+        compact = fast_json.dumps(data)
+
+        variants = [
+            ("indent=2 (прежний)", legacy, lambda: json.loads(legacy)),
+            ("компактный, json", compact, lambda: json.loads(compact)),
+            ("компактный", compact, lambda: fast_json.loads(compact)),
+        ]
+        gzipped = gzip.compress(compact, compresslevel=6)
+        variants.append(("компактный + gzip", gzipped, lambda: fast_json.loads(fast_json.decode(gzipped))))
+        if fast_json.zstandard:
+            zstd, _ = fast_json.encode(compact, "zstd")
+            variants.append(("компактный + zstd", zstd, lambda: fast_json.loads(fast_json.decode(zstd))))
+
+        print(f"\n{count} сегментов, {len(data['words']['start'])} слов")
+        print(f"{'вариант':>22} | {'размер, КБ':>10} | {'сжатие':>7} | {'разбор, мс':>10}")
+        print("-" * 60)
+        for name, content, parse in variants:
+            print(
+                f"{name:>22} | {len(content) / 1024:10.1f} | {len(legacy) / len(content):6.1f}x | "
+                f"{best_time(parse, args.repeats):10.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Бенчмарк сериализации ответа с результатом транскрипции
+
+Запуск из корня репозитория:
+    python -m benchmarks.json_response --segments 20000
+
+Сравниваются:
+    pydantic  - валидация TranscriptionResult, model_dump и json.dumps
+                (путь стандартного ответа FastAPI с response_model)
+    fast_json - словарь ответа через src.utils.fast_json (orjson, если установлен)
+    raw       - метаданные через fast_json, сегменты - заранее сериализованные
+                байты из индекса сегментов (повторный запрос того же результата)
+"""
+import argparse
+import json
+import time
+
+from src.models.schemas import TranscriptionResult
+from src.utils import fast_json
+from src.utils.segment_index import SegmentIndex
+from benchmarks.fixtures import make_segments
+
+
+def best_time(func, repeats: int):
+    """Лучшее время из repeats запусков (мс) и результат последнего"""
+    best = float("inf")
+    result = None
+    for _ in range(repeats):
+        started_at = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - started_at)
+    return best * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--segments", nargs="+", type=int, default=[20000])
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"JSON: {fast_json.JSON_BACKEND}")
+    for count in args.segments:
+        segments = make_segments(count)
+        meta = {
+            "id": "bench",
+            "filename": "bench.wav",
+            "status": "completed",
+            "created_at": "2024-01-01T00:00:00",
+            "completed_at": "2024-01-01T00:10:00",
+            "s3_links": {},
+            "error": None
+        }
+
+        def pydantic_response():
+            result = TranscriptionResult(**meta, segments=segments).model_dump(mode="json")
+            return json.dumps(result, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+        def fast_json_response():
+            return fast_json.dumps({**meta, "segments": segments})
+
+        index = SegmentIndex(segments)
+        index.source_json()
+
+        def raw_response():
+            return fast_json.dumps_with_raw(meta, "segments", index.source_json())
+
+        print(f"\n{count} сегментов")
+        print(f"{'способ':>9} | {'время, мс':>10} | {'размер, КБ':>10}")
+        print("-" * 36)
+        for name, func in (("pydantic", pydantic_response), ("fast_json", fast_json_response), ("raw", raw_response)):
+            elapsed_ms, content = best_time(func, args.repeats)
+            json.loads(content)
+            print(f"{name:>9} | {elapsed_ms:10.1f} | {len(content) / 1024:10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Бенчмарк микро-батчинга: пропускная способность в зависимости от окна ожидания
+
+Запуск из корня репозитория:
+    python -m benchmarks.microbatch_window --audio note1.wav note2.wav \
+        --model large-v3 --language ru --concurrency 8 --windows 0,25,50,100,200
+
+Для каждого окна выполняется concurrency параллельных потоков, каждый из
+которых транскрибирует файлы из --audio по кругу. Окно "direct" соответствует
+отдельному вызову model.transcribe на задачу (без микро-батчинга). Вызовы
+модели в обоих случаях идут под общей блокировкой, как в WhisperManager.
+"""
+import argparse
+import statistics
+import threading
+import time
+
+import torch
+import whisperx
+
+from src.core.micro_batcher import MicroBatcher, SAMPLE_RATE
+
+
+def run_round(transcribe, audios, concurrency: int, jobs_per_worker: int):
+    """Параллельный прогон задач, возвращает (время, задержки)"""
+    latencies = []
+    lock = threading.Lock()
+
+    def worker(worker_index):
+        for i in range(jobs_per_worker):
+            audio = audios[(worker_index + i) % len(audios)]
+            started_at = time.perf_counter()
+            transcribe(audio)
+            with lock:
+                latencies.append(time.perf_counter() - started_at)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(concurrency)]
+    started_at = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - started_at, latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--audio", nargs="+", required=True, help="Короткие аудио файлы (5-60 с)")
+    parser.add_argument("--model", default="large-v3")
+    parser.add_argument("--language", default="ru")
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--jobs-per-worker", type=int, default=4)
+    parser.add_argument("--windows", default="0,25,50,100,200", help="Окна ожидания в мс через запятую")
+    args = parser.parse_args()
+
+    # Устройство и compute_type - как в WhisperManager, без применения CPU профиля сервиса
+    device = "cuda" if torch.cuda.is_available() else "cpu"
+    compute_type = "float16" if device == "cuda" else "int8"
+    model = whisperx.load_model(args.model, device, compute_type=compute_type, language=args.language)
+    if not MicroBatcher.is_supported(model):
+        raise SystemExit("Установленная версия whisperx не поддерживается микро-батчингом")
+
+    audios = [whisperx.load_audio(path) for path in args.audio]
+    audio_seconds = sum(len(audio) for audio in audios) / SAMPLE_RATE / len(audios)
+    total_jobs = args.concurrency * args.jobs_per_worker
+
+    # Прогрев модели
+    model.transcribe(audios[0], batch_size=args.batch_size)
+
+    model_lock = threading.RLock()
+
+    def transcribe_direct(audio):
+        with model_lock:
+            return model.transcribe(audio, batch_size=args.batch_size)
+
+    rounds = [("direct", transcribe_direct, None)]
+    for window in args.windows.split(","):
+        batcher = MicroBatcher(model, model_lock, batch_size=args.batch_size, max_wait_ms=int(window))
+        rounds.append((f"{window} мс", lambda audio, b=batcher: b.transcribe(audio, args.language), batcher))
+
+    print(f"{'окно':>10} | {'задач/с':>8} | {'аудио с/с':>9} | {'p50, с':>7} | {'p95, с':>7} | {'сегм/батч':>9}")
+    print("-" * 66)
+    for name, transcribe, batcher in rounds:
+        elapsed, latencies = run_round(transcribe, audios, args.concurrency, args.jobs_per_worker)
+        latencies.sort()
+        p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+        fill = batcher.get_stats()["avg_segments_per_batch"] if batcher else 0
+        print(
+            f"{name:>10} | {total_jobs / elapsed:8.2f} | {total_jobs * audio_seconds / elapsed:9.1f} | "
+            f"{statistics.median(latencies):7.2f} | {p95:7.2f} | {fill:9.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
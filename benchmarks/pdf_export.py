@@ -0,0 +1,62 @@
+"""
+Бенчмарк генерации PDF: время на документ и пиковая память
+
+Запуск из корня репозитория:
+    python -m benchmarks.pdf_export --segments 2000
+
+Прежний вариант воспроизводится новым движком на каждый документ (поиск и
+регистрация шрифта, создание стилей) и сборкой всего story одним списком.
+Пиковая память замеряется tracemalloc в отдельном прогоне.
+"""
+import argparse
+import time
+import tracemalloc
+
+from src.services.pdf_renderer import PDF_AVAILABLE, PdfRenderer, get_pdf_renderer
+from benchmarks.fixtures import make_segments
+
+
+def measure(func, repeats: int):
+    """Лучшее время из repeats запусков (мс) и пиковая память одного запуска (МБ)"""
+    best = float("inf")
+    for _ in range(repeats):
+        started_at = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started_at)
+
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best * 1000, peak / 1024 / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--segments", nargs="+", type=int, default=[2000])
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    if not PDF_AVAILABLE:
+        print("❌ reportlab не установлен")
+        return
+
+    engine = get_pdf_renderer()
+    for count in args.segments:
+        segments = make_segments(count)
+        variants = [
+            ("прежний", lambda: PdfRenderer().render(segments, "bench", "bench.wav", chunk_segments=len(segments))),
+            ("движок", lambda: engine.render(segments, "bench", "bench.wav")),
+        ]
+
+        print(f"\n{count} сегментов")
+        print(f"{'вариант':>10} | {'время, мс':>10} | {'пик памяти, МБ':>14} | {'размер, КБ':>10}")
+        print("-" * 54)
+        for name, render in variants:
+            elapsed_ms, peak_mb = measure(render, args.repeats)
+            size_kb = len(render()) / 1024
+            print(f"{name:>10} | {elapsed_ms:10.1f} | {peak_mb:14.1f} | {size_kb:10.1f}")
+
+
+if __name__ == "__main__":
+    main()
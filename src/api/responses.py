@@ -0,0 +1,31 @@
+"""
+Классы ответов API с быстрой сериализацией JSON
+
+Стандартный JSONResponse сериализует через json.dumps, что заметно для
+ответов с десятками тысяч сегментов. FastJSONResponse использует
+src.utils.fast_json (orjson, если установлен), RawJSONResponse отдает уже
+сериализованные байты без повторной обработки.
+"""
+import json
+from typing import Any
+
+from fastapi.responses import JSONResponse, Response
+
+from ..utils import fast_json
+
+
+class FastJSONResponse(JSONResponse):
+    """JSON ответ через orjson с откатом на стандартный json"""
+
+    def render(self, content: Any) -> bytes:
+        try:
+            return fast_json.dumps(content)
+        except TypeError:
+            # Значения, которые не сериализуются напрямую (datetime без orjson, нестроковые ключи)
+            return json.dumps(content, ensure_ascii=False, separators=(",", ":"), default=str).encode("utf-8")
+
+
+class RawJSONResponse(Response):
+    """Ответ с заранее сериализованным JSON"""
+
+    media_type = "application/json"
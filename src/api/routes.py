@@ -2,6 +2,8 @@
 API роуты для транскрипции
 """
 import uuid
+import asyncio
+import mimetypes
 from pathlib import Path
 from typing import List, Optional, Dict, Any
 from datetime import datetime
@@ -9,20 +11,35 @@ import tempfile
 import shutil
 import os
 
-from fastapi import APIRouter, File, UploadFile, HTTPException, BackgroundTasks, Query, Depends
-from fastapi.responses import JSONResponse, FileResponse, RedirectResponse, StreamingResponse
+from fastapi import APIRouter, File, UploadFile, HTTPException, BackgroundTasks, Query, Depends, Header
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse, RedirectResponse, StreamingResponse, Response
+from urllib.parse import quote
 
 from ..models.schemas import (
     TranscriptionStatus, 
     TranscriptionResult, 
     TranscriptionListItem,
     TranscriptionConfig,
+    BulkStatusRequest,
     User
 )
 from ..core.transcription_processor import TranscriptionProcessor
-from ..config.settings import UPLOADS_DIR, SUPPORTED_FORMATS, SUMMARIZATION_CONFIG
+from ..config.settings import UPLOADS_DIR, SUPPORTED_FORMATS, SUMMARIZATION_CONFIG, S3_CONFIG, UPLOAD_CHUNK_SIZE, STATUS_BULK_MAX_IDS, PROCESSING_CONFIG
 from ..middleware.auth_middleware import get_current_user, get_current_user_optional  # Включено обратно
 from ..services.summarization_service import SummarizationService
+from ..services.http_client import limited
+from ..utils.event_loop_monitor import event_loop_monitor
+from ..utils.word_columns import slice_word_columns, invalidate_word_index
+from ..utils.segment_index import get_segment_index, get_segments_json, invalidate_segment_index
+from ..utils import fast_json
+from ..utils.range_response import range_file_response
+from ..utils.conditional import make_etag, quote_etag, etag_matches, is_not_modified, not_modified, http_date
+from ..services.subtitle_generator import SubtitleGenerator, MEDIA_TYPES, DOCUMENT_LAYOUTS, get_render_stats
+from ..services.render_pool import get_render_pool_stats
+from ..services.export_service import ExportService
+from ..services.task_events import task_events, FINAL_STATUSES
+from .responses import FastJSONResponse, RawJSONResponse
 import logging
 
 logger = logging.getLogger(__name__)
@@ -36,6 +53,27 @@ processor = TranscriptionProcessor()
 # Сервис суммаризации
 summarization_service = SummarizationService()
 
+# Форматы экспорта по запросу
+export_service = ExportService(processor.storage, processor.db_service)
+
+# Интервал комментариев keep-alive в потоке статуса и пауза переподключения клиента
+SSE_HEARTBEAT_INTERVAL = 15
+SSE_RETRY_MS = 3000
+
+# Поля легкого статуса (?fields=) и набор по умолчанию
+STATUS_FIELDS = (
+    'id', 'filename', 'status', 'created_at', 'completed_at', 's3_links',
+    'error', 'progress', 'progress_percent', 'updated_at'
+)
+DEFAULT_STATUS_FIELDS = ('id', 'status', 'progress', 'progress_percent', 'error')
+
+# Размер страницы сегментов по умолчанию и максимальный
+SEGMENTS_PAGE_SIZE = 200
+SEGMENTS_MAX_PAGE_SIZE = 2000
+
+# Результат завершенной задачи неизменен
+RESULT_CACHE_CONTROL = "private, max-age=31536000, immutable"
+
 
 @router.post("/upload", response_model=TranscriptionStatus)
 async def upload_file(
@@ -82,16 +120,31 @@ async def upload_file(
     # Генерируем уникальный ID
     task_id = str(uuid.uuid4())
     
-    # Сохраняем файл
+    # Сохраняем файл блоками, при необходимости одновременно загружая его на S3
     file_path = UPLOADS_DIR / f"{task_id}_{file.filename}"
     
+    archive_stream = None
+    if S3_CONFIG['stream_originals']:
+        archive_stream = await run_in_threadpool(processor.storage.open_original_stream, task_id, file.filename)
+    
     try:
         with open(file_path, "wb") as buffer:
-            content = await file.read()
-            buffer.write(content)
+            while True:
+                chunk = await file.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                buffer.write(chunk)
+                if archive_stream:
+                    await run_in_threadpool(archive_stream.write, chunk)
     except Exception as e:
+        if archive_stream:
+            await run_in_threadpool(archive_stream.abort)
         raise HTTPException(status_code=500, detail=f"Ошибка сохранения файла: {str(e)}")
     
+    if archive_stream:
+        # Сборка объекта на S3 завершается в фоне, параллельно с транскрипцией
+        processor.original_archives[task_id] = archive_stream.finish()
+    
     # Если HF токен не передан в запросе, берем из переменных окружения
     if hf_token is None and diarize:
         hf_token = os.getenv('HF_TOKEN')
@@ -108,6 +161,7 @@ async def upload_file(
     )
     
     # Инициализируем статус задачи
+    processor.task_owners[task_id] = current_user.id
     processor.update_task_status(task_id, "pending", "Задача добавлена в очередь")
     
     # Запускаем обработку в фоне с привязкой к пользователю
@@ -129,13 +183,146 @@ async def upload_file(
     )
 
 
+def _status_fields(fields: List[str]) -> List[str]:
+    """Проверка запрошенных полей легкого статуса"""
+    requested = [field.strip() for field in fields if field.strip()] or list(DEFAULT_STATUS_FIELDS)
+    unknown = [field for field in requested if field not in STATUS_FIELDS]
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Неизвестные поля: {', '.join(unknown)}. Доступны: {', '.join(STATUS_FIELDS)}; "
+                   f"сегменты - GET /transcriptions/{{id}}/result"
+        )
+    return requested
+
+
+def _task_owner(task_id: str, db_record: Optional[Dict]) -> Optional[str]:
+    """Владелец задачи: из базы или, пока задача обрабатывается, из памяти"""
+    return db_record.get('user_id') if db_record else processor.task_owners.get(task_id)
+
+
+def _task_state(task_id: str, db_record: Optional[Dict], requested: List[str], uploaded: bool) -> Optional[Dict[str, Any]]:
+    """
+    Выбранные поля статуса из памяти и базы данных, без загрузки результата
+
+    Args:
+        uploaded: Файл задачи уже принят (задача ожидает обработки)
+
+    Returns:
+        Поля статуса или None, если задача не найдена
+    """
+    current_status = processor.get_task_status(task_id)
+    
+    state: Dict[str, Any] = {"id": task_id}
+    if current_status:
+        state.update({key: current_status.get(key) for key in ("status", "progress", "progress_percent", "error", "updated_at")})
+    if db_record:
+        # Запись в базе - итоговое состояние задачи
+        state.update({
+            "filename": db_record['filename'],
+            "status": db_record['status'],
+            "created_at": db_record['created_at'],
+            "completed_at": db_record.get('completed_at'),
+            "error": db_record.get('error')
+        })
+        if "s3_links" in requested:
+            state["s3_links"] = _signed_links(db_record.get('s3_links', {}))
+    elif not current_status:
+        if not uploaded:
+            return None
+        state.update({"status": "pending", "progress": "Ожидание обработки"})
+    
+    return {field: state.get(field) for field in requested}
+
+
+def _status_projection(task_id: str, fields: str, user_id: str, if_none_match: Optional[str]) -> Response:
+    """Легкий статус с ETag: если состояние не изменилось, клиент получает 304"""
+    requested = _status_fields(fields.split(","))
+    db_record = processor.db_service.get_transcription(task_id)
+    
+    owner_id = _task_owner(task_id, db_record)
+    if owner_id and owner_id != user_id:
+        raise HTTPException(status_code=403, detail="Нет доступа к этой транскрипции")
+    
+    uploaded = db_record is not None or bool(list(UPLOADS_DIR.glob(f"{task_id}_*")))
+    state = _task_state(task_id, db_record, requested, uploaded)
+    if state is None:
+        raise HTTPException(status_code=404, detail="Задача не найдена")
+    
+    content = fast_json.dumps(state)
+    etag = make_etag(content)
+    headers = {"Cache-Control": "private, no-cache"}
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag, headers)
+    return RawJSONResponse(content=content, headers={**headers, "ETag": etag})
+
+
+@router.post("/status/bulk")
+async def get_bulk_status(
+    request: BulkStatusRequest,
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Легкий статус нескольких задач за один запрос
+
+    Записи читаются из базы одним обращением. Чужие и несуществующие задачи
+    попадают в not_found, не раскрывая, какие из них существуют.
+    """
+    task_ids = list(dict.fromkeys(request.ids))
+    if len(task_ids) > STATUS_BULK_MAX_IDS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Слишком много задач в запросе: {len(task_ids)}, максимум {STATUS_BULK_MAX_IDS}"
+        )
+    requested = _status_fields(request.fields or [])
+    
+    db_records = await run_in_threadpool(processor.db_service.get_transcriptions, task_ids)
+    
+    # Задачи, которые еще не попали ни в базу, ни в память, ищем среди принятых файлов одним проходом
+    unknown_ids = {
+        task_id for task_id in task_ids
+        if task_id not in db_records and not processor.get_task_status(task_id)
+    }
+    uploaded_ids = set()
+    if unknown_ids:
+        # Имя принятого файла - "{task_id}_{исходное имя}", ID задачи - UUID без "_"
+        uploaded_ids = unknown_ids & {path.name.partition('_')[0] for path in UPLOADS_DIR.iterdir()}
+    
+    statuses: Dict[str, Dict[str, Any]] = {}
+    not_found: List[str] = []
+    for task_id in task_ids:
+        db_record = db_records.get(task_id)
+        owner_id = _task_owner(task_id, db_record)
+        state = None
+        if not owner_id or owner_id == current_user.id:
+            uploaded = db_record is not None or task_id in uploaded_ids
+            state = _task_state(task_id, db_record, requested, uploaded)
+        if state is None:
+            not_found.append(task_id)
+        else:
+            statuses[task_id] = state
+    
+    return RawJSONResponse(
+        content=fast_json.dumps({"statuses": statuses, "not_found": not_found}),
+        headers={"Cache-Control": "private, no-cache"}
+    )
+
+
 @router.get("/status/{task_id}", response_model=TranscriptionResult)
 async def get_transcription_status(
     task_id: str,
+    fields: Optional[str] = Query(
+        None,
+        description="Поля статуса через запятую: ответ только из памяти и базы, без сегментов, с ETag"
+    ),
+    if_none_match: Optional[str] = Header(None, alias="If-None-Match"),
     current_user: User = Depends(get_current_user)
 ):
     """Получение статуса и результата транскрипции по ID"""
     
+    if fields is not None:
+        return _status_projection(task_id, fields, current_user.id, if_none_match)
+    
     # Проверяем актуальный статус из памяти
     current_status = processor.get_task_status(task_id)
     
@@ -150,27 +337,25 @@ async def get_transcription_status(
         # Результат готов, загружаем полные данные с S3 если нужны сегменты
         if db_record['status'] == 'completed':
             # Для завершенных транскрипций загружаем сегменты с S3
-            segments = []
+            segments_json = b"[]"
             if 'full_json_s3_url' in db_record:
                 try:
-                    import requests
-                    response = requests.get(db_record['full_json_s3_url'])
-                    if response.status_code == 200:
-                        full_data = response.json()
-                        segments = full_data.get('segments', [])
+                    full_data = await _load_full_transcription(db_record)
+                    segments_json = await _segments_json(task_id, full_data.get('segments', []))
                 except Exception as e:
                     print(f"⚠️ Не удалось загрузить сегменты с S3: {e}")
             
-            return TranscriptionResult(
+            # Сегменты вставляются в ответ уже сериализованными, без валидации моделью
+            result = TranscriptionResult(
                 id=db_record['id'],
                 filename=db_record['filename'],
                 status=db_record['status'],
                 created_at=db_record['created_at'],
                 completed_at=db_record.get('completed_at'),
-                s3_links=db_record.get('s3_links', {}),
-                segments=segments,
+                s3_links=_signed_links(db_record.get('s3_links', {})),
                 error=db_record.get('error')
-            )
+            ).model_dump(exclude={'segments'})
+            return RawJSONResponse(content=fast_json.dumps_with_raw(result, "segments", segments_json))
         else:
             # Для неудачных транскрипций
             return TranscriptionResult(
@@ -179,7 +364,7 @@ async def get_transcription_status(
                 status=db_record['status'],
                 created_at=db_record['created_at'],
                 error=db_record.get('error'),
-                s3_links=db_record.get('s3_links', {})
+                s3_links=_signed_links(db_record.get('s3_links', {}))
             )
     
     elif current_status:
@@ -211,6 +396,303 @@ async def get_transcription_status(
             raise HTTPException(status_code=404, detail="Задача не найдена")
 
 
+
+def _sse_event(event: str, data: Dict[str, Any]) -> bytes:
+    """Сообщение Server-Sent Events"""
+    return b"event: " + event.encode() + b"\ndata: " + fast_json.dumps(data) + b"\n\n"
+
+
+@router.get("/status/{task_id}/events")
+async def stream_transcription_status(
+    task_id: str,
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Поток изменений статуса задачи (Server-Sent Events)
+
+    Первым событием отправляется текущий статус, затем каждое изменение.
+    Поток закрывается после статуса completed или failed; результат
+    после этого запрашивается через GET /status/{task_id}.
+    """
+    db_record = processor.db_service.get_transcription(task_id)
+    owner_id = db_record.get('user_id') if db_record else processor.task_owners.get(task_id)
+    if owner_id and owner_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Нет доступа к этой транскрипции")
+
+    current_status = processor.get_task_status(task_id)
+    if not db_record and not current_status:
+        raise HTTPException(status_code=404, detail="Задача не найдена")
+
+    async def events():
+        # Подписка до чтения текущего статуса, чтобы не пропустить изменение между ними
+        queue = task_events.subscribe(task_id)
+        try:
+            latest_status = processor.get_task_status(task_id)
+            if latest_status:
+                event = {"id": task_id, **latest_status}
+            else:
+                event = {"id": task_id, "status": db_record['status'], "error": db_record.get('error')}
+
+            yield f"retry: {SSE_RETRY_MS}\n\n".encode()
+            while True:
+                if event is None:
+                    yield b": keep-alive\n\n"
+                else:
+                    yield _sse_event("status", event)
+                    if event.get("status") in FINAL_STATUSES:
+                        return
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=SSE_HEARTBEAT_INTERVAL)
+                except asyncio.TimeoutError:
+                    event = None
+        finally:
+            task_events.unsubscribe(task_id, queue)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+def _attachment_headers(download_name: str) -> Dict[str, str]:
+    """Заголовок Content-Disposition для скачивания (с поддержкой не-ASCII имен)"""
+    quoted = quote(download_name)
+    if quoted != download_name:
+        return {"Content-Disposition": f"attachment; filename*=utf-8''{quoted}"}
+    return {"Content-Disposition": f'attachment; filename="{download_name}"'}
+
+
+def _signed_links(s3_links: Dict[str, str]) -> Dict[str, str]:
+    """Подписанные ссылки на объекты S3 для ответа клиенту"""
+    return processor.storage.sign_links(s3_links or {})
+
+
+def _redirect_to_s3(url: str, download_name: Optional[str] = None) -> RedirectResponse:
+    """Редирект на подписанную ссылку с кэшированием на время ее гарантированной жизни"""
+    return RedirectResponse(
+        url=processor.storage.presigned_url(url, download_name),
+        status_code=302,
+        headers={"Cache-Control": f"private, max-age={S3_CONFIG['presign_refresh_margin']}"}
+    )
+
+
+def _completed_timestamp(db_record: Dict[str, Any]) -> Optional[float]:
+    """Время завершения задачи (Last-Modified результата)"""
+    try:
+        return datetime.fromisoformat(db_record['completed_at']).timestamp()
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def _artifact_headers(db_record: Dict[str, Any], variant: str, weak: bool = False) -> Optional[Dict[str, str]]:
+    """
+    Валидаторы и кэширование неизменного результата задачи
+
+    ETag строится из версии полного JSON (хэша результата) и варианта
+    представления. Пока версия неизвестна, валидаторы не отдаются. Слабый
+    ETag (weak) - для документов, которые при каждой генерации отличаются
+    побайтно (дата создания внутри DOCX/PDF): содержимое то же, но склеивать
+    части разных ответов по Range нельзя.
+    """
+    version = db_record.get('full_json_etag') or processor.transcript_cache.known_version(db_record['id'])
+    if not version:
+        return None
+    etag = quote_etag(f"{version}-{variant}")
+    headers = {"ETag": f"W/{etag}" if weak else etag, "Cache-Control": RESULT_CACHE_CONTROL}
+    completed_at = _completed_timestamp(db_record)
+    if completed_at is not None:
+        headers["Last-Modified"] = http_date(completed_at)
+    return headers
+
+
+def _artifact_not_modified(db_record: Dict[str, Any], variant: str, if_none_match: Optional[str],
+                           if_modified_since: Optional[str], weak: bool = False) -> Optional[Response]:
+    """Ответ 304, если у клиента уже есть этот вариант результата"""
+    headers = _artifact_headers(db_record, variant, weak)
+    if headers and is_not_modified(if_none_match, if_modified_since, headers["ETag"], _completed_timestamp(db_record)):
+        return not_modified(headers["ETag"], headers)
+    return None
+
+
+async def _load_full_transcription(db_record: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Загрузка полного JSON транскрипции (из кэша или с S3)
+    
+    Возвращаемый словарь общий для всех запросов и не должен изменяться.
+    """
+    full_json_url = db_record.get('s3_links', {}).get('full_json_s3_url') or db_record.get('full_json_s3_url')
+    if not full_json_url:
+        raise HTTPException(status_code=404, detail="Исходные данные транскрипции не найдены в S3")
+    
+    task_id = db_record['id']
+    cache = processor.transcript_cache
+    # Для записей без сохраненной версии - версия, узнанная при прошлой загрузке
+    known_etag = db_record.get('full_json_etag') or cache.known_version(task_id)
+    if known_etag:
+        db_record['full_json_etag'] = known_etag
+    
+    transcription_data = await run_in_threadpool(cache.get, task_id, known_etag)
+    if transcription_data is not None:
+        return transcription_data
+    
+    try:
+        local_path = processor.storage.local_path(full_json_url)
+        if local_path:
+            # Локальное хранилище: объект адресован по содержимому, хэш и есть его версия
+            content = await run_in_threadpool(local_path.read_bytes)
+            etag = local_path.name.partition('.')[0]
+        else:
+            # Объект читается по подписанной ссылке через общий асинхронный клиент.
+            # Байты берутся как есть: сжатый объект распаковывает кэш
+            async with limited('s3') as client:
+                async with client.stream('GET', processor.storage.presigned_url(full_json_url)) as response:
+                    response.raise_for_status()
+                    etag = response.headers.get('etag', '').strip('"')
+                    content = b"".join([chunk async for chunk in response.aiter_raw()])
+        transcription_data = await run_in_threadpool(cache.put, task_id, etag, content)
+    except Exception as e:
+        print(f"❌ Ошибка загрузки JSON с S3: {e}")
+        raise HTTPException(status_code=500, detail="Не удалось загрузить данные транскрипции с S3")
+    
+    # Версия хранится в кэше процесса, запрос на чтение базу не изменяет
+    if etag:
+        db_record['full_json_etag'] = etag
+    
+    return transcription_data
+
+
+async def _segments_json(task_id: str, segments: List[Dict[str, Any]]) -> bytes:
+    """Сегменты загруженного результата в JSON (сериализуются один раз и кэшируются с индексом)"""
+    # Построение индекса и сериализация проходят по всем сегментам - не в event loop
+    return await run_in_threadpool(get_segments_json, task_id, segments)
+
+
+@router.get("/transcriptions/{task_id}/result")
+async def get_transcription_result(
+    task_id: str,
+    if_none_match: Optional[str] = Header(None, alias="If-None-Match"),
+    if_modified_since: Optional[str] = Header(None, alias="If-Modified-Since"),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Сегменты завершенной транскрипции
+
+    Результат задачи не меняется, поэтому ответ кэшируется клиентом, а
+    повторный запрос с If-None-Match получает 304 без загрузки из хранилища.
+    """
+    db_record = processor.db_service.get_transcription(task_id)
+    
+    if not db_record:
+        raise HTTPException(status_code=404, detail="Транскрипция не найдена")
+    
+    if db_record.get('user_id') != current_user.id:
+        raise HTTPException(status_code=403, detail="Нет доступа к этой транскрипции")
+    
+    if db_record['status'] != 'completed':
+        raise HTTPException(status_code=400, detail="Транскрипция еще не завершена")
+    
+    cached = _artifact_not_modified(db_record, "result", if_none_match, if_modified_since)
+    if cached:
+        return cached
+    
+    transcription_data = await _load_full_transcription(db_record)
+    content = fast_json.dumps_with_raw({
+        "id": db_record['id'],
+        "filename": db_record['filename'],
+        "status": db_record['status'],
+        "created_at": db_record['created_at'],
+        "completed_at": db_record.get('completed_at')
+    }, "segments", await _segments_json(task_id, transcription_data.get('segments', [])))
+    
+    # Версия полного JSON известна после первой загрузки
+    headers = _artifact_headers(db_record, "result") or {"ETag": make_etag(content), "Cache-Control": RESULT_CACHE_CONTROL}
+    return RawJSONResponse(content=content, headers=headers)
+
+
+@router.get("/transcriptions/{task_id}/words", response_class=FastJSONResponse)
+async def get_transcription_words(
+    task_id: str,
+    start: Optional[float] = Query(None, ge=0, description="Начало интервала в секундах"),
+    end: Optional[float] = Query(None, ge=0, description="Конец интервала в секундах"),
+    current_user: User = Depends(get_current_user)
+):
+    """Пословные временные метки и уверенность в колоночном виде с выборкой по времени"""
+    db_record = processor.db_service.get_transcription(task_id)
+    
+    if not db_record:
+        raise HTTPException(status_code=404, detail="Транскрипция не найдена")
+    
+    if db_record.get('user_id') != current_user.id:
+        raise HTTPException(status_code=403, detail="Нет доступа к этой транскрипции")
+    
+    if db_record['status'] != 'completed':
+        raise HTTPException(status_code=400, detail="Транскрипция еще не завершена")
+    
+    transcription_data = await _load_full_transcription(db_record)
+    columns = transcription_data.get('words')
+    if not columns:
+        raise HTTPException(status_code=404, detail="Пословные данные для этой транскрипции не сохранены")
+    
+    # Индекс слов строится один раз на загруженный результат, выборка - вне event loop
+    words = await run_in_threadpool(slice_word_columns, task_id, columns, start, end)
+    return {
+        "task_id": task_id,
+        "start": start,
+        "end": end,
+        "count": len(words["start"]),
+        "words": words
+    }
+
+
+@router.get("/transcriptions/{task_id}/segments")
+async def get_transcription_segments(
+    task_id: str,
+    offset: int = Query(0, ge=0, description="Пропустить сегментов от начала выборки"),
+    limit: int = Query(SEGMENTS_PAGE_SIZE, ge=1, le=SEGMENTS_MAX_PAGE_SIZE, description="Сегментов в ответе"),
+    start: Optional[float] = Query(None, ge=0, description="Начало интервала в секундах"),
+    end: Optional[float] = Query(None, ge=0, description="Конец интервала в секундах"),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Страница сегментов транскрипции и/или сегменты, пересекающиеся с [start, end)
+
+    offset и limit отсчитываются внутри выборки по времени, если она задана.
+    """
+    db_record = processor.db_service.get_transcription(task_id)
+    
+    if not db_record:
+        raise HTTPException(status_code=404, detail="Транскрипция не найдена")
+    
+    if db_record.get('user_id') != current_user.id:
+        raise HTTPException(status_code=403, detail="Нет доступа к этой транскрипции")
+    
+    if db_record['status'] != 'completed':
+        raise HTTPException(status_code=400, detail="Транскрипция еще не завершена")
+    
+    transcription_data = await _load_full_transcription(db_record)
+    # Построение индекса - проход по всем сегментам, не выполняем его в event loop
+    index = await run_in_threadpool(get_segment_index, task_id, transcription_data.get('segments', []))
+    
+    first, selected = index.window(start, end)
+    page = selected[offset:offset + limit]
+    
+    return RawJSONResponse(
+        content=fast_json.dumps({
+            "task_id": task_id,
+            "total": len(index),
+            "matched": len(selected),
+            "offset": offset,
+            "limit": limit,
+            "start": start,
+            "end": end,
+            "first_index": first,
+            "count": len(page),
+            "segments": page
+        })
+    )
+
+
 @router.get("/transcriptions", response_model=List[TranscriptionListItem])
 async def get_all_transcriptions(
     current_user: User = Depends(get_current_user)
@@ -218,31 +700,41 @@ async def get_all_transcriptions(
     """Получение транскрипций пользователя из JSON базы данных"""
     transcriptions = processor.db_service.get_user_transcriptions(current_user.id)
     
+    # Поля записей базы уже соответствуют TranscriptionListItem: отдаем словари
+    # напрямую, минуя валидацию и повторную сериализацию списка моделью
     results = []
     for data in transcriptions:
-        list_item = TranscriptionListItem(
-            id=data.get("id"),
-            filename=data.get("filename"),
-            status=data.get("status"),
-            created_at=data.get("created_at"),
-            completed_at=data.get("completed_at"),
-            s3_links=data.get("s3_links", {}),
-            error=data.get("error"),
-            progress=data.get("progress")
-        )
-        results.append(list_item)
+        results.append({
+            "id": data.get("id"),
+            "filename": data.get("filename"),
+            "status": data.get("status"),
+            "created_at": data.get("created_at"),
+            "completed_at": data.get("completed_at"),
+            "transcript_file": None,
+            "audio_file": None,
+            "subtitle_files": None,
+            "s3_links": _signed_links(data.get("s3_links", {})),
+            "error": data.get("error"),
+            "progress": data.get("progress")
+        })
     
-    return results
+    return FastJSONResponse(results)
 
 
 @router.get("/s3-links/{task_id}")
-async def get_s3_links(task_id: str):
+async def get_s3_links(
+    task_id: str,
+    current_user: User = Depends(get_current_user)
+):
     """Получение прямых ссылок на файлы в S3 из JSON базы данных"""
     db_record = processor.db_service.get_transcription(task_id)
     
     if not db_record:
         raise HTTPException(status_code=404, detail="Транскрипция не найдена")
     
+    if _task_owner(task_id, db_record) != current_user.id:
+        raise HTTPException(status_code=403, detail="Нет доступа к этой транскрипции")
+    
     s3_links = db_record.get('s3_links', {}).copy()
     
     # Добавляем full_json_s3_url в s3_links если он есть
@@ -252,6 +744,15 @@ async def get_s3_links(task_id: str):
     if not s3_links:
         raise HTTPException(status_code=404, detail="S3 ссылки не найдены для этой транскрипции")
     
+    s3_links = _signed_links(s3_links)
+    
+    # Еще не созданные форматы скачиваются через API и генерируются при первом запросе
+    if db_record.get('status') == 'completed':
+        for format_type in SubtitleGenerator.available_formats():
+            if format_type not in s3_links:
+                route = "subtitle" if format_type in ('srt', 'vtt', 'tsv') else "transcript"
+                s3_links[format_type] = f"/api/download/{route}/{task_id}?format_type={format_type}"
+    
     return {
         "task_id": task_id,
         "filename": db_record.get("filename"),
@@ -301,8 +802,11 @@ async def delete_transcription(task_id: str):
         
         return {"message": f"Удалены локальные файлы: {', '.join(deleted_files)}"}
     
-    # Удаляем из базы данных
+    # Удаляем из базы данных и кэша
     processor.db_service.delete_transcription(task_id)
+    processor.transcript_cache.invalidate(task_id)
+    invalidate_segment_index(task_id)
+    invalidate_word_index(task_id)
     
     # Удаляем из статусов
     if task_id in processor.task_statuses:
@@ -322,7 +826,14 @@ async def health_check():
         "timestamp": datetime.now().isoformat(),
         "models_loaded": processor.whisper_manager.is_loaded,
         "active_tasks": len([s for s in processor.task_statuses.values() if s["status"] == "processing"]),
-        "supported_formats": list(SUPPORTED_FORMATS)
+        "supported_formats": list(SUPPORTED_FORMATS),
+        "microbatch": processor.whisper_manager.micro_batcher.get_stats() if processor.whisper_manager.micro_batcher else None,
+        "transcript_cache": processor.transcript_cache.get_stats(),
+        "storage": {"local": processor.storage.is_local, **processor.storage.get_stats()},
+        "export_render_times": get_render_stats(),
+        "render_pool": get_render_pool_stats(),
+        "task_events": task_events.get_stats(),
+        "event_loop_lag": event_loop_monitor.get_stats()
     }
 
 
@@ -355,20 +866,8 @@ async def create_summarization(
         if db_record['status'] != 'completed':
             raise HTTPException(status_code=400, detail="Транскрипция еще не завершена")
         
-        # Получаем JSON данные с S3
-        s3_links = db_record.get('s3_links', {})
-        full_json_url = s3_links.get('full_json_s3_url') or db_record.get('full_json_s3_url')
-        
-        if not full_json_url:
-            raise HTTPException(status_code=404, detail="JSON файл транскрипции не найден в S3")
-        
-        # Загружаем JSON с S3
-        import requests
-        response = requests.get(full_json_url)
-        if response.status_code != 200:
-            raise HTTPException(status_code=500, detail="Не удалось загрузить данные транскрипции с S3")
-        
-        transcription_data = response.json()
+        # Загружаем JSON данные с S3
+        transcription_data = await _load_full_transcription(db_record)
         
         # Создаем суммаризацию
         summary = await summarization_service.create_summary(transcription_data)
@@ -440,10 +939,17 @@ async def root():
         "endpoints": {
             "POST /upload": "Загрузка и обработка файла",
             "GET /status/{task_id}": "Статус обработки",
+            "GET /status/{task_id}?fields=": "Легкий статус без сегментов (ETag, 304)",
+            "GET /status/{task_id}/events": "Поток изменений статуса (Server-Sent Events)",
+            "POST /status/bulk": "Легкий статус нескольких задач за один запрос",
+            "GET /transcriptions/{task_id}/result": "Сегменты завершенной транскрипции (кэшируемый ответ)",
             "GET /transcriptions": "Список всех транскрипций",
             "GET /s3-links/{task_id}": "Прямые ссылки на файлы в S3",
+            "GET /transcriptions/{task_id}/segments": "Сегменты постранично (offset, limit) и по интервалу (start, end)",
+            "GET /transcriptions/{task_id}/words": "Пословные метки времени и уверенность (с выборкой по времени)",
             "GET /download/transcript/{task_id}": "Скачать транскрипт в различных форматах",
             "GET /download/subtitle/{task_id}": "Скачать субтитры",
+            "GET /files/{key}": "Файл локального хранилища по подписанной ссылке (STORAGE_BACKEND=local)",
             "DELETE /transcription/{task_id}": "Удаление транскрипции",
             "GET /health": "Проверка состояния сервера"
         }
@@ -453,13 +959,20 @@ async def root():
 @router.get("/download/transcript/{task_id}")
 async def download_transcript(
     task_id: str, 
-    format_type: str = Query(..., description="Формат файла: json, docx, pdf")
+    format_type: str = Query(..., description="Формат файла: json, docx, pdf"),
+    layout: Optional[str] = Query(None, description="Макет DOCX/PDF: segments или speakers (по умолчанию из настроек)"),
+    accept_encoding: str = Header("", alias="Accept-Encoding"),
+    if_none_match: Optional[str] = Header(None, alias="If-None-Match"),
+    if_modified_since: Optional[str] = Header(None, alias="If-Modified-Since")
 ):
     """Скачивание транскрипта в различных форматах"""
     
     # Проверяем корректность формата
     if format_type not in ['json', 'docx', 'pdf']:
         raise HTTPException(status_code=400, detail="Поддерживаемые форматы: json, docx, pdf")
+    if layout is not None and layout not in DOCUMENT_LAYOUTS:
+        raise HTTPException(status_code=400, detail=f"Поддерживаемые макеты: {', '.join(DOCUMENT_LAYOUTS)}")
+    layout = layout or PROCESSING_CONFIG['document_layout']
     
     # Получаем данные из базы
     db_record = processor.db_service.get_transcription(task_id)
@@ -481,78 +994,77 @@ async def download_transcript(
             s3_key = format_type  # 'pdf' или 'docx'
         
         # Проверяем S3 ссылки и основную запись
+        # В хранилище документы только в макете по умолчанию, другой макет генерируется
+        stored_layout = format_type == 'json' or layout == PROCESSING_CONFIG['document_layout']
         s3_url = None
-        if s3_key in s3_links:
+        if stored_layout and s3_key in s3_links:
             s3_url = s3_links[s3_key]
         elif format_type == 'json' and 'full_json_s3_url' in db_record:
             s3_url = db_record['full_json_s3_url']
         
-        # Если файл уже есть в S3, делаем редирект
+        download_name = f"{Path(db_record['filename']).stem}_{task_id}.{format_type}"
+        
+        # Сжатый JSON отдается с S3 как есть только клиентам, принимающим его кодировку
+        if s3_url and format_type == 'json':
+            stored_encoding = db_record.get('full_json_encoding', 'identity')
+            if not fast_json.accepts_encoding(accept_encoding, stored_encoding):
+                cached = _artifact_not_modified(db_record, 'json', if_none_match, if_modified_since)
+                if cached:
+                    cached.headers['Vary'] = 'Accept-Encoding'
+                    return cached
+                transcription_data = await _load_full_transcription(db_record)
+                return Response(
+                    content=await run_in_threadpool(fast_json.dumps, transcription_data),
+                    media_type='application/json',
+                    headers={
+                        **_attachment_headers(download_name),
+                        **(_artifact_headers(db_record, 'json') or {}),
+                        'Vary': 'Accept-Encoding'
+                    }
+                )
+        
+        # Если файл уже есть в S3, делаем редирект на подписанную ссылку
         if s3_url:
-            return RedirectResponse(url=s3_url, status_code=302)
+            response = _redirect_to_s3(s3_url, download_name)
+            if format_type == 'json':
+                response.headers['Vary'] = 'Accept-Encoding'
+            return response
         
         # Если файла нет в S3, генерируем его на лету (только для PDF и DOCX)
         if format_type in ['docx', 'pdf']:
-            # Загружаем полный JSON с S3
-            full_json_url = None
-            if 'full_json_s3_url' in s3_links:
-                full_json_url = s3_links['full_json_s3_url']
-            elif 'full_json_s3_url' in db_record:
-                full_json_url = db_record['full_json_s3_url']
-            
-            if not full_json_url:
-                raise HTTPException(status_code=404, detail="Исходные данные транскрипции не найдены в S3")
-            
-            import requests
-            response = requests.get(full_json_url)
-            if response.status_code != 200:
-                raise HTTPException(status_code=500, detail="Не удалось загрузить данные транскрипции с S3")
+            variant = f"{format_type}-{layout}"
+            # Документ, созданный на лету, побайтно не воспроизводим: слабый ETag, без Range
+            cached = _artifact_not_modified(db_record, variant, if_none_match, if_modified_since, weak=True)
+            if cached:
+                return cached
             
-            transcription_data = response.json()
+            # Загружаем полный JSON с S3
+            transcription_data = await _load_full_transcription(db_record)
             segments = transcription_data.get('segments', [])
             
             if not segments:
                 raise HTTPException(status_code=400, detail="Сегменты транскрипции не найдены")
             
-            # Генерируем файл
-            from ..services.subtitle_generator import SubtitleGenerator
-            
-            # Создаем временный файл
-            temp_file = None
+            # Генерируем файл в памяти, он сохраняется в хранилище для следующих запросов
             try:
-                if format_type == 'docx':
-                    temp_file = SubtitleGenerator.generate_docx(
-                        segments, task_id, db_record['filename'], temp=True
-                    )
-                elif format_type == 'pdf':
-                    temp_file = SubtitleGenerator.generate_pdf(
-                        segments, task_id, db_record['filename'], temp=True
-                    )
+                content = await export_service.render(db_record, format_type, segments, layout)
                 
-                if not temp_file or not Path(temp_file).exists():
+                if not content:
                     raise HTTPException(status_code=500, detail=f"Не удалось создать {format_type.upper()} файл")
                 
-                # Определяем MIME тип
-                media_type = {
-                    'pdf': 'application/pdf',
-                    'docx': 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'
-                }.get(format_type, 'application/octet-stream')
-                
-                # Возвращаем файл с автоматическим удалением
-                return FileResponse(
-                    path=temp_file,
-                    filename=f"{Path(db_record['filename']).stem}_{task_id}.{format_type}",
-                    media_type=media_type,
-                    background=BackgroundTasks()
+                return Response(
+                    content=content,
+                    media_type=MEDIA_TYPES[format_type],
+                    headers={
+                        **_attachment_headers(download_name),
+                        **(_artifact_headers(db_record, variant, weak=True) or {}),
+                        'Accept-Ranges': 'none'
+                    }
                 )
             
+            except HTTPException:
+                raise
             except Exception as gen_error:
-                # Удаляем временный файл при ошибке
-                if temp_file and Path(temp_file).exists():
-                    try:
-                        Path(temp_file).unlink()
-                    except:
-                        pass
                 raise HTTPException(status_code=500, detail=f"Ошибка генерации {format_type.upper()}: {str(gen_error)}")
         else:
             # Для JSON если нет в S3
@@ -568,7 +1080,9 @@ async def download_transcript(
 @router.get("/download/subtitle/{task_id}")
 async def download_subtitle(
     task_id: str, 
-    format_type: str = Query(..., description="Формат субтитров: srt, vtt, tsv")
+    format_type: str = Query(..., description="Формат субтитров: srt, vtt, tsv"),
+    if_none_match: Optional[str] = Header(None, alias="If-None-Match"),
+    if_modified_since: Optional[str] = Header(None, alias="If-Modified-Since")
 ):
     """Скачивание субтитров в различных форматах"""
     
@@ -585,68 +1099,35 @@ async def download_subtitle(
     if db_record['status'] != 'completed':
         raise HTTPException(status_code=400, detail="Транскрипция еще не завершена")
     
-    # Получаем S3 ссылки
-    s3_links = db_record.get('s3_links', {})
-    
     try:
-        # Загружаем данные с S3
-        full_json_url = None
-        if 'full_json_s3_url' in s3_links:
-            full_json_url = s3_links['full_json_s3_url']
-        elif 'full_json_s3_url' in db_record:
-            full_json_url = db_record['full_json_s3_url']
+        download_name = f"{Path(db_record['filename']).stem}_{task_id}.{format_type}"
         
-        if not full_json_url:
-            raise HTTPException(status_code=404, detail="Исходные данные транскрипции не найдены в S3")
+        # Результат неизменен: повторная загрузка того же файла получает 304
+        cached = _artifact_not_modified(db_record, format_type, if_none_match, if_modified_since)
+        if cached:
+            return cached
         
-        import requests
-        response = requests.get(full_json_url)
-        if response.status_code != 200:
-            raise HTTPException(status_code=500, detail="Не удалось загрузить данные транскрипции с S3")
+        # Уже сохраненный файл отдаем из хранилища
+        stored_url = export_service.stored_url(db_record, format_type)
+        if stored_url:
+            return _redirect_to_s3(stored_url, download_name)
         
-        transcription_data = response.json()
+        # Загружаем данные с S3
+        transcription_data = await _load_full_transcription(db_record)
         segments = transcription_data.get('segments', [])
         
         if not segments:
             raise HTTPException(status_code=400, detail="Сегменты транскрипции не найдены")
         
-        # Генерируем субтитры
-        from ..services.subtitle_generator import SubtitleGenerator
-        
-        # Создаем временный файл
-        temp_file = None
+        # Первая загрузка отдается потоком по мере генерации и сохраняется в хранилище
         try:
-            if format_type == 'srt':
-                temp_file = SubtitleGenerator.generate_srt(
-                    segments, task_id, db_record['filename'], temp=True
-                )
-            elif format_type == 'vtt':
-                temp_file = SubtitleGenerator.generate_vtt(
-                    segments, task_id, db_record['filename'], temp=True
-                )
-            elif format_type == 'tsv':
-                temp_file = SubtitleGenerator.generate_tsv(
-                    segments, task_id, db_record['filename'], temp=True
-                )
-            
-            if not temp_file or not Path(temp_file).exists():
-                raise HTTPException(status_code=500, detail=f"Не удалось создать {format_type.upper()} файл")
-            
-            # Возвращаем файл
-            return FileResponse(
-                path=temp_file,
-                filename=f"{Path(db_record['filename']).stem}_{task_id}.{format_type}",
-                media_type='text/plain; charset=utf-8',
-                background=BackgroundTasks()
+            return StreamingResponse(
+                export_service.stream(db_record, format_type, SubtitleGenerator.iter_format(format_type, segments)),
+                media_type=MEDIA_TYPES[format_type],
+                headers={**_attachment_headers(download_name), **(_artifact_headers(db_record, format_type) or {})}
             )
             
         except Exception as gen_error:
-            # Удаляем временный файл при ошибке
-            if temp_file and Path(temp_file).exists():
-                try:
-                    Path(temp_file).unlink()
-                except:
-                    pass
             raise HTTPException(status_code=500, detail=f"Ошибка генерации {format_type.upper()}: {str(gen_error)}")
     
     except HTTPException:
@@ -656,8 +1137,57 @@ async def download_subtitle(
         raise HTTPException(status_code=500, detail=f"Ошибка обработки запроса: {str(e)}")
 
 
+@router.get("/files/{object_key:path}")
+async def download_stored_file(
+    object_key: str,
+    expires: int = Query(...),
+    signature: str = Query(...),
+    download: Optional[str] = Query(None),
+    range_header: Optional[str] = Header(None, alias="Range"),
+    if_none_match: Optional[str] = Header(None, alias="If-None-Match"),
+    if_modified_since: Optional[str] = Header(None, alias="If-Modified-Since")
+):
+    """Скачивание объекта локального хранилища по подписанной ссылке"""
+    storage = processor.storage
+    if not storage.is_local:
+        raise HTTPException(status_code=404, detail="Локальное хранилище не используется")
+    
+    local_path = storage.local_path(object_key)
+    if not local_path or not storage.verify_link(object_key, expires, signature, download):
+        raise HTTPException(status_code=403, detail="Ссылка недействительна или истекла")
+    if not local_path.exists():
+        raise HTTPException(status_code=404, detail="Файл не найден")
+    
+    format_type = local_path.suffix.lstrip('.')
+    media_type = MEDIA_TYPES.get(format_type) or mimetypes.guess_type(local_path.name)[0] or 'application/octet-stream'
+    # Объект адресован по содержимому: хэш в имени - строгий ETag
+    last_modified = local_path.stat().st_mtime
+    headers = {
+        "Cache-Control": S3_CONFIG['cache_control'],
+        "ETag": quote_etag(local_path.name.partition('.')[0]),
+        "Last-Modified": http_date(last_modified)
+    }
+    if is_not_modified(if_none_match, if_modified_since, headers["ETag"], last_modified):
+        return not_modified(headers["ETag"], headers)
+    if download:
+        headers.update(_attachment_headers(download))
+    
+    if format_type == 'json':
+        # Полный JSON хранится сжатым: отдаем целиком с Content-Encoding
+        with open(local_path, 'rb') as file:
+            encoding = fast_json.content_encoding(file.read(4))
+        if encoding != 'identity':
+            headers["Content-Encoding"] = encoding
+        return FileResponse(local_path, media_type=media_type, headers=headers)
+    
+    return range_file_response(local_path, range_header, media_type, headers)
+
+
 @router.get("/download/audio/{task_id}")
-async def download_audio(task_id: str):
+async def download_audio(
+    task_id: str,
+    range_header: Optional[str] = Header(None, alias="Range")
+):
     """Скачивание оригинального аудио файла"""
     
     # Получаем данные из базы
@@ -669,12 +1199,18 @@ async def download_audio(task_id: str):
     # Получаем S3 ссылки
     s3_links = db_record.get('s3_links', {})
     
-    if 'audio_s3_url' in s3_links:
-        # Возвращаем прямую ссылку на S3
-        return JSONResponse({
-            "download_url": s3_links['audio_s3_url'],
-            "filename": db_record['filename'],
-            "format": "audio"
-        })
-    else:
-        raise HTTPException(status_code=404, detail="Аудио файл не найден в S3") 
\ No newline at end of file
+    audio_url = s3_links.get('original') or s3_links.get('audio_s3_url')
+    if audio_url:
+        # Редирект на подписанную ссылку S3 (Range обрабатывает хранилище)
+        return _redirect_to_s3(audio_url, db_record['filename'])
+    
+    # Оригинал еще не попал в хранилище: отдаем принятый файл с поддержкой Range
+    local_files = list(UPLOADS_DIR.glob(f"{task_id}_*"))
+    if local_files:
+        return range_file_response(
+            local_files[0],
+            range_header,
+            mimetypes.guess_type(db_record['filename'])[0] or 'application/octet-stream',
+            _attachment_headers(db_record['filename'])
+        )
+    raise HTTPException(status_code=404, detail="Аудио файл не найден в S3") 
\ No newline at end of file
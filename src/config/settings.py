@@ -22,7 +22,45 @@ S3_CONFIG = {
     'aws_secret_access_key': os.getenv('S3_SECRET_KEY', ''),
     'bucket_name': os.getenv('S3_BUCKET', 'your-bucket-name'),
     'endpoint_url': os.getenv('S3_ENDPOINT', 'https://storage.yandexcloud.net'),
-    'region_name': os.getenv('S3_REGION', 'ru-central1')
+    'region_name': os.getenv('S3_REGION', 'ru-central1'),
+    # Пул соединений общего клиента и параллельность загрузок
+    'max_pool_connections': int(os.getenv('S3_MAX_POOL_CONNECTIONS', '32')),
+    'upload_concurrency': int(os.getenv('S3_UPLOAD_CONCURRENCY', '8')),
+    # Параметры TransferConfig для multipart загрузки больших файлов
+    'multipart_threshold_mb': int(os.getenv('S3_MULTIPART_THRESHOLD_MB', '16')),
+    'multipart_chunksize_mb': int(os.getenv('S3_MULTIPART_CHUNKSIZE_MB', '16')),
+    'transfer_max_concurrency': int(os.getenv('S3_TRANSFER_MAX_CONCURRENCY', '8')),
+    # Потоковая загрузка оригиналов на S3 во время приема файла
+    'stream_originals': os.getenv('S3_STREAM_ORIGINALS', 'false').lower() == 'true',
+    'stream_part_size_mb': max(5, int(os.getenv('S3_STREAM_PART_SIZE_MB', '8'))),
+    'stream_max_inflight_parts': int(os.getenv('S3_STREAM_MAX_INFLIGHT_PARTS', '4')),
+    # Приватные объекты и временные подписанные ссылки на скачивание
+    'public_objects': os.getenv('S3_PUBLIC_OBJECTS', 'false').lower() == 'true',
+    'presign_expires': int(os.getenv('S3_PRESIGN_EXPIRES', '3600')),
+    'presign_refresh_margin': int(os.getenv('S3_PRESIGN_REFRESH_MARGIN', '300')),
+    'cache_control': os.getenv('S3_CACHE_CONTROL', 'private, max-age=31536000, immutable'),
+    # Сжатие полного JSON результата: gzip, zstd или identity
+    'json_encoding': os.getenv('S3_JSON_ENCODING', 'gzip'),
+    # Повторы загрузки с экспоненциальной задержкой (секунды)
+    'retry_attempts': int(os.getenv('S3_RETRY_ATTEMPTS', '3')),
+    'retry_base_delay': float(os.getenv('S3_RETRY_BASE_DELAY', '0.5')),
+    'retry_max_delay': float(os.getenv('S3_RETRY_MAX_DELAY', '8')),
+    # Circuit breaker: ошибок подряд до открытия и время до пробного запроса
+    'breaker_failure_threshold': int(os.getenv('S3_BREAKER_FAILURE_THRESHOLD', '5')),
+    'breaker_reset_timeout': float(os.getenv('S3_BREAKER_RESET_TIMEOUT', '30')),
+    # Очередь отложенных загрузок
+    'outbox_dir': Path(os.getenv('S3_OUTBOX_DIR', str(DATA_DIR / "outbox"))),
+    'outbox_retry_interval': float(os.getenv('S3_OUTBOX_RETRY_INTERVAL', '15'))
+}
+
+# Хранилище артефактов: s3 или local (локальный диск, без сетевых обращений)
+STORAGE_CONFIG = {
+    'backend': os.getenv('STORAGE_BACKEND', 's3').lower(),
+    'local_dir': Path(os.getenv('STORAGE_LOCAL_DIR', str(DATA_DIR / "storage"))),
+    # Путь API для скачивания объектов локального хранилища
+    'url_prefix': '/api/files',
+    # Ключ подписи ссылок на скачивание (по умолчанию - ключ JWT)
+    'link_secret': os.getenv('STORAGE_LINK_SECRET') or os.getenv('JWT_SECRET_KEY', '')
 }
 
 # OAuth конфигурация
@@ -49,6 +87,12 @@ SUPPORTED_FORMATS = {
     'mp4', 'avi', 'mkv', 'mov', 'wmv', 'flv', 'webm', '3gp', 'mts'
 }
 
+# Размер блока при приеме загружаемого файла
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+# Максимум ID задач в одном запросе POST /status/bulk
+STATUS_BULK_MAX_IDS = int(os.getenv('STATUS_BULK_MAX_IDS', '200'))
+
 # Настройки сервера
 SERVER_CONFIG = {
     'host': '0.0.0.0',
@@ -71,11 +115,82 @@ CORS_ORIGINS = [
 
 # Настройки обработки
 PROCESSING_CONFIG = {
-    'max_workers': 2,
+    'max_workers': int(os.getenv('PROCESSING_MAX_WORKERS', '2')),
     'default_model': 'large-v3',
     'default_language': 'ru',
     'default_compute_type': 'float16',
-    'default_batch_size': 16
+    'default_batch_size': 16,
+    # Запускать диаризацию параллельно с транскрипцией и выравниванием
+    'parallel_diarization': os.getenv('PARALLEL_DIARIZATION', 'true').lower() == 'true',
+    # Микро-батчинг коротких файлов между параллельными задачами
+    'microbatch_enabled': os.getenv('MICROBATCH_ENABLED', 'false').lower() == 'true',
+    'microbatch_max_wait_ms': int(os.getenv('MICROBATCH_MAX_WAIT_MS', '50')),
+    'microbatch_max_audio_seconds': float(os.getenv('MICROBATCH_MAX_AUDIO_SECONDS', '60')),
+    # При завершении задачи сохранять только JSON, остальные форматы - при первом скачивании
+    'lazy_exports': os.getenv('LAZY_EXPORTS', 'false').lower() == 'true',
+    # Макет DOCX/PDF по умолчанию: segments - метка, спикер и текст для каждого сегмента,
+    # speakers - абзацы из подряд идущих сегментов одного спикера со встроенными метками
+    # времени (можно выбрать и для отдельного скачивания параметром layout)
+    'document_layout': os.getenv('EXPORT_DOCUMENT_LAYOUT', 'segments'),
+    'paragraph_max_chars': int(os.getenv('EXPORT_PARAGRAPH_MAX_CHARS', '2000'))
+}
+
+# Профиль исполнения на CPU
+CPU_PROFILE_CONFIG = {
+    # intra-op потоков на рабочий процесс (0 - по числу выделенных ядер)
+    'threads_per_worker': int(os.getenv('CPU_THREADS_PER_WORKER', '0')),
+    'interop_threads': int(os.getenv('CPU_INTEROP_THREADS', '1')),
+    # Наборы ядер для рабочих процессов, например "0-15;16-31"
+    'core_sets': os.getenv('CPU_CORE_SETS', ''),
+    # Номер набора ядер для процесса (по умолчанию - первый свободный)
+    'worker_index': int(os.getenv('CPU_WORKER_INDEX')) if os.getenv('CPU_WORKER_INDEX') else None,
+    'calibration_file': DATA_DIR / "cpu_calibration.json"
+}
+
+# Локальное хранилище подготовленных моделей
+MODEL_STORE_CONFIG = {
+    'dir': Path(os.getenv('MODEL_STORE_DIR', str(DATA_DIR / "models"))),
+    # Запрет обращений к Hugging Face Hub: модели берутся только из хранилища
+    'offline': os.getenv('MODEL_STORE_OFFLINE', 'false').lower() == 'true'
+}
+
+if MODEL_STORE_CONFIG['offline']:
+    # Должно быть выставлено до импорта huggingface_hub/transformers
+    os.environ.setdefault('HF_HUB_OFFLINE', '1')
+    os.environ.setdefault('TRANSFORMERS_OFFLINE', '1')
+
+# Кэш полных JSON транскрипций (память + локальный диск)
+TRANSCRIPT_CACHE_CONFIG = {
+    'enabled': os.getenv('TRANSCRIPT_CACHE_ENABLED', 'true').lower() == 'true',
+    'memory_max_mb': int(os.getenv('TRANSCRIPT_CACHE_MEMORY_MB', '256')),
+    'disk_dir': Path(os.getenv('TRANSCRIPT_CACHE_DIR', str(DATA_DIR / "cache" / "transcripts"))),
+    'disk_max_mb': int(os.getenv('TRANSCRIPT_CACHE_DISK_MB', '2048'))
+}
+
+# Общий асинхронный HTTP клиент (загрузка JSON с S3, запросы к LLM)
+HTTP_CLIENT_CONFIG = {
+    'max_connections': int(os.getenv('HTTP_MAX_CONNECTIONS', '64')),
+    'max_keepalive_connections': int(os.getenv('HTTP_MAX_KEEPALIVE_CONNECTIONS', '16')),
+    'timeout': float(os.getenv('HTTP_TIMEOUT', '30')),
+    'connect_timeout': float(os.getenv('HTTP_CONNECT_TIMEOUT', '5')),
+    # Одновременных запросов к каждому направлению
+    'concurrency': {
+        's3': int(os.getenv('HTTP_S3_CONCURRENCY', '32')),
+        'llm': int(os.getenv('HTTP_LLM_CONCURRENCY', '4'))
+    }
+}
+
+# Пул процессов для генерации DOCX/PDF (python-docx и reportlab занимают GIL)
+RENDER_POOL_CONFIG = {
+    # Процессов в пуле (0 - генерировать в вызывающем потоке)
+    'workers': int(os.getenv('RENDER_POOL_WORKERS', '2')),
+    # Одновременных генераций каждого формата
+    'concurrency': {
+        'docx': int(os.getenv('RENDER_DOCX_CONCURRENCY', '2')),
+        'pdf': int(os.getenv('RENDER_PDF_CONCURRENCY', '1'))
+    },
+    # Максимальное время генерации одного документа (с)
+    'timeout': float(os.getenv('RENDER_TIMEOUT', '120'))
 }
 
 # Настройки суммаризации
@@ -84,5 +199,6 @@ SUMMARIZATION_CONFIG = {
     'api_key': os.getenv('SUMMARIZATION_API_KEY', 'your-api-key-here'),
     'model': os.getenv('SUMMARIZATION_MODEL', 'llama3.1:8b'),
     'max_tokens': int(os.getenv('SUMMARIZATION_MAX_TOKENS', '4000')),
-    'temperature': float(os.getenv('SUMMARIZATION_TEMPERATURE', '0.1'))
+    'temperature': float(os.getenv('SUMMARIZATION_TEMPERATURE', '0.1')),
+    'timeout': float(os.getenv('SUMMARIZATION_TIMEOUT', '120'))
 } 
\ No newline at end of file
@@ -0,0 +1,226 @@
+"""
+Профиль исполнения на CPU: потоки, привязка к ядрам и выбор compute_type
+
+Каждый рабочий процесс получает свой набор ядер (CPU_CORE_SETS), число
+intra-op потоков для CTranslate2/torch и compute_type для модели по
+результатам калибровки.
+
+Калибровка (из корня репозитория):
+    python -m src.core.cpu_profile --audio sample.wav --models base large-v3 \
+        --threads 4,8,16 --compute-types int8,int8_float32,float32 --write
+"""
+import os
+import json
+import argparse
+import time
+from typing import Optional, Set, Dict, List
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+from ..config.settings import CPU_PROFILE_CONFIG, DATA_DIR
+
+# Профиль один на процесс: несколько WhisperManager не должны занимать разные слоты
+_process_profile = None
+
+
+def parse_core_set(spec: str) -> Set[int]:
+    """Разбор набора ядер вида "0-7,16-23" """
+    cores = set()
+    for part in spec.split(','):
+        part = part.strip()
+        if not part:
+            continue
+        if '-' in part:
+            first, last = part.split('-', 1)
+            cores.update(range(int(first), int(last) + 1))
+        else:
+            cores.add(int(part))
+    return cores
+
+
+def parse_core_sets(spec: str) -> List[Set[int]]:
+    """Разбор списка наборов ядер, разделенных ';' """
+    return [parse_core_set(part) for part in spec.split(';') if part.strip()]
+
+
+class CpuProfile:
+    """Параметры исполнения моделей на CPU для текущего процесса"""
+
+    def __init__(self, threads: int, interop_threads: int, cores: Optional[Set[int]] = None,
+                 calibration: Optional[Dict] = None):
+        self.threads = threads
+        self.interop_threads = interop_threads
+        self.cores = cores
+        self.calibration = calibration or {}
+        self._slot_lock = None
+
+    @classmethod
+    def from_settings(cls) -> "CpuProfile":
+        """Профиль текущего процесса из CPU_PROFILE_CONFIG"""
+        global _process_profile
+        if _process_profile is None:
+            _process_profile = cls._create_from_settings()
+        return _process_profile
+
+    @classmethod
+    def _create_from_settings(cls) -> "CpuProfile":
+        """Создание профиля из CPU_PROFILE_CONFIG"""
+        cores = None
+        core_sets = parse_core_sets(CPU_PROFILE_CONFIG['core_sets'])
+        slot_lock = None
+        if core_sets:
+            worker_index = CPU_PROFILE_CONFIG['worker_index']
+            if worker_index is None:
+                worker_index, slot_lock = cls._claim_slot(len(core_sets))
+            cores = core_sets[worker_index % len(core_sets)]
+
+        threads = CPU_PROFILE_CONFIG['threads_per_worker']
+        if threads <= 0:
+            threads = len(cores) if cores else (os.cpu_count() or 1)
+
+        profile = cls(
+            threads=threads,
+            interop_threads=CPU_PROFILE_CONFIG['interop_threads'],
+            cores=cores,
+            calibration=cls._load_calibration()
+        )
+        profile._slot_lock = slot_lock
+        return profile
+
+    @staticmethod
+    def _claim_slot(slots_count: int):
+        """
+        Захват свободного слота ядер рабочим процессом
+
+        Блокировка файла держится все время жизни процесса и снимается ОС при
+        его завершении, поэтому перезапущенный воркер занимает освободившийся слот.
+        """
+        if fcntl is None:
+            return os.getpid() % slots_count, None
+
+        slots_dir = DATA_DIR / "cpu_slots"
+        slots_dir.mkdir(parents=True, exist_ok=True)
+        for index in range(slots_count):
+            lock_file = open(slots_dir / f"{index}.lock", 'w')
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                return index, lock_file
+            except OSError:
+                lock_file.close()
+
+        print("⚠️ Все наборы ядер заняты, выбираем по PID")
+        return os.getpid() % slots_count, None
+
+    @staticmethod
+    def _load_calibration() -> Dict:
+        """Загрузка результатов калибровки"""
+        calibration_file = CPU_PROFILE_CONFIG['calibration_file']
+        if not calibration_file.exists():
+            return {}
+        try:
+            with open(calibration_file, 'r', encoding='utf-8') as f:
+                return json.load(f).get('models', {})
+        except (json.JSONDecodeError, OSError) as e:
+            print(f"⚠️ Ошибка загрузки калибровки CPU: {e}")
+            return {}
+
+    def apply(self):
+        """Применение профиля к текущему процессу"""
+        import torch
+
+        if self.cores and hasattr(os, 'sched_setaffinity'):
+            os.sched_setaffinity(0, self.cores)
+
+        torch.set_num_threads(self.threads)
+        try:
+            torch.set_num_interop_threads(self.interop_threads)
+        except RuntimeError:
+            # Можно вызвать только до начала параллельной работы torch
+            pass
+
+        cores_info = f"ядра {min(self.cores)}-{max(self.cores)}" if self.cores else "все ядра"
+        print(f"🔧 CPU профиль: {self.threads} intra-op / {self.interop_threads} inter-op потоков, {cores_info}")
+
+    def compute_type_for(self, model_name: str, default: str) -> str:
+        """compute_type для модели по результатам калибровки"""
+        calibrated = self.calibration.get(model_name)
+        if calibrated:
+            return calibrated['compute_type']
+        return default
+
+
+def calibrate(audio_path: str, models: List[str], threads_list: List[int], compute_types: List[str]) -> Dict:
+    """
+    Замер real-time factor (время обработки / длительность аудио) для профилей
+
+    Returns:
+        Словарь {model: {"compute_type", "threads", "rtf", "profiles": [...]}}
+    """
+    import torch
+    import whisperx
+
+    audio = whisperx.load_audio(audio_path)
+    audio_seconds = len(audio) / 16000
+    results = {}
+
+    for model_name in models:
+        profiles = []
+        for compute_type in compute_types:
+            for threads in threads_list:
+                torch.set_num_threads(threads)
+                try:
+                    model = whisperx.load_model(model_name, "cpu", compute_type=compute_type, threads=threads)
+                except Exception as e:
+                    print(f"⚠️ {model_name} / {compute_type}: {e}")
+                    break
+
+                # Первый прогон - прогрев
+                model.transcribe(audio[:16000 * 5], batch_size=1)
+                started_at = time.perf_counter()
+                model.transcribe(audio, batch_size=1)
+                rtf = (time.perf_counter() - started_at) / audio_seconds
+
+                profiles.append({"compute_type": compute_type, "threads": threads, "rtf": round(rtf, 4)})
+                print(f"{model_name:>12} | {compute_type:>14} | {threads:>7} | {rtf:6.3f}")
+                del model
+
+        if profiles:
+            best = min(profiles, key=lambda p: p['rtf'])
+            results[model_name] = {**best, "profiles": profiles}
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Калибровка CPU профилей WhisperX")
+    parser.add_argument("--audio", required=True, help="Аудио файл для замера")
+    parser.add_argument("--models", nargs="+", default=["large-v3"])
+    parser.add_argument("--threads", default=str(os.cpu_count() or 1), help="Количество потоков через запятую")
+    parser.add_argument("--compute-types", default="int8,int8_float32,float32")
+    parser.add_argument("--write", action="store_true", help="Сохранить результат для выбора compute_type")
+    args = parser.parse_args()
+
+    print(f"{'модель':>12} | {'compute_type':>14} | {'потоки':>7} | {'RTF':>6}")
+    print("-" * 50)
+    results = calibrate(
+        args.audio,
+        args.models,
+        [int(t) for t in args.threads.split(',')],
+        args.compute_types.split(',')
+    )
+
+    for model_name, best in results.items():
+        print(f"✅ {model_name}: {best['compute_type']} / {best['threads']} потоков, RTF {best['rtf']}")
+
+    if args.write:
+        calibration_file = CPU_PROFILE_CONFIG['calibration_file']
+        with open(calibration_file, 'w', encoding='utf-8') as f:
+            json.dump({"models": results, "audio": args.audio}, f, ensure_ascii=False, indent=2)
+        print(f"💾 Калибровка сохранена: {calibration_file}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+"""
+Микро-батчинг коротких файлов между параллельными задачами
+
+Короткие голосовые заметки дают всего один-два VAD сегмента, поэтому
+отдельный вызов `model.transcribe` почти не загружает батчевый пайплайн.
+MicroBatcher собирает сегменты нескольких одновременных задач с одинаковым
+языком, выполняет один батчевый прогон модели и раздает результаты обратно.
+"""
+import threading
+import time
+from concurrent.futures import Future
+from typing import List, Dict, Any
+
+import torch
+
+try:
+    from whisperx.vad import merge_chunks
+except ImportError:
+    merge_chunks = None
+
+try:
+    import faster_whisper
+except ImportError:
+    faster_whisper = None
+
+
+SAMPLE_RATE = 16000
+
+
+class _PendingJob:
+    """Задача, ожидающая попадания в батч"""
+
+    def __init__(self, audio, language: str, batch_size: int, vad_segments: List[Dict]):
+        self.audio = audio
+        self.language = language
+        self.batch_size = batch_size
+        self.vad_segments = vad_segments
+        self.future: Future = Future()
+        self.enqueued_at = time.monotonic()
+
+
+class MicroBatcher:
+    """Сборщик VAD сегментов нескольких задач в общий батч"""
+
+    def __init__(self, model, model_lock: threading.RLock, batch_size: int = 16,
+                 max_wait_ms: int = 50, chunk_size: int = 30):
+        """
+        Args:
+            model: Загруженный пайплайн whisperx (FasterWhisperPipeline)
+            model_lock: Блокировка пайплайна (общая с WhisperManager): токенизатор
+                пайплайна переключается на язык прогона и не должен меняться
+                во время чужой транскрипции
+            batch_size: Размер батча для задач, не указавших свой
+            max_wait_ms: Максимальная задержка первой задачи в очереди
+            chunk_size: Размер VAD чанка в секундах (как в whisperx)
+        """
+        self.model = model
+        self.model_lock = model_lock
+        self.batch_size = batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.chunk_size = chunk_size
+        self._queue: List[_PendingJob] = []
+        self._condition = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+        self._thread.start()
+        self.stats = {
+            "batches": 0,
+            "jobs": 0,
+            "segments": 0,
+            "wait_ms_total": 0.0
+        }
+
+    @staticmethod
+    def is_supported(model) -> bool:
+        """Проверка, что версия whisperx предоставляет нужные внутренние API"""
+        return (
+            merge_chunks is not None
+            and faster_whisper is not None
+            and hasattr(model, "vad_model")
+            and hasattr(model, "_vad_params")
+        )
+
+    def transcribe(self, audio, language: str, batch_size: int = None) -> Dict[str, Any]:
+        """
+        Транскрипция короткого аудио через общий батч
+
+        Args:
+            audio: Numpy array с аудио 16 кГц
+            language: Код языка (обязателен, задачи группируются по языку)
+            batch_size: Размер батча из конфигурации задачи (задачи группируются
+                по языку и размеру батча)
+
+        Returns:
+            Результат в формате `model.transcribe`: {"segments": [...], "language": ...}
+        """
+        vad_segments = self._vad_segments(audio)
+        if not vad_segments:
+            return {"segments": [], "language": language}
+
+        job = _PendingJob(audio, language, batch_size or self.batch_size, vad_segments)
+        with self._condition:
+            self._queue.append(job)
+            self._condition.notify()
+        return job.future.result()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Статистика заполнения батчей"""
+        stats = dict(self.stats)
+        batches = stats["batches"] or 1
+        stats["avg_segments_per_batch"] = round(stats["segments"] / batches, 2)
+        stats["avg_jobs_per_batch"] = round(stats["jobs"] / batches, 2)
+        stats["avg_wait_ms"] = round(stats["wait_ms_total"] / (stats["jobs"] or 1), 2)
+        return stats
+
+    def _vad_segments(self, audio) -> List[Dict]:
+        """VAD разметка аудио (повторяет шаг из FasterWhisperPipeline.transcribe)"""
+        vad_segments = self.model.vad_model({
+            "waveform": torch.from_numpy(audio).unsqueeze(0),
+            "sample_rate": SAMPLE_RATE
+        })
+        return merge_chunks(
+            vad_segments,
+            self.chunk_size,
+            onset=self.model._vad_params["vad_onset"],
+            offset=self.model._vad_params["vad_offset"],
+        )
+
+    def _take_batch(self) -> List[_PendingJob]:
+        """Ожидание и выбор задач для следующего батча"""
+        with self._condition:
+            while not self._queue:
+                self._condition.wait()
+
+            # Ждем пополнения батча, но не дольше max_wait от первой задачи
+            first = self._queue[0]
+            deadline = first.enqueued_at + self.max_wait
+            while sum(len(job.vad_segments) for job in self._queue) < first.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+
+            # Берем задачи с языком и размером батча первой задачи, пока батч не заполнен
+            batch, segments_count = [], 0
+            for job in list(self._queue):
+                if job.language != first.language or job.batch_size != first.batch_size:
+                    continue
+                if batch and segments_count + len(job.vad_segments) > first.batch_size:
+                    break
+                batch.append(job)
+                segments_count += len(job.vad_segments)
+            for job in batch:
+                self._queue.remove(job)
+            return batch
+
+    def _run(self):
+        """Цикл диспетчера батчей"""
+        while True:
+            batch = self._take_batch()
+            started_at = time.monotonic()
+            try:
+                self._run_batch(batch)
+            except Exception as e:
+                print(f"❌ Ошибка батчевой транскрипции: {e}")
+                for job in batch:
+                    if not job.future.done():
+                        job.future.set_exception(e)
+
+            self.stats["batches"] += 1
+            self.stats["jobs"] += len(batch)
+            self.stats["segments"] += sum(len(job.vad_segments) for job in batch)
+            self.stats["wait_ms_total"] += sum((started_at - job.enqueued_at) * 1000 for job in batch)
+
+    def _ensure_tokenizer(self, language: str):
+        """Переключение токенизатора пайплайна на язык батча (под model_lock)"""
+        tokenizer = self.model.tokenizer
+        if tokenizer is None or tokenizer.language_code != language or tokenizer.task != "transcribe":
+            self.model.tokenizer = faster_whisper.tokenizer.Tokenizer(
+                self.model.model.hf_tokenizer,
+                self.model.model.model.is_multilingual,
+                task="transcribe",
+                language=language
+            )
+
+    def _run_batch(self, batch: List[_PendingJob]):
+        """Один батчевый прогон модели по сегментам всех задач батча"""
+        batch_size = batch[0].batch_size
+        owners = []
+        inputs = []
+        for job_index, job in enumerate(batch):
+            for segment in job.vad_segments:
+                f1 = int(segment['start'] * SAMPLE_RATE)
+                f2 = int(segment['end'] * SAMPLE_RATE)
+                owners.append((job_index, segment))
+                inputs.append({'inputs': job.audio[f1:f2]})
+
+        results = [[] for _ in batch]
+        with self.model_lock:
+            self._ensure_tokenizer(batch[0].language)
+            # Пайплайн выдает результаты лениво: читаем их, пока токенизатор не сменили
+            outputs = list(self.model(inputs, batch_size=batch_size, num_workers=0))
+        for (job_index, segment), out in zip(owners, outputs):
+            text = out['text']
+            if batch_size in [0, 1, None]:
+                text = text[0]
+            results[job_index].append({
+                "text": text,
+                "start": round(segment['start'], 3),
+                "end": round(segment['end'], 3)
+            })
+
+        for job, segments in zip(batch, results):
+            job.future.set_result({"segments": segments, "language": job.language})
@@ -0,0 +1,179 @@
+"""
+Локальное хранилище предварительно подготовленных моделей
+
+Модели складываются в MODEL_STORE_DIR в готовом к загрузке виде и
+описываются манифестом manifest.json:
+- ASR модели - каталоги CTranslate2 (model.bin, tokenizer.json, ...),
+  которые faster-whisper загружает по локальному пути без обращения к Hub;
+- HF модели выравнивания - пересохранены в safetensors, которые transformers
+  загружает через mmap, поэтому несколько воркеров на хосте делят page cache;
+- torchaudio модели выравнивания - чекпоинты в каталоге модели.
+
+Подготовка (из корня репозитория, нужен доступ в сеть):
+    python -m src.core.model_store prepare --asr large-v3 --align ru en
+    python -m src.core.model_store list
+"""
+import json
+import argparse
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Optional, Dict
+
+from ..config.settings import MODEL_STORE_CONFIG
+
+
+class ModelStore:
+    """Локальное хранилище моделей с манифестом"""
+
+    def __init__(self, root: Optional[Path] = None):
+        self.root = Path(root or MODEL_STORE_CONFIG['dir'])
+        self.manifest_file = self.root / "manifest.json"
+        self.offline = MODEL_STORE_CONFIG['offline']
+        self.lock = threading.Lock()
+
+    def load_manifest(self) -> Dict:
+        """Загрузка манифеста хранилища"""
+        if not self.manifest_file.exists():
+            return {"version": 1, "models": {}}
+        try:
+            with open(self.manifest_file, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+                manifest.setdefault("models", {})
+                return manifest
+        except (json.JSONDecodeError, OSError) as e:
+            print(f"⚠️ Ошибка загрузки манифеста моделей: {e}")
+            return {"version": 1, "models": {}}
+
+    def save_manifest(self, manifest: Dict):
+        """Атомарное сохранение манифеста"""
+        self.root.mkdir(parents=True, exist_ok=True)
+        temp_file = self.manifest_file.with_suffix(".tmp")
+        with open(temp_file, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+        temp_file.replace(self.manifest_file)
+
+    def _entry_path(self, key: str) -> Optional[Path]:
+        """Путь к модели из манифеста, если она есть на диске"""
+        entry = self.load_manifest()["models"].get(key)
+        if not entry:
+            return None
+        path = self.root / entry["path"]
+        if not path.exists():
+            print(f"⚠️ Модель {key} есть в манифесте, но отсутствует на диске: {path}")
+            return None
+        return path
+
+    def asr_source(self, model_name: str) -> str:
+        """
+        Источник ASR модели для whisperx.load_model
+
+        Returns:
+            Локальный путь из хранилища или исходное имя модели
+
+        Raises:
+            RuntimeError: В офлайн режиме, если модели нет в хранилище
+        """
+        path = self._entry_path(f"asr/{model_name}")
+        if path:
+            print(f"📦 ASR модель {model_name} загружается из локального хранилища: {path}")
+            return str(path)
+        if self.offline:
+            raise RuntimeError(f"Модель {model_name} отсутствует в локальном хранилище (офлайн режим)")
+        return model_name
+
+    def align_kwargs(self, language: str) -> Dict[str, str]:
+        """
+        Аргументы whisperx.load_align_model для языка
+
+        Returns:
+            {"model_name": путь} для HF моделей, {"model_dir": путь} для torchaudio
+            или пустой словарь, если модели нет в хранилище
+        """
+        key = f"align/{language}"
+        path = self._entry_path(key)
+        if not path:
+            if self.offline:
+                raise RuntimeError(f"Модель выравнивания для '{language}' отсутствует в локальном хранилище (офлайн режим)")
+            return {}
+
+        entry = self.load_manifest()["models"][key]
+        print(f"📦 Модель выравнивания {language} загружается из локального хранилища: {path}")
+        if entry["format"] == "torchaudio":
+            return {"model_name": entry["source"], "model_dir": str(path)}
+        return {"model_name": str(path)}
+
+    def _register(self, key: str, path: Path, model_format: str, source: str):
+        """Добавление модели в манифест"""
+        with self.lock:
+            manifest = self.load_manifest()
+            manifest["models"][key] = {
+                "path": str(path.relative_to(self.root)),
+                "format": model_format,
+                "source": source,
+                "created_at": datetime.now().isoformat()
+            }
+            self.save_manifest(manifest)
+        print(f"✅ {key} сохранена в хранилище: {path}")
+
+    def prepare_asr(self, model_name: str):
+        """Скачивание CTranslate2 модели faster-whisper в хранилище"""
+        from faster_whisper.utils import download_model
+
+        path = self.root / "asr" / model_name
+        path.mkdir(parents=True, exist_ok=True)
+        download_model(model_name, output_dir=str(path))
+        self._register(f"asr/{model_name}", path, "ctranslate2", model_name)
+
+    def prepare_align(self, language: str):
+        """Сохранение модели выравнивания в хранилище"""
+        from whisperx.alignment import DEFAULT_ALIGN_MODELS_HF, DEFAULT_ALIGN_MODELS_TORCH
+
+        path = self.root / "align" / language
+        path.mkdir(parents=True, exist_ok=True)
+
+        if language in DEFAULT_ALIGN_MODELS_TORCH:
+            import torchaudio
+
+            source = DEFAULT_ALIGN_MODELS_TORCH[language]
+            bundle = torchaudio.pipelines.__dict__[source]
+            bundle.get_model(dl_kwargs={"model_dir": str(path)})
+            self._register(f"align/{language}", path, "torchaudio", source)
+        elif language in DEFAULT_ALIGN_MODELS_HF:
+            from transformers import Wav2Vec2ForCTC, Wav2Vec2Processor
+
+            source = DEFAULT_ALIGN_MODELS_HF[language]
+            Wav2Vec2Processor.from_pretrained(source).save_pretrained(str(path))
+            Wav2Vec2ForCTC.from_pretrained(source).save_pretrained(str(path), safe_serialization=True)
+            self._register(f"align/{language}", path, "safetensors", source)
+        else:
+            raise ValueError(f"Нет модели выравнивания по умолчанию для языка '{language}'")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Локальное хранилище моделей WhisperX")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    prepare_parser = subparsers.add_parser("prepare", help="Подготовить модели")
+    prepare_parser.add_argument("--asr", nargs="*", default=[], help="ASR модели, например large-v3")
+    prepare_parser.add_argument("--align", nargs="*", default=[], help="Языки моделей выравнивания")
+    subparsers.add_parser("list", help="Показать манифест")
+
+    args = parser.parse_args()
+    store = ModelStore()
+
+    if args.command == "prepare":
+        for model_name in args.asr:
+            store.prepare_asr(model_name)
+        for language in args.align:
+            store.prepare_align(language)
+    else:
+        models = store.load_manifest()["models"]
+        if not models:
+            print(f"Хранилище {store.root} пусто")
+        for key, entry in sorted(models.items()):
+            print(f"{key:<20} {entry['format']:<12} {entry['source']}")
+
+
+if __name__ == "__main__":
+    main()
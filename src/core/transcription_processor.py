@@ -6,14 +6,18 @@ import asyncio
 from pathlib import Path
 from typing import Dict, Any
 from datetime import datetime
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import ThreadPoolExecutor, Future
 
 from ..models.schemas import TranscriptionConfig
 from ..services.subtitle_generator import SubtitleGenerator
-from ..services.s3_service import S3Service
+from ..services.storage import create_storage_service
+from ..services.transcript_cache import TranscriptCache
+from ..services.task_events import task_events
 from ..services.database_service import DatabaseService
 from ..core.whisper_manager import WhisperManager
-from ..config.settings import UPLOADS_DIR, TEMP_DIR, PROCESSING_CONFIG
+from ..utils.word_columns import build_word_columns, strip_segment_words
+from ..utils import fast_json
+from ..config.settings import UPLOADS_DIR, TEMP_DIR, PROCESSING_CONFIG, S3_CONFIG
 
 
 class TranscriptionProcessor:
@@ -22,10 +26,13 @@ class TranscriptionProcessor:
     def __init__(self):
         self.whisper_manager = WhisperManager()
         self.subtitle_generator = SubtitleGenerator()
-        self.s3_service = S3Service()
+        self.storage = create_storage_service()
         self.db_service = DatabaseService()
+        self.transcript_cache = TranscriptCache()
         self.executor = ThreadPoolExecutor(max_workers=PROCESSING_CONFIG['max_workers'])
         self.task_statuses = {}  # Статусы задач в памяти
+        self.task_owners: Dict[str, str] = {}  # Владельцы задач до сохранения в базу
+        self.original_archives: Dict[str, Future] = {}  # Потоковые загрузки оригиналов на S3
     
     def update_task_status(self, task_id: str, status: str, progress: str = None, error: str = None, progress_percent: int = None):
         """Обновление статуса задачи"""
@@ -36,6 +43,8 @@ class TranscriptionProcessor:
             "error": error,
             "updated_at": datetime.now().isoformat()
         }
+        # Подписчики получают статус сразу, без опроса /status
+        task_events.publish(task_id, {"id": task_id, **self.task_statuses[task_id]})
         print(f"📊 Статус {task_id}: {status} ({progress_percent}%) - {progress}")
     
     def get_task_status(self, task_id: str) -> Dict:
@@ -58,7 +67,7 @@ class TranscriptionProcessor:
             return False
     
     def cleanup_local_files(self, task_id: str, filename: str, s3_links: Dict[str, str]):
-        """Удаление локальных файлов после загрузки на S3"""
+        """Удаление локального оригинала после загрузки на S3 (производные файлы создаются в памяти)"""
         files_to_delete = []
         
         try:
@@ -67,13 +76,6 @@ class TranscriptionProcessor:
                 original_files = list(UPLOADS_DIR.glob(f"{task_id}_*"))
                 files_to_delete.extend(original_files)
             
-            # Удаляем локальные файлы субтитров, если они загружены на S3
-            for format_type in ['srt', 'vtt', 'tsv', 'docx', 'pdf']:
-                if format_type in s3_links:
-                    from ..config.settings import TRANSCRIPTS_DIR
-                    local_files = list(TRANSCRIPTS_DIR.glob(f"{task_id}_*.{format_type}"))
-                    files_to_delete.extend(local_files)
-            
             # Удаляем файлы
             for file_path in files_to_delete:
                 try:
@@ -88,6 +90,24 @@ class TranscriptionProcessor:
         except Exception as e:
             print(f"❌ Ошибка при очистке локальных файлов: {e}")
     
+    def release_original(self, task_id: str, file_path: Path):
+        """
+        Освобождение диска от оригинала после декодирования
+        
+        Файл удаляется, только когда потоковая загрузка оригинала на S3
+        завершилась успешно; иначе он нужен для повторной загрузки.
+        """
+        archive_future = self.original_archives.get(task_id)
+        if not archive_future:
+            return
+        
+        def delete_if_archived(future: Future):
+            if future.result() and file_path.exists():
+                file_path.unlink()
+                print(f"🗑️ Оригинал удален после декодирования: {file_path.name}")
+        
+        archive_future.add_done_callback(delete_if_archived)
+    
     def process_transcription_sync(
         self, 
         task_id: str, 
@@ -115,6 +135,7 @@ class TranscriptionProcessor:
                     self.update_task_status(task_id, "failed", error=error_msg, progress_percent=0)
                     return
                 processing_file = audio_path
+                self.release_original(task_id, file_path)
             else:
                 processing_file = file_path
             
@@ -131,7 +152,13 @@ class TranscriptionProcessor:
             def transcription_callback(status, message, percent):
                 self.update_task_status(task_id, status, message, progress_percent=percent)
             
-            result = self.whisper_manager.transcribe_audio(str(processing_file), config, transcription_callback)
+            def audio_loaded_callback():
+                if processing_file == file_path:
+                    self.release_original(task_id, file_path)
+            
+            result = self.whisper_manager.transcribe_audio(
+                str(processing_file), config, transcription_callback, audio_loaded_callback
+            )
             
             # Добавляем метаданные
             result["created_at"] = datetime.now().isoformat()
@@ -160,6 +187,7 @@ class TranscriptionProcessor:
         except Exception as e:
             error_msg = f"Ошибка обработки: {str(e)}"
             print(f"❌ {error_msg}")
+            self.original_archives.pop(task_id, None)
             self.save_error_result(task_id, error_msg, original_filename, user_id)
             self.update_task_status(task_id, "failed", error=error_msg, progress_percent=0)
     
@@ -186,24 +214,36 @@ class TranscriptionProcessor:
     def save_transcription_result(self, task_id: str, result: Dict[str, Any], filename: str, user_id: str = None):
         """Сохранение результата транскрипции с загрузкой на S3"""
         
-        # Генерируем файлы субтитров
-        self.update_task_status(task_id, "generating_files", "Генерация файлов субтитров...", progress_percent=80)
+        # Оригинальный файл загружается на S3 в фоне, параллельно с генерацией
+        # и загрузкой файлов транскрипции (если он не загружен потоково при приеме)
+        original_future = self.original_archives.pop(task_id, None)
+        original_files = list(UPLOADS_DIR.glob(f"{task_id}_*"))
+        if original_future is None and original_files:
+            original_future = self.storage.executor.submit(
+                self.storage.upload_original_file, task_id, filename, original_files[0]
+            )
+        
         segments = result.get("segments", [])
-        subtitle_files = self.subtitle_generator.generate_all_formats(
-            segments, task_id, filename, temp=True
-        )
+        if PROCESSING_CONFIG['lazy_exports']:
+            # Форматы экспорта будут созданы при первом скачивании
+            artifacts = {}
+        else:
+            # Генерируем файлы субтитров
+            self.update_task_status(task_id, "generating_files", "Генерация файлов субтитров...", progress_percent=80)
+            artifacts = self.subtitle_generator.render_all_formats(segments, task_id, filename)
         
-        # Загружаем файлы на S3
-        self.update_task_status(task_id, "uploading_s3", "Загрузка файлов транскрипции на S3...", progress_percent=85)
+        # Загружаем файлы транскрипции на S3 параллельно
+        self.update_task_status(task_id, "uploading_s3", "Загрузка файлов на S3...", progress_percent=85)
         print(f"📤 Загружаем файлы транскрипции на S3 для {task_id}...")
-        s3_links = self.s3_service.upload_transcript_files(task_id, filename, subtitle_files)
+        s3_links = self.storage.upload_transcript_files(task_id, filename, artifacts)
         
-        # Загружаем оригинальный файл на S3
-        self.update_task_status(task_id, "uploading_s3", "Загрузка оригинального файла на S3...", progress_percent=88)
-        original_files = list(UPLOADS_DIR.glob(f"{task_id}_*"))
-        if original_files:
-            original_file = original_files[0]
-            original_file_s3_url = self.s3_service.upload_original_file(task_id, filename, original_file)
+        if original_future:
+            original_file_s3_url = original_future.result()
+            
+            # Потоковая загрузка не удалась - загружаем локальную копию
+            if not original_file_s3_url and original_files and original_files[0].exists():
+                original_file_s3_url = self.storage.upload_original_file(task_id, filename, original_files[0])
+            
             if original_file_s3_url:
                 s3_links['original'] = original_file_s3_url
         
@@ -230,15 +270,24 @@ class TranscriptionProcessor:
             "status": "completed",
             "created_at": result.get("created_at"),
             "completed_at": datetime.now().isoformat(),
-            "segments": segments,
+            "segments": strip_segment_words(segments),
+            # Пословные start/end/score/speaker в колоночном виде
+            "words": build_word_columns(segments),
             "language": result.get("language"),
             "s3_links": s3_links
         }
         
         # Загружаем полный JSON на S3
-        full_json_s3_url = self.s3_service.upload_json_data(task_id, filename, full_transcription_data)
+        full_json_s3_url, full_json_etag = self.storage.upload_json_data(task_id, filename, full_transcription_data)
         if full_json_s3_url:
-            self.db_service.update_transcription(task_id, {"full_json_s3_url": full_json_s3_url})
+            updates = {
+                "full_json_s3_url": full_json_s3_url,
+                "full_json_encoding": fast_json.resolve_encoding(S3_CONFIG['json_encoding'])
+            }
+            # Версия объекта из ответа хранилища: чтения попадают в кэш без записи в базу
+            if full_json_etag:
+                updates["full_json_etag"] = full_json_etag
+            self.db_service.update_transcription(task_id, updates)
         
         # Удаляем локальные файлы после успешной загрузки на S3
         self.update_task_status(task_id, "cleaning_up", "Очистка локальных файлов...", progress_percent=97)
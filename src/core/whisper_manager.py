@@ -2,13 +2,19 @@
 Менеджер для работы с моделями WhisperX
 """
 import os
+import asyncio
 import threading
 import torch
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional, Callable
 
 import whisperx
 
 from ..models.schemas import TranscriptionConfig
+from ..config.settings import PROCESSING_CONFIG
+from .micro_batcher import MicroBatcher, SAMPLE_RATE
+from .cpu_profile import CpuProfile
+from .model_store import ModelStore
 
 
 class WhisperManager:
@@ -19,9 +25,21 @@ class WhisperManager:
         self.align_model = None
         self.align_metadata = None
         self.diarize_model = None
+        self.micro_batcher = None
+        self.model_store = ModelStore()
         self.models_loaded = False
         self.loading_lock = threading.Lock()
+        # Пайплайн транскрипции меняет свой токенизатор под язык вызова,
+        # поэтому вызовы модели из разных потоков выполняются по очереди
+        self.model_lock = threading.RLock()
+        # Отдельный поток для диаризации: она зависит только от аудио
+        # и может выполняться параллельно с транскрипцией и выравниванием
+        self.diarize_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="diarize")
         self.device = self._detect_device()
+        self.cpu_profile = None
+        if self.device == "cpu":
+            self.cpu_profile = CpuProfile.from_settings()
+            self.cpu_profile.apply()
         self.compute_type = self._detect_compute_type()
         print(f"🔧 Обнаружено устройство: {self.device}, compute_type: {self.compute_type}")
     
@@ -56,17 +74,38 @@ class WhisperManager:
             compute_type = config.compute_type
             if compute_type == "auto":
                 compute_type = self.compute_type
+                if self.cpu_profile:
+                    compute_type = self.cpu_profile.compute_type_for(config.model, compute_type)
                 print(f"🔧 Автоматически выбран compute_type: {compute_type}")
             
+            # Количество потоков CTranslate2 на CPU задается профилем
+            model_kwargs = {}
+            if self.cpu_profile:
+                model_kwargs['threads'] = self.cpu_profile.threads
+            
             if status_callback:
                 status_callback("loading_whisper_model", "Загрузка модели Whisper...", 20)
             print(f"🔧 Загрузка модели Whisper: {config.model}")
             self.model = whisperx.load_model(
-                config.model, 
+                self.model_store.asr_source(config.model), 
                 self.device, 
-                compute_type=compute_type
+                compute_type=compute_type,
+                **model_kwargs
             )
             
+            # Микро-батчинг коротких файлов между параллельными задачами
+            if PROCESSING_CONFIG['microbatch_enabled']:
+                if MicroBatcher.is_supported(self.model):
+                    self.micro_batcher = MicroBatcher(
+                        self.model,
+                        self.model_lock,
+                        batch_size=PROCESSING_CONFIG['default_batch_size'],
+                        max_wait_ms=PROCESSING_CONFIG['microbatch_max_wait_ms']
+                    )
+                    print(f"🔧 Микро-батчинг включен (окно {PROCESSING_CONFIG['microbatch_max_wait_ms']} мс)")
+                else:
+                    print("⚠️ Микро-батчинг не поддерживается установленной версией whisperx")
+            
             if status_callback:
                 status_callback("loading_align_model", "Загрузка модели выравнивания...", 25)
             print("🔧 Загрузка модели выравнивания...")
@@ -75,7 +114,8 @@ class WhisperManager:
             try:
                 self.align_model, self.align_metadata = whisperx.load_align_model(
                     language_code=config.language, 
-                    device=self.device
+                    device=self.device,
+                    **self.model_store.align_kwargs(config.language)
                 )
             except Exception as e:
                 print(f"⚠️ Не удалось загрузить модель выравнивания для языка '{config.language}': {e}")
@@ -84,7 +124,8 @@ class WhisperManager:
                     # Попробуем загрузить для английского языка как fallback
                     self.align_model, self.align_metadata = whisperx.load_align_model(
                         language_code="en", 
-                        device=self.device
+                        device=self.device,
+                        **self.model_store.align_kwargs("en")
                     )
                     print("✅ Загружена английская модель выравнивания как fallback")
                 except Exception as e2:
@@ -108,7 +149,13 @@ class WhisperManager:
             self.models_loaded = True
             print("✅ Модели загружены успешно!")
     
-    def transcribe_audio(self, audio_path: str, config: TranscriptionConfig, status_callback: Optional[Callable] = None) -> dict:
+    def transcribe_audio(
+        self, 
+        audio_path: str, 
+        config: TranscriptionConfig, 
+        status_callback: Optional[Callable] = None,
+        audio_loaded_callback: Optional[Callable] = None
+    ) -> dict:
         """
         Выполнение транскрипции аудио
         
@@ -116,6 +163,7 @@ class WhisperManager:
             audio_path: Путь к аудио файлу
             config: Конфигурация транскрипции
             status_callback: Callback для обновления статуса
+            audio_loaded_callback: Callback после декодирования аудио в память
         
         Returns:
             Результат транскрипции
@@ -128,36 +176,66 @@ class WhisperManager:
             status_callback("loading_audio", "Загрузка аудио файла...", 32)
         print(f"🎵 Загрузка аудио файла: {audio_path}")
         audio = whisperx.load_audio(audio_path)
+        if audio_loaded_callback:
+            audio_loaded_callback()
+        
+        # Диаризация (если включена) запускается сразу после загрузки аудио,
+        # параллельно с транскрипцией и выравниванием
+        diarize_future = None
+        if config.diarize and self.diarize_model:
+            if PROCESSING_CONFIG['parallel_diarization']:
+                print("👥 Диаризация спикеров запущена параллельно с транскрипцией...")
+                diarize_future = self.diarize_executor.submit(self.diarize_model, audio)
         
         # Транскрипция
         if status_callback:
             status_callback("transcribing", "Выполнение транскрипции...", 45)
         print("🎯 Выполнение транскрипции...")
-        result = self.model.transcribe(audio, batch_size=config.batch_size)
-        
-        # Выравнивание
-        if self.align_model and self.align_metadata:
-            if status_callback:
-                status_callback("aligning", "Выравнивание текста...", 65)
-            print("📐 Выравнивание текста...")
-            result = whisperx.align(
-                result["segments"], 
-                self.align_model, 
-                self.align_metadata, 
-                audio, 
-                self.device
-            )
+        try:
+            duration = len(audio) / SAMPLE_RATE
+            if (self.micro_batcher and config.language
+                    and duration <= PROCESSING_CONFIG['microbatch_max_audio_seconds']):
+                result = self.micro_batcher.transcribe(audio, config.language, config.batch_size)
+            else:
+                result = self._transcribe(audio, config.batch_size)
+            
+            # Выравнивание
+            if self.align_model and self.align_metadata:
+                if status_callback:
+                    status_callback("aligning", "Выравнивание текста...", 65)
+                print("📐 Выравнивание текста...")
+                result = whisperx.align(
+                    result["segments"], 
+                    self.align_model, 
+                    self.align_metadata, 
+                    audio, 
+                    self.device
+                )
+        except Exception:
+            # Не оставляем диаризацию работать впустую, если транскрипция упала
+            if diarize_future:
+                diarize_future.cancel()
+            raise
         
         # Диаризация (если включена)
         if config.diarize and self.diarize_model:
             if status_callback:
                 status_callback("diarizing", "Диаризация спикеров...", 72)
-            print("👥 Диаризация спикеров...")
-            diarize_segments = self.diarize_model(audio)
+            if diarize_future:
+                print("👥 Ожидание завершения диаризации спикеров...")
+                diarize_segments = diarize_future.result()
+            else:
+                print("👥 Диаризация спикеров...")
+                diarize_segments = self.diarize_model(audio)
             result = whisperx.assign_word_speakers(diarize_segments, result)
         
         return result
     
+    def _transcribe(self, audio, batch_size: int) -> dict:
+        """Вызов пайплайна транскрипции под блокировкой модели"""
+        with self.model_lock:
+            return self.model.transcribe(audio, batch_size=batch_size)
+    
     async def transcribe_audio_chunk(self, audio_data, sample_rate: int = 16000, language: str = "ru") -> str:
         """
         Транскрипция аудио чанка для real-time режима
@@ -199,7 +277,8 @@ class WhisperManager:
                 audio_data = scipy.signal.resample(audio_data, target_length)
             
             # Транскрибируем аудио чанк
-            result = self.model.transcribe(audio_data, batch_size=1)
+            # В отдельном потоке: модель может быть занята другой задачей
+            result = await asyncio.to_thread(self._transcribe, audio_data, 1)
             
             # Извлекаем текст из результата
             if result and "segments" in result and result["segments"]:
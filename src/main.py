@@ -13,6 +13,9 @@ from .api.routes import router
 from .api.auth_routes import router as auth_router  # Включено обратно
 from .api.realtime_routes import router as realtime_router, initialize_realtime_system, shutdown_realtime_system  # Real-time маршруты
 from .config.settings import CORS_ORIGINS, JWT_CONFIG
+from .services.http_client import close_http_client
+from .services.render_pool import shutdown_render_pool
+from .utils.event_loop_monitor import event_loop_monitor
 
 
 def create_app() -> FastAPI:
@@ -57,6 +60,9 @@ def create_app() -> FastAPI:
         print("💾 JSON база данных для метаданных транскрипций и пользователей")
         print("🎙️ Real-time транскрипция включена (WebSocket: /api/realtime/ws)")
         
+        # Замер задержки event loop (GET /api/health)
+        event_loop_monitor.start()
+        
         # Инициализация real-time системы
         try:
             await initialize_realtime_system()
@@ -75,6 +81,10 @@ def create_app() -> FastAPI:
             print("✅ Real-time система остановлена")
         except Exception as e:
             print(f"⚠️ Ошибка остановки real-time системы: {e}")
+        
+        await event_loop_monitor.stop()
+        await close_http_client()
+        shutdown_render_pool()
         print("👋 Сервер остановлен")
     
     return app
@@ -108,4 +108,10 @@ class TranscriptionListItem(BaseModel):
     error: Optional[str] = None
     progress: Optional[str] = None
     progress_percent: Optional[int] = None
-    user_id: Optional[str] = None  # Добавляем связь с пользователем 
\ No newline at end of file
+    user_id: Optional[str] = None  # Добавляем связь с пользователем 
+
+
+class BulkStatusRequest(BaseModel):
+    """Запрос статусов нескольких задач"""
+    ids: List[str]
+    fields: Optional[List[str]] = None  # По умолчанию - id, status, progress, progress_percent, error
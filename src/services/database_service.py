@@ -13,7 +13,9 @@ class DatabaseService:
     """Сервис для работы с JSON базой данных"""
     
     def __init__(self):
-        self.lock = threading.Lock()
+        # Повторно входимая: изменения записей держат блокировку на все
+        # чтение-изменение-запись, а load/save берут ее еще раз
+        self.lock = threading.RLock()
     
     def load_database(self) -> Dict:
         """Загрузка базы данных из JSON файла"""
@@ -59,9 +61,10 @@ class DatabaseService:
     # Методы для работы с транскрипциями
     def add_transcription(self, transcription_data: Dict):
         """Добавление транскрипции в базу данных"""
-        db = self.load_database()
-        db['transcriptions'][transcription_data['id']] = transcription_data
-        self.save_database(db)
+        with self.lock:
+            db = self.load_database()
+            db['transcriptions'][transcription_data['id']] = transcription_data
+            self.save_database(db)
         print(f"✅ Транскрипция {transcription_data['id']} добавлена в базу данных")
     
     def get_transcription(self, task_id: str) -> Optional[Dict]:
@@ -69,23 +72,42 @@ class DatabaseService:
         db = self.load_database()
         return db['transcriptions'].get(task_id)
     
+    def get_transcriptions(self, task_ids: List[str]) -> Dict[str, Dict]:
+        """Получение нескольких транскрипций за одно чтение базы данных"""
+        db = self.load_database()
+        transcriptions = db['transcriptions']
+        return {task_id: transcriptions[task_id] for task_id in task_ids if task_id in transcriptions}
+    
     def update_transcription(self, task_id: str, updates: Dict):
         """Обновление транскрипции в базе данных"""
-        db = self.load_database()
-        if task_id in db['transcriptions']:
+        with self.lock:
+            db = self.load_database()
+            if task_id not in db['transcriptions']:
+                return
             db['transcriptions'][task_id].update(updates)
             self.save_database(db)
-            print(f"✅ Транскрипция {task_id} обновлена в базе данных")
+        print(f"✅ Транскрипция {task_id} обновлена в базе данных")
+    
+    def add_transcription_links(self, task_id: str, links: Dict[str, str]):
+        """Добавление ссылок на файлы к s3_links транскрипции"""
+        with self.lock:
+            db = self.load_database()
+            record = db['transcriptions'].get(task_id)
+            if record is None:
+                return
+            record['s3_links'] = {**record.get('s3_links', {}), **links}
+            self.save_database(db)
     
     def delete_transcription(self, task_id: str) -> bool:
         """Удаление транскрипции из базы данных"""
-        db = self.load_database()
-        if task_id in db['transcriptions']:
+        with self.lock:
+            db = self.load_database()
+            if task_id not in db['transcriptions']:
+                return False
             del db['transcriptions'][task_id]
             self.save_database(db)
-            print(f"✅ Транскрипция {task_id} удалена из базы данных")
-            return True
-        return False
+        print(f"✅ Транскрипция {task_id} удалена из базы данных")
+        return True
     
     def get_all_transcriptions(self) -> List[Dict]:
         """Получение всех транскрипций из базы данных"""
@@ -0,0 +1,129 @@
+"""
+Форматы экспорта по запросу с сохранением в хранилище
+
+В режиме LAZY_EXPORTS при завершении задачи сохраняется только канонический
+JSON. Остальные форматы генерируются при первом скачивании, сохраняются в
+хранилище артефактов и дальше отдаются оттуда. Одновременные запросы одного
+формата ждут одну генерацию. Текстовые форматы отдаются потоком и
+сохраняются после первой полной отдачи.
+"""
+import os
+import asyncio
+import tempfile
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Iterator, Set
+
+from fastapi.concurrency import run_in_threadpool
+
+from ..config.settings import PROCESSING_CONFIG
+from .storage import StorageService
+from .database_service import DatabaseService
+from .subtitle_generator import SubtitleGenerator
+
+
+class ExportService:
+    """Генерация и сохранение форматов экспорта по запросу"""
+
+    def __init__(self, storage: StorageService, db_service: DatabaseService):
+        self.storage = storage
+        self.db_service = db_service
+        self.lazy = PROCESSING_CONFIG['lazy_exports']
+        self.in_flight: Dict[Tuple[str, str, Optional[str]], asyncio.Future] = {}
+        # Форматы, сохранение которых уже запущено
+        self.storing: Set[Tuple[str, str]] = set()
+        self.storing_lock = threading.Lock()
+
+    @staticmethod
+    def stored_url(db_record: Dict, format_type: str) -> Optional[str]:
+        """Постоянная ссылка на уже сохраненный формат"""
+        return db_record.get('s3_links', {}).get(format_type)
+
+    async def render(self, db_record: Dict, format_type: str, segments: List[Dict],
+                     layout: Optional[str] = None) -> Optional[bytes]:
+        """
+        Генерация формата и сохранение его в хранилище в фоне
+
+        Args:
+            layout: Макет DOCX/PDF; сохраняется только документ в макете по умолчанию
+
+        Returns:
+            Содержимое файла или None, если формат не удалось создать
+        """
+        task_id = db_record['id']
+        layout = layout or PROCESSING_CONFIG['document_layout']
+        key = (task_id, format_type, layout)
+
+        pending = self.in_flight.get(key)
+        if pending is not None:
+            return await asyncio.shield(pending)
+
+        future = asyncio.get_running_loop().create_future()
+        self.in_flight[key] = future
+        try:
+            content = await run_in_threadpool(
+                SubtitleGenerator.render_format, format_type, segments, task_id, db_record['filename'], layout
+            )
+            future.set_result(content)
+        except Exception as e:
+            future.set_exception(e)
+            # Исключение получат ожидающие запросы, без них оно не должно логироваться
+            future.exception()
+            raise
+        finally:
+            self.in_flight.pop(key, None)
+
+        if content and layout == PROCESSING_CONFIG['document_layout']:
+            self._submit_store(task_id, db_record['filename'], format_type, content)
+        return content
+
+    def stream(self, db_record: Dict, format_type: str, chunks: Iterator[bytes]) -> Iterator[bytes]:
+        """
+        Отдача формата потоком с сохранением в хранилище
+
+        Отданные блоки пишутся во временный файл, а не копятся в памяти. Файл
+        сохраняется, только если генерация дошла до конца (клиент не оборвал
+        загрузку), следующие запросы получают его из хранилища.
+        """
+        spool = tempfile.NamedTemporaryFile(prefix=f"{db_record['id']}_", suffix=f".{format_type}", delete=False)
+        try:
+            with spool:
+                for chunk in chunks:
+                    spool.write(chunk)
+                    yield chunk
+        except BaseException:
+            # В том числе GeneratorExit, если клиент оборвал загрузку
+            os.unlink(spool.name)
+            raise
+        self._submit_store(db_record['id'], db_record['filename'], format_type, file_path=Path(spool.name))
+
+    def _submit_store(self, task_id: str, filename: str, format_type: str,
+                      content: Optional[bytes] = None, file_path: Optional[Path] = None):
+        """Сохранение в фоне, не более одного на формат задачи одновременно"""
+        key = (task_id, format_type)
+        with self.storing_lock:
+            if key in self.storing:
+                if file_path is not None:
+                    file_path.unlink(missing_ok=True)
+                return
+            self.storing.add(key)
+        self.storage.executor.submit(self._store, task_id, filename, format_type, content, file_path)
+
+    def _store(self, task_id: str, filename: str, format_type: str,
+               content: Optional[bytes] = None, file_path: Optional[Path] = None):
+        """Сохранение сгенерированного формата и ссылки на него (выполняется в пуле загрузок)"""
+        try:
+            # Загрузка в текущем потоке: повторная отправка в тот же ограниченный пул
+            # с ожиданием результата заблокировала бы его
+            url = self.storage.upload_transcript_file(task_id, filename, format_type, content, file_path)
+            if not url:
+                return
+
+            # Несколько форматов могут сохраняться одновременно: ссылка добавляется атомарно
+            self.db_service.add_transcription_links(task_id, {format_type: url})
+            print(f"💾 {format_type.upper()} для {task_id} сохранен в хранилище")
+        finally:
+            if file_path is not None:
+                file_path.unlink(missing_ok=True)
+            with self.storing_lock:
+                self.storing.discard((task_id, format_type))
@@ -0,0 +1,57 @@
+"""
+Общий асинхронный HTTP клиент для исходящих запросов из обработчиков API
+
+Один httpx.AsyncClient на процесс: пул соединений переиспользуется между
+запросами, а число одновременных запросов к каждому направлению (S3, LLM)
+ограничено отдельным семафором, чтобы медленный сервис не занял весь пул.
+"""
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Optional, Dict, AsyncIterator
+
+import httpx
+
+from ..config.settings import HTTP_CLIENT_CONFIG
+
+_client: Optional[httpx.AsyncClient] = None
+_semaphores: Dict[str, asyncio.Semaphore] = {}
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Общий клиент (создается при первом обращении в работающем event loop)"""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=HTTP_CLIENT_CONFIG['max_connections'],
+                max_keepalive_connections=HTTP_CLIENT_CONFIG['max_keepalive_connections']
+            ),
+            timeout=httpx.Timeout(
+                HTTP_CLIENT_CONFIG['timeout'],
+                connect=HTTP_CLIENT_CONFIG['connect_timeout']
+            )
+        )
+    return _client
+
+
+@asynccontextmanager
+async def limited(target: str) -> AsyncIterator[httpx.AsyncClient]:
+    """
+    Клиент с ограничением одновременных запросов к направлению
+
+    Args:
+        target: Направление запросов: 's3' или 'llm'
+    """
+    semaphore = _semaphores.get(target)
+    if semaphore is None:
+        semaphore = _semaphores[target] = asyncio.Semaphore(HTTP_CLIENT_CONFIG['concurrency'][target])
+    async with semaphore:
+        yield get_http_client()
+
+
+async def close_http_client():
+    """Закрытие общего клиента при остановке сервера"""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
@@ -0,0 +1,233 @@
+"""
+Движок генерации PDF транскрипций
+
+Шрифт с поддержкой кириллицы ищется и регистрируется в reportlab один раз на
+процесс, стили абзацев создаются один раз вместе с движком. Документ
+собирается по частям: flowables сегментов создаются по мере того, как
+reportlab размещает предыдущие, поэтому память не растет с длиной записи.
+"""
+import os
+import threading
+from io import BytesIO
+from datetime import datetime
+from pathlib import Path
+from typing import List, Dict, Iterator, Optional
+
+try:
+    from reportlab.lib.pagesizes import A4
+    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+    from reportlab.lib.enums import TA_LEFT
+    from reportlab.pdfbase import pdfmetrics
+    from reportlab.pdfbase.ttfonts import TTFont
+    PDF_AVAILABLE = True
+except ImportError:
+    PDF_AVAILABLE = False
+
+from ..config.settings import PROCESSING_CONFIG
+from ..utils.time_formatters import format_time_srt, format_time_clock
+from ..utils.speaker_paragraphs import iter_speaker_paragraphs
+
+# Системные шрифты с поддержкой кириллицы в порядке предпочтения
+FONT_CANDIDATES = [
+    # macOS
+    '/Library/Fonts/Arial.ttf',
+    '/System/Library/Fonts/Helvetica.ttc',
+    '/System/Library/Fonts/Times.ttc',
+    '/Library/Fonts/Microsoft/Arial.ttf',
+    '/System/Library/Fonts/Arial Unicode MS.ttf',
+    # Linux
+    '/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf',
+    '/usr/share/fonts/truetype/liberation/LiberationSans-Regular.ttf',
+    '/usr/share/fonts/TTF/DejaVuSans.ttf',
+    # Windows
+    'C:/Windows/Fonts/arial.ttf',
+    'C:/Windows/Fonts/calibri.ttf',
+    'C:/Windows/Fonts/tahoma.ttf'
+]
+
+# Сегментов, для которых flowables создаются за один раз
+STORY_CHUNK_SEGMENTS = 200
+
+_engine: Optional["PdfRenderer"] = None
+_engine_lock = threading.Lock()
+
+
+def _escape(text: str) -> str:
+    """Экранирование разметки reportlab, кириллица остается как есть"""
+    return text.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
+
+
+def register_font() -> str:
+    """Поиск и регистрация шрифта с кириллицей, возвращает имя шрифта"""
+    for font_path in FONT_CANDIDATES:
+        if not os.path.exists(font_path):
+            continue
+        try:
+            font_name = Path(font_path).stem.replace(' ', '')
+            # Обрабатываем .ttc файлы (коллекции шрифтов)
+            if font_path.endswith('.ttc'):
+                pdfmetrics.registerFont(TTFont(font_name, font_path, subfontIndex=0))
+            else:
+                pdfmetrics.registerFont(TTFont(font_name, font_path))
+            print(f"✅ Зарегистрирован шрифт: {font_name} из {font_path}")
+            return font_name
+        except Exception as font_error:
+            print(f"⚠️ Не удалось зарегистрировать шрифт {font_path}: {font_error}")
+
+    # Если не удалось найти системный шрифт, используем стандартный
+    print("⚠️ Системные шрифты не найдены, используем стандартный Helvetica")
+    return 'Helvetica'
+
+
+class _ChunkedStory(list):
+    """
+    Список flowables, который дополняется из генератора по мере сборки
+
+    reportlab забирает flowables с начала списка и проверяет len() перед
+    каждым следующим, поэтому в памяти находится только небольшой запас.
+    """
+
+    def __init__(self, head: List, chunks: Iterator[List], low_water: int):
+        super().__init__(head)
+        self.chunks = chunks
+        self.low_water = low_water
+
+    def __len__(self):
+        # Запас не меньше low_water, чтобы не разрывать группы keepWithNext
+        while super().__len__() < self.low_water:
+            chunk = next(self.chunks, None)
+            if chunk is None:
+                break
+            self.extend(chunk)
+        return super().__len__()
+
+
+class PdfRenderer:
+    """Генератор PDF с зарегистрированным шрифтом и готовыми стилями"""
+
+    def __init__(self):
+        self.font_name = register_font()
+        styles = getSampleStyleSheet()
+
+        # Стили с поддержкой UTF-8
+        self.title_style = ParagraphStyle(
+            'CustomTitle', parent=styles['Heading1'], fontName=self.font_name,
+            fontSize=16, spaceAfter=30, alignment=TA_LEFT, encoding='utf-8'
+        )
+        self.info_style = ParagraphStyle(
+            'InfoStyle', parent=styles['Normal'], fontName=self.font_name,
+            fontSize=10, spaceAfter=20, encoding='utf-8'
+        )
+        self.time_style = ParagraphStyle(
+            'TimeStyle', parent=styles['Normal'], fontName=self.font_name,
+            fontSize=9, spaceAfter=5, encoding='utf-8'
+        )
+        self.speaker_style = ParagraphStyle(
+            'SpeakerStyle', parent=styles['Normal'], fontName=self.font_name,
+            fontSize=11, spaceAfter=5, encoding='utf-8'
+        )
+        self.text_style = ParagraphStyle(
+            'TextStyle', parent=styles['Normal'], fontName=self.font_name,
+            fontSize=11, spaceAfter=15, encoding='utf-8'
+        )
+        self.paragraph_style = ParagraphStyle(
+            'SpeakerParagraphStyle', parent=styles['Normal'], fontName=self.font_name,
+            fontSize=11, leading=15, spaceAfter=10, encoding='utf-8',
+            bulletFontName=self.font_name, bulletFontSize=11, bulletIndent=0
+        )
+        # Стили первой реплики спикера: отступ первой строки под подпись
+        self.label_styles: Dict[str, ParagraphStyle] = {}
+
+    def _header(self, task_id: str, filename: str) -> List:
+        info_text = f"""
+        <b>Файл:</b> {_escape(filename)}<br/>
+        <b>Дата создания:</b> {datetime.now().strftime('%d.%m.%Y %H:%M:%S')}<br/>
+        <b>ID задачи:</b> {task_id}
+        """
+        return [
+            Paragraph(f"Транскрипция: {_escape(filename)}", self.title_style),
+            Paragraph(info_text, self.info_style),
+            Spacer(1, 20)
+        ]
+
+    def _segment_chunks(self, segments: List[Dict], chunk_segments: int) -> Iterator[List]:
+        for offset in range(0, len(segments), chunk_segments):
+            chunk = []
+            for segment in segments[offset:offset + chunk_segments]:
+                # Временная метка
+                time_text = f"[{format_time_srt(segment['start'])} - {format_time_srt(segment['end'])}]"
+                chunk.append(Paragraph(time_text, self.time_style))
+
+                # Спикер (если есть)
+                if segment.get('speaker') is not None:
+                    chunk.append(Paragraph(f"<b>Спикер {segment['speaker']}:</b>", self.speaker_style))
+
+                chunk.append(Paragraph(_escape(segment['text']), self.text_style))
+            yield chunk
+
+    def _label_style(self, label: str) -> "ParagraphStyle":
+        """Стиль абзаца с подписью спикера в начале первой строки"""
+        style = self.label_styles.get(label)
+        if style is None:
+            width = pdfmetrics.stringWidth(label + ' ', self.font_name, self.paragraph_style.bulletFontSize)
+            style = ParagraphStyle(
+                f'SpeakerLabelStyle{len(self.label_styles)}', parent=self.paragraph_style, firstLineIndent=width
+            )
+            self.label_styles[label] = style
+        return style
+
+    def _speaker_chunks(self, segments: List[Dict], chunk_segments: int) -> Iterator[List]:
+        chunk = []
+        chunk_size = 0
+        for paragraph in iter_speaker_paragraphs(segments, PROCESSING_CONFIG['paragraph_max_chars']):
+            # Абзац с одним стилем: reportlab переносит строки такого абзаца
+            # намного быстрее, чем абзаца со сменой шрифта внутри
+            text = ' '.join(
+                f"[{format_time_clock(segment['start'])}] {_escape(segment['text'].strip())}"
+                for segment in paragraph['segments']
+            )
+            if paragraph['speaker'] is not None and not paragraph['continued']:
+                # Подпись спикера - маркер того же абзаца, а не отдельный flowable
+                label = f"Спикер {paragraph['speaker']}:"
+                chunk.append(Paragraph(text, self._label_style(label), bulletText=_escape(label)))
+            else:
+                chunk.append(Paragraph(text, self.paragraph_style))
+
+            chunk_size += len(paragraph['segments'])
+            if chunk_size >= chunk_segments:
+                yield chunk
+                chunk = []
+                chunk_size = 0
+        if chunk:
+            yield chunk
+
+    def render(self, segments: List[Dict], task_id: str, filename: str,
+               chunk_segments: int = STORY_CHUNK_SEGMENTS, layout: Optional[str] = None) -> bytes:
+        """
+        Генерация PDF в памяти
+
+        Args:
+            layout: 'speakers' или 'segments' (по умолчанию из настроек)
+        """
+        layout = layout or PROCESSING_CONFIG['document_layout']
+        chunks = self._speaker_chunks if layout == 'speakers' else self._segment_chunks
+
+        buffer = BytesIO()
+        doc = SimpleDocTemplate(buffer, pagesize=A4)
+        story = _ChunkedStory(
+            self._header(task_id, filename),
+            chunks(segments, chunk_segments),
+            low_water=chunk_segments
+        )
+        doc.build(story)
+        return buffer.getvalue()
+
+
+def get_pdf_renderer() -> PdfRenderer:
+    """Движок PDF текущего процесса (создается при первой генерации)"""
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = PdfRenderer()
+        return _engine
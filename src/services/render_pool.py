@@ -0,0 +1,216 @@
+"""
+Пул процессов для генерации DOCX и PDF
+
+python-docx и reportlab написаны на чистом Python и нагружают CPU: в потоке
+обработки или в обработчике API они держат GIL и тормозят event loop и
+соседние потоки. Документы генерируются в отдельных процессах, в которые
+передаются только поля сегментов, нужные для документа. Число одновременных
+генераций каждого формата ограничено. Генерация, не уложившаяся в таймаут,
+возвращает ошибку, а новые задачи уходят в новый пул. Генерации, уже
+выполняющиеся в старом пуле, получают еще один таймаут на завершение, после
+чего оставшиеся процессы старого пула (в том числе зависший) завершаются
+принудительно.
+"""
+import time
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, CancelledError, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional, Dict, List, Any
+
+from ..config.settings import RENDER_POOL_CONFIG
+
+# Форматы, которые генерируются в пуле процессов
+DOCUMENT_FORMATS = ('docx', 'pdf')
+
+# Поля сегмента, используемые при генерации документов
+SEGMENT_FIELDS = ('start', 'end', 'text', 'speaker')
+
+_executor: Optional[ProcessPoolExecutor] = None
+_executor_lock = threading.Lock()
+_semaphores = {
+    format_type: threading.BoundedSemaphore(max(1, RENDER_POOL_CONFIG['concurrency'][format_type]))
+    for format_type in DOCUMENT_FORMATS
+}
+# Старых пулов, ожидающих принудительного завершения: при превышении самый
+# старый завершается сразу, не дожидаясь своих генераций
+MAX_RETIRED_POOLS = 4
+
+# Процессы старых пулов (по списку на пул)
+_retired: List[List[multiprocessing.Process]] = []
+_stats = {"rendered": 0, "failed": 0, "timeouts": 0, "restarts": 0, "terminated_processes": 0}
+_stats_lock = threading.Lock()
+
+
+def _render_in_worker(format_type: str, segments: List[Dict], task_id: str, filename: str,
+                      layout: Optional[str] = None) -> Optional[bytes]:
+    """Генерация документа в процессе пула"""
+    from .subtitle_generator import SubtitleGenerator
+
+    if format_type == 'docx':
+        return SubtitleGenerator.render_docx(segments, task_id, filename, layout)
+    return SubtitleGenerator.render_pdf(segments, task_id, filename, layout)
+
+
+def _compact_segments(segments: List[Dict]) -> List[Dict]:
+    """Сегменты без пословных меток и прочих полей, которые не нужны документу"""
+    return [
+        {field: segment[field] for field in SEGMENT_FIELDS if field in segment}
+        for segment in segments
+    ]
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            # spawn: процесс сервиса держит модели и потоки CUDA, fork их копировать не должен
+            _executor = ProcessPoolExecutor(
+                max_workers=RENDER_POOL_CONFIG['workers'],
+                mp_context=multiprocessing.get_context('spawn')
+            )
+        return _executor
+
+
+def _restart_executor(executor: ProcessPoolExecutor):
+    """
+    Замена пула с зависшей или упавшей генерацией, следующий вызов создаст новый
+
+    Старый пул не принимает задач, ожидающие в его очереди задачи отменяются
+    и повторяются вызывающими в новом пуле. Через таймаут генерации процессы
+    старого пула завершаются: к этому времени истекли сроки всех генераций,
+    запущенных в нем, остался только зависший процесс.
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is not executor:
+            return
+        _executor = None
+        # ProcessPoolExecutor не прерывает запущенные задачи, а после shutdown
+        # забывает свои процессы: запоминаем их заранее (доступны только через _processes)
+        processes = list((executor._processes or {}).values())
+        _retired.append(processes)
+        overflow = _retired[:-MAX_RETIRED_POOLS]
+    executor.shutdown(wait=False, cancel_futures=True)
+    with _stats_lock:
+        _stats["restarts"] += 1
+    print("🔄 Пул генерации документов перезапущен")
+
+    for old_processes in overflow:
+        _terminate_pool(old_processes)
+    reaper = threading.Timer(RENDER_POOL_CONFIG['timeout'], _terminate_pool, args=(processes,))
+    reaper.daemon = True
+    reaper.start()
+
+
+def _terminate_pool(processes: List[multiprocessing.Process]):
+    """Принудительное завершение оставшихся процессов старого пула"""
+    with _executor_lock:
+        if not any(item is processes for item in _retired):
+            return
+        _retired[:] = [item for item in _retired if item is not processes]
+
+    terminated = 0
+    for process in processes:
+        if not process.is_alive():
+            continue
+        process.terminate()
+        process.join(1)
+        if process.is_alive():
+            process.kill()
+        terminated += 1
+    if terminated:
+        with _stats_lock:
+            _stats["terminated_processes"] += terminated
+        print(f"🛑 Завершено зависших процессов генерации документов: {terminated}")
+
+
+def _count(key: str):
+    with _stats_lock:
+        _stats[key] += 1
+
+
+def render_document(format_type: str, segments: List[Dict], task_id: str, filename: str,
+                    layout: Optional[str] = None) -> Optional[bytes]:
+    """
+    Генерация DOCX/PDF в пуле процессов (блокирует вызывающий поток)
+
+    Args:
+        layout: Макет документа (None - из настроек)
+
+    Returns:
+        Содержимое документа или None, если генерация не удалась или не
+        уложилась в таймаут
+    """
+    if RENDER_POOL_CONFIG['workers'] <= 0:
+        return _render_in_worker(format_type, segments, task_id, filename, layout)
+
+    # Таймаут общий для ожидания слота и самой генерации
+    timeout = RENDER_POOL_CONFIG['timeout']
+    deadline = time.monotonic() + timeout
+    semaphore = _semaphores[format_type]
+    if not semaphore.acquire(timeout=timeout):
+        print(f"⏱️ {format_type.upper()} для {task_id}: нет свободного слота генерации за {timeout:.0f} с")
+        _count("timeouts")
+        return None
+
+    try:
+        compact = _compact_segments(segments)
+        while time.monotonic() < deadline:
+            executor = _get_executor()
+            try:
+                future = executor.submit(_render_in_worker, format_type, compact, task_id, filename, layout)
+            except RuntimeError:
+                # Пул остановлен другим вызовом после _get_executor - берем новый
+                continue
+            try:
+                content = future.result(timeout=max(0.0, deadline - time.monotonic()))
+                break
+            except CancelledError:
+                # Пул заменили из-за чужой генерации до начала этой - повторяем в новом
+                continue
+            except FutureTimeoutError:
+                print(f"⏱️ {format_type.upper()} для {task_id} не создан за {timeout:.0f} с")
+                _count("timeouts")
+                _restart_executor(executor)
+                return None
+            except BrokenProcessPool as e:
+                print(f"❌ Процесс генерации {format_type.upper()} для {task_id} завершился аварийно: {e}")
+                _count("failed")
+                _restart_executor(executor)
+                return None
+        else:
+            print(f"⏱️ {format_type.upper()} для {task_id} не создан за {timeout:.0f} с")
+            _count("timeouts")
+            return None
+    finally:
+        semaphore.release()
+
+    _count("rendered" if content is not None else "failed")
+    return content
+
+
+def get_render_pool_stats() -> Dict[str, Any]:
+    """Статистика пула генерации документов"""
+    with _stats_lock:
+        stats = dict(_stats)
+    with _executor_lock:
+        retired = len(_retired)
+    return {
+        "workers": RENDER_POOL_CONFIG['workers'],
+        "running": _executor is not None,
+        "retired_pools": retired,
+        **stats
+    }
+
+
+def shutdown_render_pool():
+    """Остановка пула при остановке сервера"""
+    global _executor
+    with _executor_lock:
+        executor, _executor = _executor, None
+        retired = list(_retired)
+    if executor is not None:
+        executor.shutdown(wait=False, cancel_futures=True)
+    for old_processes in retired:
+        _terminate_pool(old_processes)
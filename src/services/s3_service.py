@@ -1,149 +1,406 @@
 """
 Сервис для работы с S3 (Yandex Cloud)
 """
+import threading
+import time
+import random
 import boto3
-from botocore.exceptions import ClientError
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
+from concurrent.futures import Future, wait
 from pathlib import Path
-from typing import Optional, Dict
-from datetime import datetime
+from typing import Optional, Dict, Tuple, Callable, Any
 
 from ..config.settings import S3_CONFIG
+from .storage import StorageService, content_disposition
+from .upload_outbox import UploadOutbox
+from ..utils.circuit_breaker import CircuitBreaker
 
+MB = 1024 * 1024
 
-class S3Service:
+# Общий клиент с пулом соединений, circuit breaker и очередь отложенных загрузок на процесс
+_shared_client = None
+_shared_breaker = None
+_shared_outbox = None
+_shared_lock = threading.Lock()
+
+# Кэш подписанных ссылок: {(ключ объекта, имя для скачивания): (ссылка, истекает в)}
+_presigned_cache: Dict[Tuple[str, Optional[str]], Tuple[str, float]] = {}
+_presigned_lock = threading.Lock()
+PRESIGNED_CACHE_MAX_SIZE = 10000
+
+
+class MultipartUploadStream:
+    """
+    Потоковая multipart загрузка на S3 по мере поступления данных
+    
+    Данные копятся в буфере до размера части, после чего часть отправляется
+    в общий пул загрузок. Количество одновременно загружаемых частей
+    ограничено, поэтому write() блокируется, если S3 не успевает.
+    """
+    
+    def __init__(self, service: "S3Service", object_name: str, upload_id: str):
+        self.service = service
+        self.object_name = object_name
+        self.upload_id = upload_id
+        self.part_size = S3_CONFIG['stream_part_size_mb'] * MB
+        self.buffer = bytearray()
+        self.part_futures = []
+        self.inflight = threading.BoundedSemaphore(S3_CONFIG['stream_max_inflight_parts'])
+    
+    def write(self, data: bytes):
+        """Добавление данных в поток"""
+        self.buffer += data
+        while len(self.buffer) >= self.part_size:
+            self._submit_part(bytes(self.buffer[:self.part_size]))
+            del self.buffer[:self.part_size]
+    
+    def _submit_part(self, data: bytes):
+        """Отправка части в пул загрузок"""
+        self.inflight.acquire()
+        part_number = len(self.part_futures) + 1
+        future = self.service.executor.submit(self._upload_part, part_number, data)
+        future.add_done_callback(lambda _: self.inflight.release())
+        self.part_futures.append(future)
+    
+    def _upload_part(self, part_number: int, data: bytes) -> Dict:
+        """Загрузка одной части"""
+        response = self.service.client.upload_part(
+            Bucket=S3_CONFIG['bucket_name'],
+            Key=self.object_name,
+            PartNumber=part_number,
+            UploadId=self.upload_id,
+            Body=data
+        )
+        return {'PartNumber': part_number, 'ETag': response['ETag']}
+    
+    def finish(self) -> Future:
+        """
+        Завершение потока: отправка остатка и сборка объекта в фоне
+        
+        Returns:
+            Future с публичной ссылкой на объект или None при ошибке
+        """
+        # Последняя часть может быть меньше минимального размера
+        if self.buffer or not self.part_futures:
+            self._submit_part(bytes(self.buffer))
+            self.buffer = bytearray()
+        
+        result = Future()
+        threading.Thread(target=self._complete, args=(result,), daemon=True).start()
+        return result
+    
+    def _complete(self, result: Future):
+        """Ожидание всех частей и сборка multipart объекта"""
+        try:
+            wait(self.part_futures)
+            parts = [future.result() for future in self.part_futures]
+            self.service.client.complete_multipart_upload(
+                Bucket=S3_CONFIG['bucket_name'],
+                Key=self.object_name,
+                UploadId=self.upload_id,
+                MultipartUpload={'Parts': parts}
+            )
+            public_url = self.service.public_url(self.object_name)
+            print(f"✅ Оригинал загружен на S3 потоково: {public_url}")
+            result.set_result(public_url)
+        except Exception as e:
+            print(f"❌ Ошибка потоковой загрузки на S3: {e}")
+            self.abort()
+            result.set_result(None)
+    
+    def abort(self):
+        """Отмена multipart загрузки"""
+        try:
+            self.service.client.abort_multipart_upload(
+                Bucket=S3_CONFIG['bucket_name'],
+                Key=self.object_name,
+                UploadId=self.upload_id
+            )
+        except Exception as e:
+            print(f"⚠️ Не удалось отменить multipart загрузку {self.object_name}: {e}")
+
+
+class S3Service(StorageService):
     """Сервис для работы с S3"""
     
     def __init__(self):
+        super().__init__()
         self.client = self._create_client()
+        self.breaker, self.outbox = self._create_resilience()
+        self.transfer_config = TransferConfig(
+            multipart_threshold=S3_CONFIG['multipart_threshold_mb'] * MB,
+            multipart_chunksize=S3_CONFIG['multipart_chunksize_mb'] * MB,
+            max_concurrency=S3_CONFIG['transfer_max_concurrency'],
+            use_threads=True
+        )
     
     def _create_client(self):
-        """Создание клиента S3"""
-        return boto3.client(
-            's3',
-            aws_access_key_id=S3_CONFIG['aws_access_key_id'],
-            aws_secret_access_key=S3_CONFIG['aws_secret_access_key'],
-            endpoint_url=S3_CONFIG['endpoint_url'],
-            region_name=S3_CONFIG['region_name']
-        )
+        """Создание (или переиспользование) клиента S3"""
+        global _shared_client
+        with _shared_lock:
+            if _shared_client is None:
+                _shared_client = boto3.client(
+                    's3',
+                    aws_access_key_id=S3_CONFIG['aws_access_key_id'],
+                    aws_secret_access_key=S3_CONFIG['aws_secret_access_key'],
+                    endpoint_url=S3_CONFIG['endpoint_url'],
+                    region_name=S3_CONFIG['region_name'],
+                    config=Config(max_pool_connections=S3_CONFIG['max_pool_connections'])
+                )
+            return _shared_client
+    
+    def _create_resilience(self) -> Tuple[CircuitBreaker, UploadOutbox]:
+        """Создание (или переиспользование) circuit breaker и очереди отложенных загрузок"""
+        global _shared_breaker, _shared_outbox
+        with _shared_lock:
+            if _shared_breaker is None:
+                _shared_breaker = CircuitBreaker(
+                    "S3",
+                    failure_threshold=S3_CONFIG['breaker_failure_threshold'],
+                    reset_timeout=S3_CONFIG['breaker_reset_timeout']
+                )
+                _shared_outbox = UploadOutbox(S3_CONFIG['outbox_dir'], S3_CONFIG['outbox_retry_interval'])
+                # Очередь разбирается сразу, как только S3 снова доступен
+                _shared_breaker.on_close = _shared_outbox.notify
+                _shared_outbox.start(self._upload_from_outbox, _shared_breaker.allow_request)
+            return _shared_breaker, _shared_outbox
     
-    def upload_file(self, file_path: Path, object_name: str) -> Optional[str]:
+    def _send(self, upload_call: Callable[[], Any], object_name: str) -> bool:
         """
-        Загрузка файла на S3 и получение публичной ссылки
+        Выполнение загрузки с повторами и экспоненциальной задержкой
         
-        Args:
-            file_path: Путь к локальному файлу
-            object_name: Имя объекта в S3
+        Для circuit breaker загрузка со всеми повторами - один запрос: ошибка
+        учитывается один раз, когда попытки исчерпаны.
         
         Returns:
-            Публичная ссылка на файл или None в случае ошибки
+            True при успехе; False, если попытки исчерпаны или breaker открыт
         """
+        if not self.breaker.allow_request():
+            print(f"⚠️ S3 недоступен (circuit breaker открыт), загрузка {object_name} отложена")
+            return False
+        
+        attempts = S3_CONFIG['retry_attempts']
+        for attempt in range(1, attempts + 1):
+            try:
+                upload_call()
+                self.breaker.record_success()
+                return True
+            except Exception as e:
+                print(f"❌ Ошибка загрузки {object_name} на S3 (попытка {attempt}/{attempts}): {e}")
+                if attempt < attempts:
+                    # Экспоненциальная задержка с полным джиттером
+                    delay = min(S3_CONFIG['retry_max_delay'], S3_CONFIG['retry_base_delay'] * 2 ** (attempt - 1))
+                    time.sleep(random.uniform(0, delay))
+        self.breaker.record_failure()
+        return False
+    
+    def _defer(self, object_name: str, **payload) -> Optional[str]:
+        """Постановка объекта в очередь отложенных загрузок"""
+        if self.outbox.put(object_name, **payload):
+            # Ссылка станет рабочей, когда очередь загрузит объект
+            return self.public_url(object_name)
+        return None
+    
+    def _upload_from_outbox(self, object_name: str, payload_path: Path, upload_args: Dict[str, Any]) -> bool:
+        """Загрузка объекта из очереди (одна попытка, повторы - на следующих проходах)"""
         try:
-            # Загружаем файл
-            print(f"📤 Загружаем {file_path.name} на S3 как {object_name}...")
-            self.client.upload_file(str(file_path), S3_CONFIG['bucket_name'], object_name)
-            
-            # Устанавливаем публичный доступ
-            self.client.put_object_acl(
-                ACL='public-read',
-                Bucket=S3_CONFIG['bucket_name'],
-                Key=object_name
+            self.client.upload_file(
+                str(payload_path),
+                S3_CONFIG['bucket_name'],
+                object_name,
+                ExtraArgs=self.object_args(**upload_args),
+                Config=self.transfer_config
             )
-            
-            # Генерируем публичную ссылку
-            public_url = f"{S3_CONFIG['endpoint_url']}/{S3_CONFIG['bucket_name']}/{object_name}"
-            print(f"✅ Файл загружен на S3: {public_url}")
-            
-            return public_url
-            
-        except ClientError as e:
-            print(f"❌ Ошибка загрузки на S3: {e}")
-            return None
+            self.breaker.record_success()
+            return True
         except Exception as e:
-            print(f"❌ Неожиданная ошибка при загрузке на S3: {e}")
-            return None
+            self.breaker.record_failure()
+            print(f"❌ Отложенная загрузка {object_name} не удалась: {e}")
+            return False
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Состояние загрузок на S3"""
+        return {"circuit_breaker": self.breaker.get_stats(), "outbox": self.outbox.get_stats()}
+    
+    def public_url(self, object_name: str) -> str:
+        """Публичная ссылка на объект"""
+        return f"{S3_CONFIG['endpoint_url']}/{S3_CONFIG['bucket_name']}/{object_name}"
+    
+    def object_args(self, content_type: Optional[str] = None, content_encoding: Optional[str] = None) -> Dict[str, str]:
+        """
+        Параметры создаваемых объектов
+        
+        Объекты приватные (доступ по подписанным ссылкам), если не включен
+        S3_PUBLIC_OBJECTS. Имена объектов уникальны (содержат время загрузки),
+        поэтому содержимое по ссылке не меняется и его можно кэшировать.
+        """
+        args = {'CacheControl': S3_CONFIG['cache_control']}
+        if S3_CONFIG['public_objects']:
+            args['ACL'] = 'public-read'
+        if content_type:
+            args['ContentType'] = content_type
+        if content_encoding and content_encoding != 'identity':
+            args['ContentEncoding'] = content_encoding
+        return args
+    
+    def object_key(self, url_or_key: str) -> str:
+        """Ключ объекта по сохраненной ссылке (или сам ключ)"""
+        prefix = f"{S3_CONFIG['endpoint_url']}/{S3_CONFIG['bucket_name']}/"
+        if url_or_key.startswith(prefix):
+            return url_or_key[len(prefix):]
+        return url_or_key
     
-    def upload_transcript_files(self, task_id: str, filename: str, subtitle_files: Dict[str, str]) -> Dict[str, str]:
+    def presigned_url(self, url_or_key: str, download_name: Optional[str] = None) -> str:
         """
-        Загрузка файлов транскрипции на S3
+        Временная подписанная ссылка на скачивание объекта
+        
+        Подпись вычисляется локально, без запроса к S3. Ссылка кэшируется и
+        переиспользуется, пока до ее истечения больше S3_PRESIGN_REFRESH_MARGIN секунд.
         
         Args:
-            task_id: ID задачи
-            filename: Оригинальное имя файла
-            subtitle_files: Словарь с путями к файлам субтитров
+            url_or_key: Сохраненная ссылка на объект или его ключ
+            download_name: Имя файла для Content-Disposition при скачивании
+        """
+        if S3_CONFIG['public_objects'] and not download_name:
+            return self.public_url(self.object_key(url_or_key))
+        
+        object_name = self.object_key(url_or_key)
+        cache_key = (object_name, download_name)
+        now = time.time()
+        
+        with _presigned_lock:
+            cached = _presigned_cache.get(cache_key)
+            if cached and cached[1] - now > S3_CONFIG['presign_refresh_margin']:
+                return cached[0]
+        
+        params = {'Bucket': S3_CONFIG['bucket_name'], 'Key': object_name}
+        if download_name:
+            params['ResponseContentDisposition'] = content_disposition(download_name)
+        
+        expires_in = S3_CONFIG['presign_expires']
+        url = self.client.generate_presigned_url('get_object', Params=params, ExpiresIn=expires_in)
+        
+        with _presigned_lock:
+            if len(_presigned_cache) >= PRESIGNED_CACHE_MAX_SIZE:
+                for key in [key for key, (_, expires_at) in _presigned_cache.items() if expires_at <= now]:
+                    del _presigned_cache[key]
+                if len(_presigned_cache) >= PRESIGNED_CACHE_MAX_SIZE:
+                    _presigned_cache.clear()
+            _presigned_cache[cache_key] = (url, now + expires_in)
+        
+        return url
+    
+    def upload_file(self, file_path: Path, object_name: str, content_type: Optional[str] = None) -> Optional[str]:
+        """
+        Загрузка файла на S3 и получение публичной ссылки
+        
+        Args:
+            file_path: Путь к локальному файлу
+            object_name: Имя объекта в S3
+            content_type: MIME тип объекта
         
         Returns:
-            Словарь с публичными ссылками на файлы
+            Публичная ссылка на файл или None в случае ошибки
+            (если S3 недоступен, файл ставится в очередь отложенных загрузок)
         """
-        s3_links = {}
-        base_name = Path(filename).stem
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        
-        for format_type, file_path in subtitle_files.items():
-            if not file_path or not Path(file_path).exists():
-                continue
-            
-            s3_object_name = f"transcripts/{task_id}/{base_name}_{timestamp}.{format_type}"
-            s3_url = self.upload_file(Path(file_path), s3_object_name)
-            
-            if s3_url:
-                s3_links[format_type] = s3_url
-        
-        return s3_links
-    
-    def upload_original_file(self, task_id: str, filename: str, file_path: Path) -> Optional[str]:
+        print(f"📤 Загружаем {file_path.name} на S3 как {object_name}...")
+        uploaded = self._send(
+            lambda: self.client.upload_file(
+                str(file_path),
+                S3_CONFIG['bucket_name'],
+                object_name,
+                ExtraArgs=self.object_args(content_type),
+                Config=self.transfer_config
+            ),
+            object_name
+        )
+        if not uploaded:
+            return self._defer(object_name, file_path=file_path, content_type=content_type)
+        
+        # Сохраняем постоянную ссылку, для скачивания она подписывается
+        public_url = self.public_url(object_name)
+        print(f"✅ Файл загружен на S3: {public_url}")
+        return public_url
+    
+    def upload_bytes(
+        self, 
+        data: bytes, 
+        object_name: str, 
+        content_type: str = 'application/octet-stream',
+        content_encoding: Optional[str] = None
+    ) -> Optional[str]:
         """
-        Загрузка оригинального файла на S3
+        Загрузка данных из памяти на S3 без временного файла
         
         Args:
-            task_id: ID задачи
-            filename: Оригинальное имя файла
-            file_path: Путь к файлу
+            data: Содержимое объекта
+            object_name: Имя объекта в S3
+            content_type: MIME тип объекта
+            content_encoding: Кодировка сжатия содержимого (gzip, zstd)
         
         Returns:
-            Публичная ссылка на файл или None
+            Публичная ссылка на файл или None в случае ошибки
+            (если S3 недоступен, данные ставятся в очередь отложенных загрузок)
         """
-        base_name = Path(filename).stem
-        file_extension = file_path.suffix
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        s3_object_name = f"originals/{task_id}/{base_name}_{timestamp}{file_extension}"
+        return self.upload_versioned_bytes(data, object_name, content_type, content_encoding)[0]
+    
+    def upload_versioned_bytes(
+        self, 
+        data: bytes, 
+        object_name: str, 
+        content_type: str = 'application/octet-stream',
+        content_encoding: Optional[str] = None
+    ) -> Tuple[Optional[str], Optional[str]]:
+        """Загрузка данных из памяти на S3, возвращает ссылку и ETag объекта из ответа put_object"""
+        print(f"📤 Загружаем {len(data)} байт на S3 как {object_name}...")
+        response = {}
+        uploaded = self._send(
+            lambda: response.update(self.client.put_object(
+                Body=data,
+                Bucket=S3_CONFIG['bucket_name'],
+                Key=object_name,
+                **self.object_args(content_type, content_encoding)
+            )),
+            object_name
+        )
+        if not uploaded:
+            # Версия отложенного объекта станет известна только при чтении
+            return self._defer(
+                object_name, data=data, content_type=content_type, content_encoding=content_encoding
+            ), None
         
-        return self.upload_file(file_path, s3_object_name)
+        public_url = self.public_url(object_name)
+        print(f"✅ Данные загружены на S3: {public_url}")
+        return public_url, response.get('ETag', '').strip('"') or None
     
-    def upload_json_data(self, task_id: str, filename: str, data: dict) -> Optional[str]:
+    def open_original_stream(self, task_id: str, filename: str) -> Optional[MultipartUploadStream]:
         """
-        Загрузка JSON данных на S3
+        Начало потоковой загрузки оригинального файла
         
         Args:
             task_id: ID задачи
             filename: Оригинальное имя файла
-            data: Данные для загрузки
         
         Returns:
-            Публичная ссылка на файл или None
+            Поток для записи или None, если multipart загрузку начать не удалось
         """
-        import json
-        from ..config.settings import TEMP_DIR
+        if not self.breaker.allow_request():
+            # Оригинал будет загружен (или отложен) после транскрипции
+            return None
         
-        # Создаем временный JSON файл
-        temp_json_file = TEMP_DIR / f"{task_id}_full.json"
+        s3_object_name = self.original_object_name(task_id, filename)
         
         try:
-            with open(temp_json_file, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
-            
-            # Загружаем на S3
-            base_name = Path(filename).stem
-            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            s3_object_name = f"transcripts/{task_id}/{base_name}_{timestamp}_full.json"
-            
-            s3_url = self.upload_file(temp_json_file, s3_object_name)
-            
-            return s3_url
-            
+            response = self.client.create_multipart_upload(
+                Bucket=S3_CONFIG['bucket_name'],
+                Key=s3_object_name,
+                **self.object_args()
+            )
+            self.breaker.record_success()
+            print(f"📤 Начата потоковая загрузка оригинала на S3: {s3_object_name}")
+            return MultipartUploadStream(self, s3_object_name, response['UploadId'])
         except Exception as e:
-            print(f"❌ Ошибка загрузки JSON на S3: {e}")
+            self.breaker.record_failure()
+            print(f"⚠️ Не удалось начать потоковую загрузку на S3: {e}")
             return None
-        finally:
-            # Удаляем временный файл
-            if temp_json_file.exists():
-                temp_json_file.unlink() 
\ No newline at end of file
@@ -0,0 +1,401 @@
+"""
+Хранилища артефактов: общий интерфейс, локальный диск и выбор по конфигурации
+
+Артефакты (оригиналы, файлы транскрипции, полный JSON) сохраняются через
+StorageService. В базе хранится постоянная ссылка на объект, клиенту
+отдается временная подписанная ссылка (presigned_url).
+
+Реализации:
+- S3Service (s3_service.py) - объектное хранилище S3;
+- LocalStorageService - локальный диск без сетевых обращений, для
+  одиночных и изолированных установок.
+"""
+import os
+import hmac
+import math
+import time
+import hashlib
+import tempfile
+import threading
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Optional, Dict, Tuple, Callable, Any
+from urllib.parse import quote, urlencode
+
+from ..config.settings import STORAGE_CONFIG, S3_CONFIG
+from .subtitle_generator import MEDIA_TYPES
+from ..utils import fast_json
+
+# Общий пул потоков загрузки на процесс
+_shared_executor = None
+_shared_lock = threading.Lock()
+
+
+def content_disposition(download_name: str) -> str:
+    """Content-Disposition для скачивания (с поддержкой не-ASCII имен)"""
+    quoted = quote(download_name)
+    if quoted != download_name:
+        return f"attachment; filename*=utf-8''{quoted}"
+    return f'attachment; filename="{download_name}"'
+
+
+class StorageService(ABC):
+    """Общая часть хранилищ: именование объектов и параллельная загрузка"""
+
+    # Хранилище на локальном диске сервера
+    is_local = False
+
+    def __init__(self):
+        self.executor = self._create_executor()
+
+    @staticmethod
+    def _create_executor() -> ThreadPoolExecutor:
+        """Создание (или переиспользование) ограниченного пула загрузок"""
+        global _shared_executor
+        with _shared_lock:
+            if _shared_executor is None:
+                _shared_executor = ThreadPoolExecutor(
+                    max_workers=S3_CONFIG['upload_concurrency'],
+                    thread_name_prefix="storage-upload"
+                )
+            return _shared_executor
+
+    @abstractmethod
+    def public_url(self, object_name: str) -> str:
+        """Постоянная ссылка на объект (сохраняется в базе)"""
+
+    @abstractmethod
+    def object_key(self, url_or_key: str) -> str:
+        """Ключ объекта по сохраненной ссылке (или сам ключ)"""
+
+    @abstractmethod
+    def presigned_url(self, url_or_key: str, download_name: Optional[str] = None) -> str:
+        """Временная подписанная ссылка на скачивание объекта"""
+
+    @abstractmethod
+    def upload_file(self, file_path: Path, object_name: str, content_type: Optional[str] = None) -> Optional[str]:
+        """Сохранение файла, возвращает постоянную ссылку или None"""
+
+    @abstractmethod
+    def upload_bytes(
+        self,
+        data: bytes,
+        object_name: str,
+        content_type: str = 'application/octet-stream',
+        content_encoding: Optional[str] = None
+    ) -> Optional[str]:
+        """Сохранение данных из памяти, возвращает постоянную ссылку или None"""
+
+    def upload_versioned_bytes(
+        self,
+        data: bytes,
+        object_name: str,
+        content_type: str = 'application/octet-stream',
+        content_encoding: Optional[str] = None
+    ) -> Tuple[Optional[str], Optional[str]]:
+        """
+        Сохранение данных из памяти с версией объекта
+
+        Returns:
+            (постоянная ссылка или None, версия объекта (ETag) или None, если неизвестна)
+        """
+        return self.upload_bytes(data, object_name, content_type, content_encoding), None
+
+    def open_original_stream(self, task_id: str, filename: str):
+        """Потоковая загрузка оригинала во время приема (None - не поддерживается)"""
+        return None
+
+    def local_path(self, url_or_key: str) -> Optional[Path]:
+        """Путь к объекту на локальном диске (None - объект удаленный)"""
+        return None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Метрики хранилища"""
+        return {}
+
+    def sign_links(self, links: Dict[str, Any]) -> Dict[str, Any]:
+        """Замена сохраненных ссылок на объекты подписанными ссылками"""
+        return {
+            key: self.presigned_url(value) if isinstance(value, str) and value else value
+            for key, value in links.items()
+        }
+
+    @staticmethod
+    def original_object_name(task_id: str, filename: str) -> str:
+        """Имя объекта для оригинального файла"""
+        base_name = Path(filename).stem
+        file_extension = Path(filename).suffix
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        return f"originals/{task_id}/{base_name}_{timestamp}{file_extension}"
+
+    def _upload_parallel(self, uploads: Dict[str, Tuple[Callable, tuple]]) -> Dict[str, str]:
+        """
+        Параллельное выполнение загрузок через общий пул
+
+        Args:
+            uploads: Словарь {ключ: (функция загрузки, аргументы)}
+
+        Returns:
+            Словарь {ключ: постоянная ссылка} для успешных загрузок
+        """
+        futures = {
+            key: self.executor.submit(upload_func, *args)
+            for key, (upload_func, args) in uploads.items()
+        }
+        links = {}
+        for key, future in futures.items():
+            url = future.result()
+            if url:
+                links[key] = url
+        return links
+
+    def upload_transcript_files(self, task_id: str, filename: str, artifacts: Dict[str, bytes]) -> Dict[str, str]:
+        """
+        Загрузка файлов транскрипции прямо из памяти
+
+        Args:
+            task_id: ID задачи
+            filename: Оригинальное имя файла
+            artifacts: Словарь {формат: содержимое файла}
+
+        Returns:
+            Словарь с постоянными ссылками на файлы
+        """
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+
+        uploads = {}
+        for format_type, content in artifacts.items():
+            if not content:
+                continue
+
+            object_name = self.transcript_object_name(task_id, filename, format_type, timestamp)
+            content_type = MEDIA_TYPES.get(format_type, 'application/octet-stream')
+            uploads[format_type] = (self.upload_bytes, (content, object_name, content_type))
+
+        return self._upload_parallel(uploads)
+
+    def upload_transcript_file(self, task_id: str, filename: str, format_type: str,
+                               content: Optional[bytes] = None, file_path: Optional[Path] = None) -> Optional[str]:
+        """
+        Загрузка одного файла транскрипции в текущем потоке
+
+        В отличие от upload_transcript_files не использует общий пул, поэтому
+        безопасна для вызова из задачи, уже выполняющейся в этом пуле.
+        Содержимое передается из памяти (content) или файлом (file_path).
+        """
+        object_name = self.transcript_object_name(task_id, filename, format_type)
+        content_type = MEDIA_TYPES.get(format_type, 'application/octet-stream')
+        if file_path is not None:
+            return self.upload_file(file_path, object_name, content_type)
+        return self.upload_bytes(content, object_name, content_type)
+
+    @staticmethod
+    def transcript_object_name(task_id: str, filename: str, format_type: str, timestamp: Optional[str] = None) -> str:
+        """Имя объекта для файла транскрипции"""
+        timestamp = timestamp or datetime.now().strftime('%Y%m%d_%H%M%S')
+        return f"transcripts/{task_id}/{Path(filename).stem}_{timestamp}.{format_type}"
+
+    def upload_original_file(self, task_id: str, filename: str, file_path: Path) -> Optional[str]:
+        """
+        Загрузка оригинального файла
+
+        Args:
+            task_id: ID задачи
+            filename: Оригинальное имя файла
+            file_path: Путь к файлу
+
+        Returns:
+            Постоянная ссылка на файл или None
+        """
+        return self.upload_file(file_path, self.original_object_name(task_id, filename))
+
+    def upload_json_data(self, task_id: str, filename: str, data: dict) -> Tuple[Optional[str], Optional[str]]:
+        """
+        Загрузка полного JSON результата
+
+        Args:
+            task_id: ID задачи
+            filename: Оригинальное имя файла
+            data: Данные для загрузки
+
+        Returns:
+            (постоянная ссылка или None, версия объекта или None)
+        """
+        try:
+            # Компактный JSON, сжатый для хранения и передачи
+            content, encoding = fast_json.encode(fast_json.dumps(data), S3_CONFIG['json_encoding'])
+
+            base_name = Path(filename).stem
+            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+            object_name = f"transcripts/{task_id}/{base_name}_{timestamp}_full.json"
+
+            return self.upload_versioned_bytes(content, object_name, MEDIA_TYPES['json'], encoding)
+
+        except Exception as e:
+            print(f"❌ Ошибка загрузки JSON: {e}")
+            return None, None
+
+
+class LocalStorageService(StorageService):
+    """
+    Хранилище на локальном диске с адресацией по содержимому
+
+    Объект сохраняется как objects/<2 символа>/<sha256><расширение>: одинаковое
+    содержимое хранится один раз, а записанный файл никогда не меняется.
+    Запись атомарная (временный файл + os.replace). Ссылки на скачивание -
+    пути API с истекающей HMAC подписью.
+    """
+
+    is_local = True
+    URL_SCHEME = "local://"
+
+    def __init__(self, root: Optional[Path] = None):
+        super().__init__()
+        self.root = Path(root or STORAGE_CONFIG['local_dir']) / "objects"
+        self.root.mkdir(parents=True, exist_ok=True)
+        if not STORAGE_CONFIG['link_secret']:
+            # Без ключа подпись ссылок на скачивание может подделать любой
+            raise RuntimeError("Для локального хранилища нужен STORAGE_LINK_SECRET или JWT_SECRET_KEY")
+        self.secret = STORAGE_CONFIG['link_secret'].encode('utf-8')
+
+    def public_url(self, object_name: str) -> str:
+        return f"{self.URL_SCHEME}{object_name}"
+
+    def object_key(self, url_or_key: str) -> str:
+        if url_or_key.startswith(self.URL_SCHEME):
+            return url_or_key[len(self.URL_SCHEME):]
+        return url_or_key
+
+    def local_path(self, url_or_key: str) -> Optional[Path]:
+        key = self.object_key(url_or_key)
+        digest, _, _ = Path(key).name.partition('.')
+        if len(digest) != 64 or not all(c in '0123456789abcdef' for c in digest) or key != self._key(digest, Path(key).suffix):
+            return None
+        return self.root / key
+
+    @staticmethod
+    def _key(digest: str, suffix: str) -> str:
+        return f"{digest[:2]}/{digest}{suffix}"
+
+    def _signature(self, key: str, expires: int, download_name: Optional[str]) -> str:
+        message = f"{key}\n{expires}\n{download_name or ''}".encode('utf-8')
+        return hmac.new(self.secret, message, hashlib.sha256).hexdigest()
+
+    def presigned_url(self, url_or_key: str, download_name: Optional[str] = None) -> str:
+        """
+        Подписанная ссылка на скачивание через API
+
+        Время истечения округляется вверх до S3_PRESIGN_REFRESH_MARGIN, поэтому
+        ссылка на объект стабильна в пределах окна и кэшируется браузером.
+        """
+        key = self.object_key(url_or_key)
+        margin = max(1, S3_CONFIG['presign_refresh_margin'])
+        expires = int(math.ceil((time.time() + S3_CONFIG['presign_expires']) / margin) * margin)
+
+        params = {"expires": expires}
+        if download_name:
+            params["download"] = download_name
+        params["signature"] = self._signature(key, expires, download_name)
+        return f"{STORAGE_CONFIG['url_prefix']}/{key}?{urlencode(params)}"
+
+    def verify_link(self, key: str, expires: int, signature: str, download_name: Optional[str] = None) -> bool:
+        """Проверка подписи и срока действия ссылки"""
+        if expires < time.time():
+            return False
+        return hmac.compare_digest(self._signature(key, expires, download_name), signature)
+
+    def _store(self, write: Callable[[Any], None], suffix: str) -> str:
+        """
+        Атомарное сохранение объекта
+
+        Args:
+            write: Функция записи содержимого в файл, возвращает sha256
+            suffix: Расширение объекта
+
+        Returns:
+            Ключ объекта
+        """
+        temp_fd, temp_name = tempfile.mkstemp(dir=self.root, suffix=".tmp")
+        try:
+            with os.fdopen(temp_fd, 'wb') as temp_file:
+                digest = write(temp_file)
+                temp_file.flush()
+                os.fsync(temp_file.fileno())
+
+            key = self._key(digest, suffix)
+            target = self.root / key
+            if target.exists():
+                # Такое содержимое уже сохранено
+                os.unlink(temp_name)
+            else:
+                target.parent.mkdir(parents=True, exist_ok=True)
+                os.chmod(temp_name, 0o644)
+                os.replace(temp_name, target)
+            return key
+        except BaseException:
+            if os.path.exists(temp_name):
+                os.unlink(temp_name)
+            raise
+
+    def upload_file(self, file_path: Path, object_name: str, content_type: Optional[str] = None) -> Optional[str]:
+        def write(temp_file) -> str:
+            sha256 = hashlib.sha256()
+            with open(file_path, 'rb') as source:
+                while True:
+                    chunk = source.read(1024 * 1024)
+                    if not chunk:
+                        break
+                    sha256.update(chunk)
+                    temp_file.write(chunk)
+            return sha256.hexdigest()
+
+        try:
+            key = self._store(write, Path(object_name).suffix)
+            print(f"✅ Файл сохранен в локальное хранилище: {file_path.name} -> {key}")
+            return self.public_url(key)
+        except Exception as e:
+            print(f"❌ Ошибка сохранения в локальное хранилище: {e}")
+            return None
+
+    def upload_bytes(
+        self,
+        data: bytes,
+        object_name: str,
+        content_type: str = 'application/octet-stream',
+        content_encoding: Optional[str] = None
+    ) -> Optional[str]:
+        def write(temp_file) -> str:
+            temp_file.write(data)
+            return hashlib.sha256(data).hexdigest()
+
+        try:
+            key = self._store(write, Path(object_name).suffix)
+            print(f"✅ Данные сохранены в локальное хранилище: {object_name} -> {key}")
+            return self.public_url(key)
+        except Exception as e:
+            print(f"❌ Ошибка сохранения в локальное хранилище: {e}")
+            return None
+
+    def upload_versioned_bytes(
+        self,
+        data: bytes,
+        object_name: str,
+        content_type: str = 'application/octet-stream',
+        content_encoding: Optional[str] = None
+    ) -> Tuple[Optional[str], Optional[str]]:
+        url = self.upload_bytes(data, object_name, content_type, content_encoding)
+        # Объект адресован по содержимому: хэш в имени и есть его версия
+        version = Path(self.object_key(url)).name.partition('.')[0] if url else None
+        return url, version
+
+
+def create_storage_service() -> StorageService:
+    """Хранилище, выбранное в STORAGE_BACKEND"""
+    if STORAGE_CONFIG['backend'] == 'local':
+        print(f"💾 Артефакты сохраняются в локальное хранилище: {STORAGE_CONFIG['local_dir']}")
+        return LocalStorageService()
+
+    from .s3_service import S3Service
+    return S3Service()
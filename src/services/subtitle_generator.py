@@ -1,12 +1,17 @@
 """
 Сервис для генерации файлов субтитров в различных форматах
 """
-from typing import List, Dict, Optional
-from pathlib import Path
+import time
+import threading
+from io import BytesIO
+from typing import List, Dict, Optional, Any, Iterator
 from datetime import datetime
 
-from ..config.settings import TRANSCRIPTS_DIR, TEMP_DIR
-from ..utils.time_formatters import format_time_srt, format_time_vtt, format_time_tsv
+from ..config.settings import PROCESSING_CONFIG
+from ..utils.time_formatters import format_time_srt, format_time_vtt, format_time_tsv, format_time_clock
+from ..utils.speaker_paragraphs import iter_speaker_paragraphs
+from .render_pool import render_document
+from .pdf_renderer import PDF_AVAILABLE, get_pdf_renderer
 
 # Проверяем доступность библиотек
 try:
@@ -16,89 +21,147 @@ try:
 except ImportError:
     DOCX_AVAILABLE = False
 
-try:
-    from reportlab.lib.pagesizes import A4
-    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
-    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-    from reportlab.lib.enums import TA_LEFT
-    from reportlab.pdfbase import pdfmetrics
-    from reportlab.pdfbase.ttfonts import TTFont
-    PDF_AVAILABLE = True
-except ImportError:
-    PDF_AVAILABLE = False
+
+# MIME типы форматов экспорта
+MEDIA_TYPES = {
+    'srt': 'text/plain; charset=utf-8',
+    'vtt': 'text/vtt; charset=utf-8',
+    'tsv': 'text/tab-separated-values; charset=utf-8',
+    'json': 'application/json',
+    'pdf': 'application/pdf',
+    'docx': 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'
+}
+
+
+# Размер блока при потоковой отдаче текстовых форматов (символов)
+STREAM_CHUNK_SIZE = 64 * 1024
+
+# Форматы экспорта, кроме канонического JSON
+EXPORT_FORMATS = ('srt', 'vtt', 'tsv', 'docx', 'pdf')
+
+# Макеты DOCX/PDF
+DOCUMENT_LAYOUTS = ('segments', 'speakers')
+
+# Время генерации по форматам: {формат: {"count", "total_ms", "max_ms", "last_ms"}}
+_render_stats: Dict[str, Dict[str, float]] = {}
+_render_stats_lock = threading.Lock()
+
+
+def _record_render_time(format_type: str, elapsed_ms: float):
+    with _render_stats_lock:
+        stats = _render_stats.setdefault(format_type, {"count": 0, "total_ms": 0.0, "max_ms": 0.0, "last_ms": 0.0})
+        stats["count"] += 1
+        stats["total_ms"] += elapsed_ms
+        stats["max_ms"] = max(stats["max_ms"], elapsed_ms)
+        stats["last_ms"] = elapsed_ms
+
+
+def get_render_stats() -> Dict[str, Dict[str, Any]]:
+    """Статистика времени генерации по форматам"""
+    with _render_stats_lock:
+        return {
+            format_type: {
+                "count": int(stats["count"]),
+                "avg_ms": round(stats["total_ms"] / stats["count"], 1),
+                "max_ms": round(stats["max_ms"], 1),
+                "last_ms": round(stats["last_ms"], 1)
+            }
+            for format_type, stats in _render_stats.items()
+        }
 
 
 class SubtitleGenerator:
     """Генератор файлов субтитров"""
     
     @staticmethod
-    def generate_srt(segments: List[Dict], task_id: str, filename: str, temp: bool = False) -> Optional[str]:
-        """Генерация SRT файла"""
-        content = []
+    def _chunked(lines: Iterator[str], chunk_size: int) -> Iterator[bytes]:
+        """Склейка строк в байтовые блоки примерно по chunk_size символов"""
+        buffer = []
+        buffered = 0
+        for line in lines:
+            buffer.append(line)
+            buffered += len(line)
+            if buffered >= chunk_size:
+                yield ''.join(buffer).encode('utf-8')
+                buffer = []
+                buffered = 0
+        if buffer:
+            yield ''.join(buffer).encode('utf-8')
+    
+    @staticmethod
+    def _srt_lines(segments: List[Dict]) -> Iterator[str]:
+        separator = ""
         for i, segment in enumerate(segments, 1):
             start_time = format_time_srt(segment['start'])
             end_time = format_time_srt(segment['end'])
             text = segment['text'].strip()
             
-            content.append(f"{i}")
-            content.append(f"{start_time} --> {end_time}")
-            content.append(text)
-            content.append("")  # Пустая строка между субтитрами
-        
-        file_dir = TEMP_DIR if temp else TRANSCRIPTS_DIR
-        file_suffix = "_temp" if temp else f"_{Path(filename).stem}"
-        file_path = file_dir / f"{task_id}{file_suffix}.srt"
-        
-        with open(file_path, 'w', encoding='utf-8') as f:
-            f.write('\n'.join(content))
-        
-        return str(file_path)
+            # Пустая строка между субтитрами
+            yield f"{separator}{i}\n{start_time} --> {end_time}\n{text}\n"
+            separator = "\n"
     
     @staticmethod
-    def generate_vtt(segments: List[Dict], task_id: str, filename: str, temp: bool = False) -> Optional[str]:
-        """Генерация VTT файла"""
-        content = ["WEBVTT", ""]
+    def _vtt_lines(segments: List[Dict]) -> Iterator[str]:
+        yield "WEBVTT\n"
         for segment in segments:
             start_time = format_time_vtt(segment['start'])
             end_time = format_time_vtt(segment['end'])
             text = segment['text'].strip()
             
-            content.append(f"{start_time} --> {end_time}")
-            content.append(text)
-            content.append("")
-        
-        file_dir = TEMP_DIR if temp else TRANSCRIPTS_DIR
-        file_suffix = "_temp" if temp else f"_{Path(filename).stem}"
-        file_path = file_dir / f"{task_id}{file_suffix}.vtt"
-        
-        with open(file_path, 'w', encoding='utf-8') as f:
-            f.write('\n'.join(content))
-        
-        return str(file_path)
+            yield f"\n{start_time} --> {end_time}\n{text}\n"
     
     @staticmethod
-    def generate_tsv(segments: List[Dict], task_id: str, filename: str, temp: bool = False) -> Optional[str]:
-        """Генерация TSV файла"""
-        content = ["start\tend\ttext"]
+    def _tsv_lines(segments: List[Dict]) -> Iterator[str]:
+        yield "start\tend\ttext"
         for segment in segments:
             start_time = format_time_tsv(segment['start'])
             end_time = format_time_tsv(segment['end'])
             text = segment['text'].strip().replace('\t', ' ')  # Убираем табы из текста
             
-            content.append(f"{start_time}\t{end_time}\t{text}")
-        
-        file_dir = TEMP_DIR if temp else TRANSCRIPTS_DIR
-        file_suffix = "_temp" if temp else f"_{Path(filename).stem}"
-        file_path = file_dir / f"{task_id}{file_suffix}.tsv"
-        
-        with open(file_path, 'w', encoding='utf-8') as f:
-            f.write('\n'.join(content))
+            yield f"\n{start_time}\t{end_time}\t{text}"
+    
+    @classmethod
+    def iter_srt(cls, segments: List[Dict], chunk_size: int = STREAM_CHUNK_SIZE) -> Iterator[bytes]:
+        """Потоковая генерация SRT блоками байтов"""
+        return cls._chunked(cls._srt_lines(segments), chunk_size)
+    
+    @classmethod
+    def iter_vtt(cls, segments: List[Dict], chunk_size: int = STREAM_CHUNK_SIZE) -> Iterator[bytes]:
+        """Потоковая генерация VTT блоками байтов"""
+        return cls._chunked(cls._vtt_lines(segments), chunk_size)
+    
+    @classmethod
+    def iter_tsv(cls, segments: List[Dict], chunk_size: int = STREAM_CHUNK_SIZE) -> Iterator[bytes]:
+        """Потоковая генерация TSV блоками байтов"""
+        return cls._chunked(cls._tsv_lines(segments), chunk_size)
+    
+    @classmethod
+    def iter_format(cls, format_type: str, segments: List[Dict]) -> Iterator[bytes]:
+        """Потоковая генерация текстового формата с замером времени"""
+        serializers = {'srt': cls.iter_srt, 'vtt': cls.iter_vtt, 'tsv': cls.iter_tsv}
         
-        return str(file_path)
+        started_at = time.perf_counter()
+        yield from serializers[format_type](segments)
+        _record_render_time(format_type, (time.perf_counter() - started_at) * 1000)
+    
+    @classmethod
+    def render_srt(cls, segments: List[Dict]) -> bytes:
+        """Генерация SRT в памяти"""
+        return b''.join(cls.iter_srt(segments))
+    
+    @classmethod
+    def render_vtt(cls, segments: List[Dict]) -> bytes:
+        """Генерация VTT в памяти"""
+        return b''.join(cls.iter_vtt(segments))
+    
+    @classmethod
+    def render_tsv(cls, segments: List[Dict]) -> bytes:
+        """Генерация TSV в памяти"""
+        return b''.join(cls.iter_tsv(segments))
     
     @staticmethod
-    def generate_docx(segments: List[Dict], task_id: str, filename: str, temp: bool = False) -> Optional[str]:
-        """Генерация DOCX файла"""
+    def render_docx(segments: List[Dict], task_id: str, filename: str, layout: Optional[str] = None) -> Optional[bytes]:
+        """Генерация DOCX в памяти (layout: 'speakers' или 'segments', по умолчанию из настроек)"""
         if not DOCX_AVAILABLE:
             print("❌ python-docx не доступен для создания DOCX файлов")
             return None
@@ -120,187 +183,53 @@ class SubtitleGenerator:
             
             doc.add_paragraph()  # Пустая строка
             
-            # Добавляем сегменты
-            for segment in segments:
-                # Временная метка
-                time_para = doc.add_paragraph()
-                time_run = time_para.add_run(f"[{format_time_srt(segment['start'])} - {format_time_srt(segment['end'])}]")
-                time_run.font.size = Inches(0.1)
-                time_run.font.color.rgb = RGBColor(128, 128, 128)
-                
-                # Спикер (если есть)
-                if 'speaker' in segment and segment['speaker'] is not None:
-                    speaker_para = doc.add_paragraph()
-                    speaker_run = speaker_para.add_run(f"Спикер {segment['speaker']}:")
-                    speaker_run.bold = True
-                
-                # Текст
-                text_para = doc.add_paragraph(segment['text'])
-                text_para.add_run('\n')
+            layout = layout or PROCESSING_CONFIG['document_layout']
+            if layout == 'speakers':
+                # Абзац на реплику спикера, метки времени сегментов внутри абзаца
+                for paragraph in iter_speaker_paragraphs(segments, PROCESSING_CONFIG['paragraph_max_chars']):
+                    para = doc.add_paragraph()
+                    if paragraph['speaker'] is not None and not paragraph['continued']:
+                        para.add_run(f"Спикер {paragraph['speaker']}: ").bold = True
+                    para.add_run(' '.join(
+                        f"[{format_time_clock(segment['start'])}] {segment['text'].strip()}"
+                        for segment in paragraph['segments']
+                    ))
+            else:
+                # Метка времени, спикер и текст для каждого сегмента
+                for segment in segments:
+                    time_para = doc.add_paragraph()
+                    time_run = time_para.add_run(f"[{format_time_srt(segment['start'])} - {format_time_srt(segment['end'])}]")
+                    time_run.font.size = Inches(0.1)
+                    time_run.font.color.rgb = RGBColor(128, 128, 128)
+                    
+                    # Спикер (если есть)
+                    if 'speaker' in segment and segment['speaker'] is not None:
+                        speaker_para = doc.add_paragraph()
+                        speaker_run = speaker_para.add_run(f"Спикер {segment['speaker']}:")
+                        speaker_run.bold = True
+                    
+                    # Текст
+                    text_para = doc.add_paragraph(segment['text'])
+                    text_para.add_run('\n')
             
-            # Сохраняем файл
-            file_dir = TEMP_DIR if temp else TRANSCRIPTS_DIR
-            file_suffix = "_temp" if temp else f"_{Path(filename).stem}"
-            file_path = file_dir / f"{task_id}{file_suffix}.docx"
-            
-            doc.save(str(file_path))
-            return str(file_path)
+            # Сохраняем документ в буфер
+            buffer = BytesIO()
+            doc.save(buffer)
+            return buffer.getvalue()
             
         except Exception as e:
             print(f"❌ Ошибка создания DOCX: {e}")
             return None
     
     @staticmethod
-    def generate_pdf(segments: List[Dict], task_id: str, filename: str, temp: bool = False) -> Optional[str]:
-        """Генерация PDF файла с поддержкой UTF-8 кириллицы"""
+    def render_pdf(segments: List[Dict], task_id: str, filename: str, layout: Optional[str] = None) -> Optional[bytes]:
+        """Генерация PDF в памяти с поддержкой UTF-8 кириллицы"""
         if not PDF_AVAILABLE:
             print("❌ reportlab не доступен для создания PDF файлов")
             return None
         
         try:
-            import os
-            
-            file_dir = TEMP_DIR if temp else TRANSCRIPTS_DIR
-            file_suffix = "_temp" if temp else f"_{Path(filename).stem}"
-            file_path = file_dir / f"{task_id}{file_suffix}.pdf"
-            
-            # Регистрируем шрифт с поддержкой кириллицы
-            font_name = None
-            try:
-                # Для macOS - используем системные шрифты с поддержкой кириллицы
-                mac_fonts = [
-                    '/Library/Fonts/Arial.ttf',
-                    '/System/Library/Fonts/Helvetica.ttc',
-                    '/System/Library/Fonts/Times.ttc',
-                    '/Library/Fonts/Microsoft/Arial.ttf',
-                    '/System/Library/Fonts/Arial Unicode MS.ttf'
-                ]
-                
-                # Для Linux
-                linux_fonts = [
-                    '/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf',
-                    '/usr/share/fonts/truetype/liberation/LiberationSans-Regular.ttf',
-                    '/usr/share/fonts/TTF/DejaVuSans.ttf'
-                ]
-                
-                # Для Windows
-                windows_fonts = [
-                    'C:/Windows/Fonts/arial.ttf',
-                    'C:/Windows/Fonts/calibri.ttf',
-                    'C:/Windows/Fonts/tahoma.ttf'
-                ]
-                
-                all_fonts = mac_fonts + linux_fonts + windows_fonts
-                
-                for font_path in all_fonts:
-                    if os.path.exists(font_path):
-                        try:
-                            font_name = Path(font_path).stem.replace(' ', '')
-                            # Обрабатываем .ttc файлы (коллекции шрифтов)
-                            if font_path.endswith('.ttc'):
-                                pdfmetrics.registerFont(TTFont(font_name, font_path, subfontIndex=0))
-                            else:
-                                pdfmetrics.registerFont(TTFont(font_name, font_path))
-                            print(f"✅ Зарегистрирован шрифт: {font_name} из {font_path}")
-                            break
-                        except Exception as font_error:
-                            print(f"⚠️ Не удалось зарегистрировать шрифт {font_path}: {font_error}")
-                            continue
-                
-                # Если не удалось найти системный шрифт, используем стандартный
-                if not font_name:
-                    print("⚠️ Системные шрифты не найдены, используем стандартный Helvetica")
-                    font_name = 'Helvetica'
-                        
-            except Exception as e:
-                print(f"⚠️ Ошибка регистрации шрифта: {e}")
-                font_name = 'Helvetica'
-            
-            doc = SimpleDocTemplate(str(file_path), pagesize=A4)
-            styles = getSampleStyleSheet()
-            
-            # Создаем стили с поддержкой UTF-8
-            title_style = ParagraphStyle(
-                'CustomTitle',
-                parent=styles['Heading1'],
-                fontName=font_name,
-                fontSize=16,
-                spaceAfter=30,
-                alignment=TA_LEFT,
-                encoding='utf-8'
-            )
-            
-            info_style = ParagraphStyle(
-                'InfoStyle',
-                parent=styles['Normal'],
-                fontName=font_name,
-                fontSize=10,
-                spaceAfter=20,
-                encoding='utf-8'
-            )
-            
-            time_style = ParagraphStyle(
-                'TimeStyle',
-                parent=styles['Normal'],
-                fontName=font_name,
-                fontSize=9,
-                spaceAfter=5,
-                encoding='utf-8'
-            )
-            
-            speaker_style = ParagraphStyle(
-                'SpeakerStyle',
-                parent=styles['Normal'],
-                fontName=font_name,
-                fontSize=11,
-                spaceAfter=5,
-                encoding='utf-8'
-            )
-            
-            text_style = ParagraphStyle(
-                'TextStyle',
-                parent=styles['Normal'],
-                fontName=font_name,
-                fontSize=11,
-                spaceAfter=15,
-                encoding='utf-8'
-            )
-            
-            story = []
-            
-            # Заголовок
-            title_text = f"Транскрипция: {filename}"
-            story.append(Paragraph(title_text, title_style))
-            
-            # Информация о файле
-            info_text = f"""
-            <b>Файл:</b> {filename}<br/>
-            <b>Дата создания:</b> {datetime.now().strftime('%d.%m.%Y %H:%M:%S')}<br/>
-            <b>ID задачи:</b> {task_id}
-            """
-            story.append(Paragraph(info_text, info_style))
-            story.append(Spacer(1, 20))
-            
-            # Добавляем сегменты
-            for segment in segments:
-                # Временная метка
-                time_text = f"[{format_time_srt(segment['start'])} - {format_time_srt(segment['end'])}]"
-                story.append(Paragraph(time_text, time_style))
-                
-                # Спикер (если есть)
-                if 'speaker' in segment and segment['speaker'] is not None:
-                    speaker_text = f"<b>Спикер {segment['speaker']}:</b>"
-                    story.append(Paragraph(speaker_text, speaker_style))
-                
-                # Текст - правильно обрабатываем HTML entities но сохраняем кириллицу
-                text = segment['text']
-                # Экранируем только HTML специальные символы, кириллицу оставляем как есть
-                text = text.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
-                
-                story.append(Paragraph(text, text_style))
-            
-            doc.build(story)
-            return str(file_path)
+            return get_pdf_renderer().render(segments, task_id, filename, layout=layout)
             
         except Exception as e:
             print(f"❌ Ошибка создания PDF: {e}")
@@ -309,33 +238,45 @@ class SubtitleGenerator:
             return None
     
     @classmethod
-    def generate_all_formats(cls, segments: List[Dict], task_id: str, filename: str, temp: bool = False) -> Dict[str, str]:
-        """Генерация всех форматов субтитров"""
-        subtitle_files = {}
-        
-        # Стандартные форматы
-        formats = [
-            ('srt', cls.generate_srt),
-            ('vtt', cls.generate_vtt),
-            ('tsv', cls.generate_tsv),
+    def available_formats(cls) -> List[str]:
+        """Форматы экспорта, доступные с установленными библиотеками"""
+        return [
+            format_type for format_type in EXPORT_FORMATS
+            if (format_type != 'docx' or DOCX_AVAILABLE) and (format_type != 'pdf' or PDF_AVAILABLE)
         ]
+    
+    @classmethod
+    def render_format(cls, format_type: str, segments: List[Dict], task_id: str, filename: str,
+                      layout: Optional[str] = None) -> Optional[bytes]:
+        """Генерация одного формата в памяти с замером времени (layout - макет DOCX/PDF)"""
+        renderers = {
+            'srt': lambda: cls.render_srt(segments),
+            'vtt': lambda: cls.render_vtt(segments),
+            'tsv': lambda: cls.render_tsv(segments),
+            # DOCX/PDF генерируются в пуле процессов
+            'docx': lambda: render_document('docx', segments, task_id, filename, layout),
+            'pdf': lambda: render_document('pdf', segments, task_id, filename, layout),
+        }
         
-        # Дополнительные форматы (если доступны)
-        if DOCX_AVAILABLE:
-            formats.append(('docx', cls.generate_docx))
-        
-        if PDF_AVAILABLE:
-            formats.append(('pdf', cls.generate_pdf))
+        started_at = time.perf_counter()
+        content = renderers[format_type]()
+        _record_render_time(format_type, (time.perf_counter() - started_at) * 1000)
+        return content
+    
+    @classmethod
+    def render_all_formats(cls, segments: List[Dict], task_id: str, filename: str) -> Dict[str, bytes]:
+        """Генерация всех форматов субтитров в памяти"""
+        artifacts = {}
         
-        for format_name, generator_func in formats:
+        for format_name in cls.available_formats():
             try:
-                file_path = generator_func(segments, task_id, filename, temp)
-                if file_path:
-                    subtitle_files[format_name] = file_path
-                    print(f"✅ {format_name.upper()} файл создан: {Path(file_path).name}")
+                content = cls.render_format(format_name, segments, task_id, filename)
+                if content is not None:
+                    artifacts[format_name] = content
+                    print(f"✅ {format_name.upper()} создан ({len(content)} байт)")
                 else:
-                    print(f"❌ {format_name.upper()} файл не создан")
+                    print(f"❌ {format_name.upper()} не создан")
             except Exception as e:
-                print(f"❌ Ошибка создания {format_name.upper()} файла: {e}")
+                print(f"❌ Ошибка создания {format_name.upper()}: {e}")
         
-        return subtitle_files 
\ No newline at end of file
+        return artifacts
@@ -2,9 +2,9 @@
 Сервис для суммаризации транскрипций
 """
 import json
-import requests
 from typing import Dict, Any, Optional
 from ..config.settings import SUMMARIZATION_CONFIG
+from .http_client import limited
 import logging
 
 logger = logging.getLogger(__name__)
@@ -216,16 +216,17 @@ class SummarizationService:
             'Authorization': f'Bearer {self.config["api_key"]}'
         }
         
-        response = requests.post(
-            self.config['api_url'],
-            headers=headers,
-            json=request_data,
-            timeout=120  # 2 минуты таймаут
-        )
+        async with limited('llm') as client:
+            response = await client.post(
+                self.config['api_url'],
+                headers=headers,
+                json=request_data,
+                timeout=self.config['timeout']
+            )
         
         logger.info(f"Ответ от LLM API получен, статус: {response.status_code}")
         
-        if not response.ok:
+        if not response.is_success:
             error_text = response.text
             logger.error(f"Ошибка LLM API: {response.status_code} - {error_text}")
             raise Exception(f"API error: {response.status_code} - {error_text}")
@@ -0,0 +1,72 @@
+"""
+Внутрипроцессная публикация изменений статуса задач
+
+TranscriptionProcessor.update_task_status вызывается из рабочих потоков
+обработки, а подписчики (SSE соединения) живут в event loop сервера.
+Публикация передает событие в очереди подписчиков через
+loop.call_soon_threadsafe, поэтому безопасна из любого потока.
+"""
+import asyncio
+import threading
+from typing import Dict, Any, List, Tuple
+
+# Событий в очереди подписчика: при переполнении отбрасываются самые старые,
+# последний статус задачи всегда доставляется
+SUBSCRIBER_QUEUE_SIZE = 32
+
+# Конечные статусы задачи, после которых поток событий закрывается
+FINAL_STATUSES = ("completed", "failed")
+
+
+class TaskEventBroker:
+    """Подписка на изменения статуса задач"""
+
+    def __init__(self):
+        self.subscribers: Dict[str, List[Tuple[asyncio.AbstractEventLoop, asyncio.Queue]]] = {}
+        self.lock = threading.Lock()
+        self.published = 0
+
+    def subscribe(self, task_id: str) -> asyncio.Queue:
+        """Очередь событий задачи (вызывается из event loop)"""
+        queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        with self.lock:
+            self.subscribers.setdefault(task_id, []).append((asyncio.get_running_loop(), queue))
+        return queue
+
+    def unsubscribe(self, task_id: str, queue: asyncio.Queue):
+        with self.lock:
+            subscribers = [item for item in self.subscribers.get(task_id, []) if item[1] is not queue]
+            if subscribers:
+                self.subscribers[task_id] = subscribers
+            else:
+                self.subscribers.pop(task_id, None)
+
+    @staticmethod
+    def _deliver(queue: asyncio.Queue, event: Dict[str, Any]):
+        if queue.full():
+            queue.get_nowait()
+        queue.put_nowait(event)
+
+    def publish(self, task_id: str, event: Dict[str, Any]):
+        """Отправка события подписчикам задачи (из любого потока)"""
+        with self.lock:
+            subscribers = list(self.subscribers.get(task_id, []))
+            self.published += 1
+
+        for loop, queue in subscribers:
+            try:
+                loop.call_soon_threadsafe(self._deliver, queue, event)
+            except RuntimeError:
+                # Event loop уже остановлен
+                self.unsubscribe(task_id, queue)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self.lock:
+            return {
+                "subscribed_tasks": len(self.subscribers),
+                "subscribers": sum(len(items) for items in self.subscribers.values()),
+                "published": self.published
+            }
+
+
+task_events = TaskEventBroker()
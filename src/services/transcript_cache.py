@@ -0,0 +1,228 @@
+"""
+Кэш полных JSON транскрипций, загруженных с S3
+
+Два уровня:
+- LRU разобранных результатов в памяти, ограниченный суммарным размером JSON;
+- локальный диск (исходные, возможно сжатые, байты объекта), переживает
+  перезапуск сервиса.
+
+Записи адресуются ID задачи и версией объекта (ETag), поэтому перезаписанный
+на S3 результат никогда не будет отдан из кэша.
+"""
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional, Dict, Any, Tuple
+
+from ..config.settings import TRANSCRIPT_CACHE_CONFIG
+from ..utils import fast_json
+
+MB = 1024 * 1024
+
+
+class TranscriptCache:
+    """Двухуровневый кэш полных JSON транскрипций"""
+
+    def __init__(self):
+        self.enabled = TRANSCRIPT_CACHE_CONFIG['enabled']
+        self.memory_max_bytes = TRANSCRIPT_CACHE_CONFIG['memory_max_mb'] * MB
+        self.disk_dir = Path(TRANSCRIPT_CACHE_CONFIG['disk_dir'])
+        self.disk_max_bytes = TRANSCRIPT_CACHE_CONFIG['disk_max_mb'] * MB
+
+        # {(task_id, etag): (данные, размер несжатого JSON в байтах)}
+        self.memory: "OrderedDict[Tuple[str, str], Tuple[Dict[str, Any], int]]" = OrderedDict()
+        self.memory_bytes = 0
+        # Версии объектов, узнанные при загрузке, для записей базы без full_json_etag
+        self.versions: Dict[str, str] = {}
+        self.lock = threading.Lock()
+
+        self.stats = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "bytes_served_locally": 0,
+            "bytes_fetched": 0
+        }
+
+        self.disk_bytes = 0
+        if self.enabled:
+            self.disk_dir.mkdir(parents=True, exist_ok=True)
+            self.disk_bytes = sum(path.stat().st_size for path in self.disk_dir.glob("*.json"))
+
+    @staticmethod
+    def _normalize_etag(etag: str) -> str:
+        """ETag без кавычек и символов, недопустимых в имени файла"""
+        return "".join(c for c in etag if c.isalnum() or c == "-")
+
+    def _disk_path(self, task_id: str, etag: str) -> Path:
+        return self.disk_dir / f"{task_id}_{self._normalize_etag(etag)}.json"
+
+    def get(self, task_id: str, etag: Optional[str]) -> Optional[Dict[str, Any]]:
+        """
+        Получение разобранного JSON из кэша
+
+        Возвращаемый словарь общий для всех читателей и не должен изменяться.
+
+        Args:
+            task_id: ID задачи
+            etag: Версия объекта на S3 (None - версия неизвестна, промах)
+        """
+        if not self.enabled or not etag:
+            self._count_miss()
+            return None
+
+        key = (task_id, self._normalize_etag(etag))
+        with self.lock:
+            entry = self.memory.get(key)
+            if entry:
+                self.memory.move_to_end(key)
+                self.stats["memory_hits"] += 1
+                self.stats["bytes_served_locally"] += entry[1]
+                return entry[0]
+
+        disk_path = self._disk_path(task_id, etag)
+        try:
+            content = fast_json.decode(disk_path.read_bytes())
+            data = fast_json.loads(content)
+        except FileNotFoundError:
+            self._count_miss()
+            return None
+        except (OSError, ValueError, RuntimeError) as e:
+            print(f"⚠️ Поврежденная запись кэша транскрипции {disk_path.name}: {e}")
+            disk_path.unlink(missing_ok=True)
+            self._count_miss()
+            return None
+
+        # Время изменения служит отметкой последнего использования для вытеснения
+        try:
+            os.utime(disk_path)
+        except OSError:
+            pass
+
+        with self.lock:
+            self.stats["disk_hits"] += 1
+            self.stats["bytes_served_locally"] += len(content)
+            self._remember(key, data, len(content))
+        return data
+
+    def put(self, task_id: str, etag: Optional[str], content: bytes) -> Dict[str, Any]:
+        """
+        Разбор загруженного с S3 JSON и сохранение в кэш
+
+        Args:
+            content: Байты объекта как есть (сжатые gzip/zstd или обычный JSON)
+
+        Returns:
+            Разобранные данные
+        """
+        raw_json = fast_json.decode(content)
+        data = fast_json.loads(raw_json)
+        with self.lock:
+            self.stats["bytes_fetched"] += len(content)
+
+        if not self.enabled or not etag:
+            return data
+
+        key = (task_id, self._normalize_etag(etag))
+        with self.lock:
+            self.versions[task_id] = etag
+            self._remember(key, data, len(raw_json))
+
+        self._write_disk(self._disk_path(task_id, etag), content)
+        return data
+
+    def known_version(self, task_id: str) -> Optional[str]:
+        """Версия объекта, загруженная в этом процессе (None - не загружался)"""
+        with self.lock:
+            return self.versions.get(task_id)
+
+    def invalidate(self, task_id: str):
+        """Удаление всех версий транскрипции из обоих уровней кэша"""
+        if not self.enabled:
+            return
+
+        with self.lock:
+            self.versions.pop(task_id, None)
+            for key in [key for key in self.memory if key[0] == task_id]:
+                _, size = self.memory.pop(key)
+                self.memory_bytes -= size
+
+        for path in self.disk_dir.glob(f"{task_id}_*.json"):
+            try:
+                size = path.stat().st_size
+                path.unlink()
+                with self.lock:
+                    self.disk_bytes -= size
+            except OSError:
+                pass
+
+    def _count_miss(self):
+        with self.lock:
+            self.stats["misses"] += 1
+
+    def _remember(self, key: Tuple[str, str], data: Dict[str, Any], size: int):
+        """Добавление в LRU с вытеснением по размеру (вызывается под lock)"""
+        if size > self.memory_max_bytes:
+            return
+        if key in self.memory:
+            self.memory_bytes -= self.memory.pop(key)[1]
+        self.memory[key] = (data, size)
+        self.memory_bytes += size
+        while self.memory_bytes > self.memory_max_bytes:
+            _, (_, evicted_size) = self.memory.popitem(last=False)
+            self.memory_bytes -= evicted_size
+
+    def _write_disk(self, path: Path, content: bytes):
+        """Атомарная запись на диск с вытеснением самых старых записей"""
+        if len(content) > self.disk_max_bytes:
+            return
+        try:
+            temp_path = path.with_suffix(f".{threading.get_ident()}.tmp")
+            temp_path.write_bytes(content)
+            temp_path.replace(path)
+        except OSError as e:
+            print(f"⚠️ Не удалось сохранить транскрипцию в дисковый кэш: {e}")
+            return
+
+        with self.lock:
+            self.disk_bytes += len(content)
+            if self.disk_bytes <= self.disk_max_bytes:
+                return
+
+        entries = []
+        for entry in self.disk_dir.glob("*.json"):
+            try:
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry))
+            except OSError:
+                pass
+        entries.sort(key=lambda item: item[0])
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, entry in entries:
+            if total <= self.disk_max_bytes:
+                break
+            if entry == path:
+                continue
+            try:
+                entry.unlink()
+                total -= size
+            except OSError:
+                pass
+        with self.lock:
+            self.disk_bytes = total
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Метрики кэша"""
+        with self.lock:
+            hits = self.stats["memory_hits"] + self.stats["disk_hits"]
+            requests_count = hits + self.stats["misses"]
+            return {
+                **self.stats,
+                "enabled": self.enabled,
+                "hit_rate": round(hits / requests_count, 4) if requests_count else 0.0,
+                "memory_entries": len(self.memory),
+                "memory_bytes": self.memory_bytes,
+                "disk_bytes": self.disk_bytes
+            }
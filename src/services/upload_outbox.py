@@ -0,0 +1,170 @@
+"""
+Очередь отложенных загрузок в хранилище (outbox)
+
+Если объект не удалось загрузить (хранилище недоступно или открыт circuit
+breaker), его содержимое и параметры сохраняются на диск, а фоновый поток
+периодически повторяет загрузку. Очередь переживает перезапуск сервиса.
+
+Запись очереди - пара файлов <id>.bin (содержимое) и <id>.json (параметры).
+Неудачная запись не задерживает остальные: она откладывается с
+экспоненциальной задержкой, а очередь разбирается дальше.
+"""
+import os
+import json
+import uuid
+import shutil
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Optional, Dict, Any, Callable, List
+
+# Максимальная задержка повтора одной записи, секунд
+MAX_RETRY_DELAY = 3600
+
+
+class UploadOutbox:
+    """Персистентная очередь отложенных загрузок"""
+
+    def __init__(self, directory: Path, retry_interval: float):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.retry_interval = retry_interval
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.worker: Optional[threading.Thread] = None
+        self.delivered = 0
+
+    def put(self, object_name: str, data: Optional[bytes] = None, file_path: Optional[Path] = None,
+            **upload_args) -> bool:
+        """
+        Сохранение объекта в очередь
+
+        Args:
+            object_name: Имя объекта в хранилище
+            data: Содержимое из памяти
+            file_path: Либо путь к файлу (файл копируется, исходный может быть удален)
+            upload_args: Параметры загрузки (content_type, content_encoding)
+
+        Returns:
+            True, если объект сохранен в очередь
+        """
+        entry_id = f"{datetime.now().strftime('%Y%m%d%H%M%S')}_{uuid.uuid4().hex[:8]}"
+        payload_path = self.directory / f"{entry_id}.bin"
+        temp_path = self.directory / f"{entry_id}.bin.tmp"
+        try:
+            if file_path is not None:
+                try:
+                    # Жесткая ссылка не копирует данные, если каталоги на одной ФС
+                    os.link(file_path, temp_path)
+                except OSError:
+                    shutil.copyfile(file_path, temp_path)
+            else:
+                temp_path.write_bytes(data)
+            os.replace(temp_path, payload_path)
+
+            meta = {
+                "object_name": object_name,
+                "upload_args": upload_args,
+                "attempts": 0,
+                "created_at": datetime.now().isoformat()
+            }
+            self._write_meta(entry_id, meta)
+        except OSError as e:
+            print(f"❌ Не удалось сохранить {object_name} в очередь загрузок: {e}")
+            temp_path.unlink(missing_ok=True)
+            payload_path.unlink(missing_ok=True)
+            return False
+
+        print(f"📮 {object_name} отложен в очередь загрузок (в очереди: {self.depth()})")
+        return True
+
+    def _write_meta(self, entry_id: str, meta: Dict[str, Any]):
+        """Атомарная запись параметров записи"""
+        temp_path = self.directory / f"{entry_id}.json.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False)
+        os.replace(temp_path, self.directory / f"{entry_id}.json")
+
+    def entries(self) -> List[str]:
+        """ID записей в порядке постановки в очередь"""
+        return sorted(path.stem for path in self.directory.glob("*.json"))
+
+    def depth(self) -> int:
+        """Количество объектов, ожидающих загрузки"""
+        return sum(1 for _ in self.directory.glob("*.json"))
+
+    def start(self, upload: Callable[[str, Path, Dict[str, Any]], bool], can_upload: Callable[[], bool]):
+        """
+        Запуск фонового повтора загрузок
+
+        Args:
+            upload: Загрузка (имя объекта, путь к содержимому, параметры) -> успех
+            can_upload: Проверка доступности хранилища (circuit breaker)
+        """
+        with self.lock:
+            if self.worker and self.worker.is_alive():
+                return
+            self.worker = threading.Thread(
+                target=self._run, args=(upload, can_upload), daemon=True, name="upload-outbox"
+            )
+            self.worker.start()
+
+    def notify(self):
+        """Немедленная попытка разобрать очередь"""
+        self.wakeup.set()
+
+    def _run(self, upload, can_upload):
+        while True:
+            notified = self.wakeup.wait(self.retry_interval)
+            self.wakeup.clear()
+            try:
+                # После восстановления хранилища повторяем все записи, не дожидаясь их задержек
+                self.drain(upload, can_upload, force=notified)
+            except Exception as e:
+                print(f"❌ Ошибка обработки очереди загрузок: {e}")
+
+    def retry_delay(self, attempts: int) -> float:
+        """Задержка следующей попытки записи после attempts неудачных"""
+        return min(MAX_RETRY_DELAY, self.retry_interval * 2 ** max(0, attempts - 1))
+
+    def drain(self, upload, can_upload, force: bool = False) -> int:
+        """
+        Повтор загрузок по порядку, возвращает число загруженных
+
+        Записи, задержка повтора которых не истекла, пропускаются (кроме force).
+        Разбор прекращается, только если хранилище недоступно.
+        """
+        delivered = 0
+        for entry_id in self.entries():
+            meta_path = self.directory / f"{entry_id}.json"
+            payload_path = self.directory / f"{entry_id}.bin"
+            try:
+                with open(meta_path, 'r', encoding='utf-8') as f:
+                    meta = json.load(f)
+            except (OSError, json.JSONDecodeError) as e:
+                print(f"⚠️ Поврежденная запись очереди загрузок {entry_id}: {e}")
+                continue
+
+            if not force and meta.get("next_attempt_at", 0) > time.time():
+                continue
+            if not can_upload():
+                break
+
+            if upload(meta["object_name"], payload_path, meta.get("upload_args", {})):
+                meta_path.unlink(missing_ok=True)
+                payload_path.unlink(missing_ok=True)
+                delivered += 1
+                print(f"✅ Отложенная загрузка выполнена: {meta['object_name']}")
+            else:
+                meta["attempts"] += 1
+                meta["last_attempt_at"] = datetime.now().isoformat()
+                meta["next_attempt_at"] = time.time() + self.retry_delay(meta["attempts"])
+                self._write_meta(entry_id, meta)
+
+        with self.lock:
+            self.delivered += delivered
+        return delivered
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {"depth": self.depth(), "delivered": self.delivered}
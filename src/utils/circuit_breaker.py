@@ -0,0 +1,77 @@
+"""
+Circuit breaker для обращений к внешнему сервису
+
+closed    - запросы проходят, последовательные ошибки считаются;
+open      - после failure_threshold ошибок подряд запросы не выполняются
+            reset_timeout секунд;
+half_open - по истечении таймаута пропускается один пробный запрос: успех
+            закрывает breaker, ошибка снова открывает его.
+"""
+import threading
+import time
+from typing import Dict, Any, Callable, Optional
+
+
+class CircuitBreaker:
+    """Потокобезопасный circuit breaker"""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0,
+                 on_close: Optional[Callable[[], None]] = None):
+        self.name = name
+        # Вызывается, когда сервис снова доступен (переход в closed)
+        self.on_close = on_close
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.trial_in_progress = False
+        self.times_opened = 0
+        self.lock = threading.Lock()
+
+    def allow_request(self) -> bool:
+        """Можно ли выполнить запрос сейчас"""
+        with self.lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                self.trial_in_progress = False
+            if self.state == self.HALF_OPEN and not self.trial_in_progress:
+                self.trial_in_progress = True
+                return True
+            return False
+
+    def record_success(self):
+        with self.lock:
+            recovered = self.state != self.CLOSED
+            if recovered:
+                print(f"✅ {self.name}: сервис снова доступен, circuit breaker закрыт")
+            self.state = self.CLOSED
+            self.failures = 0
+            self.trial_in_progress = False
+        if recovered and self.on_close:
+            self.on_close()
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            self.trial_in_progress = False
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    self.times_opened += 1
+                    print(f"⚠️ {self.name}: {self.failures} ошибок подряд, circuit breaker открыт на {self.reset_timeout:.0f} с")
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self.lock:
+            return {
+                "state": self.state,
+                "consecutive_failures": self.failures,
+                "times_opened": self.times_opened
+            }
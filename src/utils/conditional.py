@@ -0,0 +1,60 @@
+"""
+Условные HTTP запросы: ETag, Last-Modified, If-None-Match и If-Modified-Since
+
+Ответы с валидаторами позволяют клиенту и прокси повторять запрос условно и
+получать 304 Not Modified без тела, если содержимое не изменилось.
+"""
+import hashlib
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Optional, Dict
+
+from fastapi.responses import Response
+
+
+def make_etag(content: bytes) -> str:
+    """Строгий ETag по содержимому ответа"""
+    return f'"{hashlib.sha256(content).hexdigest()[:32]}"'
+
+
+def quote_etag(value: str) -> str:
+    """ETag из готовой версии (например, хэша объекта в хранилище)"""
+    return f'"{value.strip(chr(34))}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Совпадает ли ETag с одним из значений If-None-Match (сравнение без учета W/)"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = (value.strip() for value in if_none_match.split(","))
+    return etag.removeprefix("W/") in (value.removeprefix("W/") for value in candidates)
+
+
+def http_date(timestamp: float) -> str:
+    """Дата в формате HTTP (Last-Modified)"""
+    return formatdate(timestamp, usegmt=True)
+
+
+def is_not_modified(if_none_match: Optional[str], if_modified_since: Optional[str],
+                    etag: str, last_modified: Optional[float] = None) -> bool:
+    """
+    Можно ли ответить 304 на условный запрос
+
+    If-None-Match имеет приоритет: If-Modified-Since учитывается, только
+    если клиент не прислал ETag.
+    """
+    if if_none_match:
+        return etag_matches(if_none_match, etag)
+    if if_modified_since and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+        return int(last_modified) <= since
+    return False
+
+
+def not_modified(etag: str, headers: Optional[Dict[str, str]] = None) -> Response:
+    """Ответ 304 с теми же заголовками кэширования, что и у полного ответа"""
+    return Response(status_code=304, headers={**(headers or {}), "ETag": etag})
@@ -0,0 +1,68 @@
+"""
+Мониторинг задержки event loop
+
+Фоновая задача периодически засыпает на фиксированный интервал и измеряет,
+насколько позже интервала она проснулась. Задержка показывает, сколько
+event loop был занят синхронным кодом и не обслуживал HTTP запросы и
+WebSocket сессии.
+"""
+import asyncio
+import time
+from collections import deque
+from typing import Optional, Dict, Any
+
+
+class EventLoopLagMonitor:
+    """Замер задержки event loop"""
+
+    def __init__(self, interval: float = 0.5, window: int = 240):
+        self.interval = interval
+        self.samples = deque(maxlen=window)
+        self.max_lag = 0.0
+        self.stalls = 0  # Задержки больше 100 мс
+        self.task: Optional[asyncio.Task] = None
+
+    def start(self):
+        """Запуск замеров в текущем event loop"""
+        if self.task is None or self.task.done():
+            self.task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        """Остановка замеров"""
+        if self.task:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+
+    async def _run(self):
+        while True:
+            started_at = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, time.perf_counter() - started_at - self.interval)
+            self.samples.append(lag)
+            self.max_lag = max(self.max_lag, lag)
+            if lag > 0.1:
+                self.stalls += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Статистика задержки в миллисекундах за последнее окно"""
+        if not self.samples:
+            return {"running": self.task is not None, "samples": 0}
+
+        ordered = sorted(self.samples)
+        return {
+            "running": self.task is not None,
+            "samples": len(ordered),
+            "last_ms": round(self.samples[-1] * 1000, 2),
+            "p50_ms": round(ordered[len(ordered) // 2] * 1000, 2),
+            "p99_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))] * 1000, 2),
+            "max_ms": round(self.max_lag * 1000, 2),
+            "stalls_over_100ms": self.stalls
+        }
+
+
+# Монитор процесса, запускается при старте приложения
+event_loop_monitor = EventLoopLagMonitor()
@@ -0,0 +1,105 @@
+"""
+Быстрая компактная сериализация JSON и сжатие артефактов
+
+orjson и zstandard используются, если установлены; иначе - стандартные json
+и gzip. Сжатые данные распознаются по сигнатуре, поэтому для чтения
+достаточно самих байтов, без заголовка Content-Encoding.
+"""
+import gzip
+import json
+from typing import Any, Dict, Tuple
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+JSON_BACKEND = "orjson" if orjson else "json"
+
+GZIP_MAGIC = b"\x1f\x8b"
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
+
+def dumps(data: Any) -> bytes:
+    """Компактный JSON в UTF-8 без экранирования не-ASCII символов"""
+    if orjson:
+        return orjson.dumps(data)
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def dumps_with_raw(data: Dict[str, Any], key: str, raw: bytes) -> bytes:
+    """
+    JSON объекта с добавленным полем, значение которого уже сериализовано
+
+    Позволяет не сериализовать повторно большие неизменные части ответа
+    (например, сегменты результата).
+    """
+    head = dumps(data)
+    separator = b"," if len(head) > 2 else b""
+    return head[:-1] + separator + dumps(key) + b":" + raw + b"}"
+
+
+def loads(content: bytes) -> Any:
+    """Разбор JSON"""
+    if orjson:
+        return orjson.loads(content)
+    return json.loads(content)
+
+
+def resolve_encoding(encoding: str) -> str:
+    """Фактическая кодировка: zstd без библиотеки заменяется на gzip"""
+    if encoding == "zstd":
+        return "zstd" if zstandard else "gzip"
+    return encoding if encoding == "gzip" else "identity"
+
+
+def encode(content: bytes, encoding: str) -> Tuple[bytes, str]:
+    """
+    Сжатие содержимого
+
+    Returns:
+        Сжатые данные и фактическая кодировка
+    """
+    encoding = resolve_encoding(encoding)
+    if encoding == "zstd":
+        return zstandard.ZstdCompressor(level=10).compress(content), encoding
+    if encoding == "gzip":
+        return gzip.compress(content, compresslevel=6), encoding
+    return content, encoding
+
+
+def content_encoding(content: bytes) -> str:
+    """Кодировка данных по сигнатуре"""
+    if content.startswith(GZIP_MAGIC):
+        return "gzip"
+    if content.startswith(ZSTD_MAGIC):
+        return "zstd"
+    return "identity"
+
+
+def decode(content: bytes) -> bytes:
+    """Распаковка данных в любой из поддерживаемых кодировок"""
+    encoding = content_encoding(content)
+    if encoding == "gzip":
+        return gzip.decompress(content)
+    if encoding == "zstd":
+        if not zstandard:
+            raise RuntimeError("Для чтения zstd артефактов нужен пакет zstandard")
+        return zstandard.ZstdDecompressor().decompressobj().decompress(content)
+    return content
+
+
+def accepts_encoding(accept_encoding: str, encoding: str) -> bool:
+    """Принимает ли клиент кодировку по заголовку Accept-Encoding"""
+    if encoding == "identity":
+        return True
+    for item in accept_encoding.lower().split(","):
+        name, _, params = item.strip().partition(";")
+        if name.strip() in (encoding, "*") and params.replace(" ", "") not in ("q=0", "q=0.0"):
+            return True
+    return False
@@ -0,0 +1,101 @@
+"""
+Отдача файлов с поддержкой HTTP Range
+
+FileResponse в используемой версии Starlette всегда отдает файл целиком,
+поэтому перемотка аудио/видео в плеере и докачка требуют ответа 206 с
+выбранным диапазоном байтов.
+"""
+import os
+from pathlib import Path
+from typing import Optional, Dict, Tuple, Iterator
+
+from fastapi import HTTPException
+from fastapi.responses import FileResponse, StreamingResponse, Response
+
+CHUNK_SIZE = 256 * 1024
+
+
+def parse_range(range_header: str, file_size: int) -> Optional[Tuple[int, int]]:
+    """
+    Разбор заголовка Range с одним диапазоном
+
+    Returns:
+        (первый байт, последний байт) включительно или None, если заголовок
+        не описывает один байтовый диапазон (тогда отдается весь файл)
+
+    Raises:
+        HTTPException: 416, если диапазон за пределами файла
+    """
+    unit, _, ranges = range_header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in ranges:
+        return None
+
+    first, _, last = ranges.strip().partition("-")
+    try:
+        if first:
+            start = int(first)
+            end = int(last) if last else file_size - 1
+        else:
+            # Суффиксный диапазон: последние N байтов
+            length = int(last)
+            if length <= 0:
+                raise ValueError
+            start = max(0, file_size - length)
+            end = file_size - 1
+    except ValueError:
+        return None
+
+    if start >= file_size or start > end:
+        raise HTTPException(
+            status_code=416,
+            detail="Запрошенный диапазон вне файла",
+            headers={"Content-Range": f"bytes */{file_size}"}
+        )
+    return start, min(end, file_size - 1)
+
+
+def _iter_file_range(path: Path, start: int, end: int) -> Iterator[bytes]:
+    with open(path, "rb") as file:
+        file.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = file.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+def range_file_response(
+    path: Path,
+    range_header: Optional[str],
+    media_type: Optional[str] = None,
+    headers: Optional[Dict[str, str]] = None
+) -> Response:
+    """
+    Ответ с файлом целиком (200) или с запрошенным диапазоном (206)
+
+    Args:
+        path: Путь к файлу
+        range_header: Значение заголовка Range запроса
+        media_type: MIME тип файла
+        headers: Дополнительные заголовки ответа
+    """
+    headers = {**(headers or {}), "Accept-Ranges": "bytes"}
+    file_size = os.stat(path).st_size
+
+    byte_range = parse_range(range_header, file_size) if range_header else None
+    if byte_range is None:
+        return FileResponse(path, media_type=media_type, headers=headers)
+
+    start, end = byte_range
+    headers.update({
+        "Content-Range": f"bytes {start}-{end}/{file_size}",
+        "Content-Length": str(end - start + 1)
+    })
+    return StreamingResponse(
+        _iter_file_range(path, start, end),
+        status_code=206,
+        media_type=media_type,
+        headers=headers
+    )
@@ -0,0 +1,94 @@
+"""
+Индекс сегментов транскрипции для постраничной выдачи и выборки по времени
+
+Сегменты упорядочиваются по началу, для выборки по интервалу хранятся
+массив начал и префиксный максимум концов: первый пересекающийся сегмент и
+граница выборки находятся двоичным поиском, без просмотра всей записи.
+Сериализованные сегменты кэшируются вместе с индексом.
+"""
+import threading
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from typing import List, Dict, Optional, Tuple
+
+from . import fast_json
+
+# Индексов, хранимых одновременно (по одному на недавно открытую транскрипцию)
+INDEX_CACHE_SIZE = 32
+
+_cache: "OrderedDict[str, SegmentIndex]" = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+class SegmentIndex:
+    """Сегменты, упорядоченные по началу, с ключами для двоичного поиска"""
+
+    def __init__(self, segments: List[Dict]):
+        self.source = segments
+        self.source_bytes: Optional[bytes] = None
+        starts = [segment.get('start') or 0.0 for segment in segments]
+        if any(later < earlier for earlier, later in zip(starts, starts[1:])):
+            order = sorted(range(len(segments)), key=starts.__getitem__)
+            segments = [segments[i] for i in order]
+            starts = [starts[i] for i in order]
+
+        self.segments = segments
+        self.starts = starts
+        # Префиксный максимум концов не убывает, даже если сегменты перекрываются
+        self.max_ends = []
+        max_end = 0.0
+        for segment_start, segment in zip(starts, segments):
+            max_end = max(max_end, segment.get('end') or segment_start)
+            self.max_ends.append(max_end)
+
+    def __len__(self):
+        return len(self.segments)
+
+    def source_json(self) -> bytes:
+        """Сегменты в исходном порядке, сериализованные один раз"""
+        if self.source_bytes is None:
+            self.source_bytes = fast_json.dumps(self.source)
+        return self.source_bytes
+
+    def window(self, start: Optional[float] = None, end: Optional[float] = None) -> Tuple[int, List[Dict]]:
+        """
+        Сегменты, пересекающиеся с интервалом [start, end) в секундах
+
+        Returns:
+            (номер первого сегмента-кандидата, сегменты)
+        """
+        first = bisect_right(self.max_ends, start) if start is not None else 0
+        last = bisect_left(self.starts, end) if end is not None else len(self.starts)
+        candidates = self.segments[first:max(first, last)]
+        if start is not None:
+            # Перед first концы всех сегментов <= start; внутри отсекаем короткие
+            # сегменты, которые закончились раньше длинного перекрывающего
+            candidates = [segment for segment in candidates if (segment.get('end') or segment.get('start') or 0.0) > start]
+        return first, candidates
+
+
+def get_segment_index(task_id: str, segments: List[Dict]) -> SegmentIndex:
+    """Индекс сегментов транскрипции (строится один раз для загруженного результата)"""
+    with _cache_lock:
+        index = _cache.get(task_id)
+        if index is not None and index.source is segments:
+            _cache.move_to_end(task_id)
+            return index
+
+    index = SegmentIndex(segments)
+    with _cache_lock:
+        _cache[task_id] = index
+        _cache.move_to_end(task_id)
+        while len(_cache) > INDEX_CACHE_SIZE:
+            _cache.popitem(last=False)
+    return index
+
+
+def get_segments_json(task_id: str, segments: List[Dict]) -> bytes:
+    """Сериализованные сегменты результата (индекс и байты строятся один раз)"""
+    return get_segment_index(task_id, segments).source_json()
+
+
+def invalidate_segment_index(task_id: str):
+    with _cache_lock:
+        _cache.pop(task_id, None)
@@ -0,0 +1,38 @@
+"""
+Группировка сегментов в абзацы по спикерам для DOCX/PDF
+
+Подряд идущие сегменты одного спикера объединяются в один абзац, метки
+времени сегментов остаются внутри абзаца. Слишком длинная реплика делится на
+несколько абзацев, чтобы reportlab и Word не переносили огромный абзац
+между страницами.
+"""
+from typing import List, Dict, Any, Iterator
+
+
+def iter_speaker_paragraphs(segments: List[Dict], max_chars: int = 2000) -> Iterator[Dict[str, Any]]:
+    """
+    Абзацы из подряд идущих сегментов одного спикера
+
+    Yields:
+        {"speaker": спикер или None, "continued": продолжение предыдущего
+        абзаца того же спикера, "segments": сегменты абзаца}
+    """
+    paragraph = None
+    chars = 0
+    for segment in segments:
+        speaker = segment.get('speaker')
+        text_length = len(segment['text'])
+
+        if paragraph is not None and paragraph['speaker'] == speaker and chars + text_length <= max_chars:
+            paragraph['segments'].append(segment)
+            chars += text_length
+            continue
+
+        continued = paragraph is not None and paragraph['speaker'] == speaker
+        if paragraph is not None:
+            yield paragraph
+        paragraph = {"speaker": speaker, "continued": continued, "segments": [segment]}
+        chars = text_length
+
+    if paragraph is not None:
+        yield paragraph
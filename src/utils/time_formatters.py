@@ -1,25 +1,44 @@
 """
 Утилиты для форматирования времени в различных форматах субтитров
+
+Форматирование табличное: время переводится в целые миллисекунды, а поля
+часов, минут, секунд и миллисекунд берутся из заранее построенных таблиц
+строк вместо форматирования каждого поля через f-строку.
 """
+_TWO_DIGITS = [f"{i:02d}" for i in range(100)]
+_THREE_DIGITS = [f"{i:03d}" for i in range(1000)]
+
+# Время до часа в секундах: "MM:SS" для каждой секунды
+_MINUTES_SECONDS = [f"{m:02d}:{s:02d}" for m in range(60) for s in range(60)]
+
+
+def _split_millis(seconds: float):
+    """Часы и остаток (секунды в часе, миллисекунды), время округляется до мс"""
+    total_ms = int(seconds * 1000 + 0.5) if seconds > 0 else 0
+    total_seconds, millis = divmod(total_ms, 1000)
+    hours, second_of_hour = divmod(total_seconds, 3600)
+    hours_text = _TWO_DIGITS[hours] if hours < 100 else str(hours)
+    return hours_text, _MINUTES_SECONDS[second_of_hour], _THREE_DIGITS[millis]
 
 
 def format_time_srt(seconds: float) -> str:
     """Форматирование времени для SRT"""
-    hours = int(seconds // 3600)
-    minutes = int((seconds % 3600) // 60)
-    secs = int(seconds % 60)
-    millis = int((seconds % 1) * 1000)
-    return f"{hours:02d}:{minutes:02d}:{secs:02d},{millis:03d}"
+    hours, minutes_seconds, millis = _split_millis(seconds)
+    return f"{hours}:{minutes_seconds},{millis}"
 
 
 def format_time_vtt(seconds: float) -> str:
     """Форматирование времени для VTT"""
-    hours = int(seconds // 3600)
-    minutes = int((seconds % 3600) // 60)
-    secs = seconds % 60
-    return f"{hours:02d}:{minutes:02d}:{secs:06.3f}"
+    hours, minutes_seconds, millis = _split_millis(seconds)
+    return f"{hours}:{minutes_seconds}.{millis}"
 
 
 def format_time_tsv(seconds: float) -> str:
     """Форматирование времени для TSV (в секундах с тремя знаками после запятой)"""
-    return f"{seconds:.3f}" 
\ No newline at end of file
+    return f"{seconds:.3f}"
+
+
+def format_time_clock(seconds: float) -> str:
+    """Короткая метка времени для текста документов (ЧЧ:ММ:СС)"""
+    hours, minutes_seconds, _ = _split_millis(seconds)
+    return f"{hours}:{minutes_seconds}"
@@ -0,0 +1,150 @@
+"""
+Колоночное представление пословных данных выравнивания
+
+Вместо списка словарей {"word", "start", "end", "score", "speaker"} на каждое
+слово хранятся параллельные массивы и таблицы строк:
+
+    {
+        "start": [0.12, 0.48, ...],
+        "end": [0.40, 0.91, ...],
+        "score": [0.93, 0.88, ...],
+        "word": [0, 1, ...],        # индекс в "strings"
+        "speaker": [0, 0, ...],     # индекс в "speakers", -1 - не определен
+        "segment": [0, 0, ...],     # индекс сегмента
+        "strings": ["Привет", "мир", ...],
+        "speakers": ["SPEAKER_00", ...]
+    }
+
+Время и score слова могут быть null, если выравнивание не смогло их
+определить (например, для чисел).
+"""
+import threading
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional
+
+
+COLUMNS = ("start", "end", "score", "word", "speaker", "segment")
+
+# Индексов слов, хранимых одновременно (по одному на недавно открытую транскрипцию)
+INDEX_CACHE_SIZE = 32
+
+_cache: "OrderedDict[str, WordIndex]" = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def _round(value: Optional[float]) -> Optional[float]:
+    return round(value, 3) if value is not None else None
+
+
+def build_word_columns(segments: List[Dict[str, Any]]) -> Dict[str, list]:
+    """
+    Сборка колонок из сегментов с пословным выравниванием
+
+    Args:
+        segments: Сегменты результата whisperx.align (с ключом "words")
+
+    Returns:
+        Колоночное представление слов
+    """
+    columns = {name: [] for name in COLUMNS}
+    strings, string_index = [], {}
+    speakers, speaker_index = [], {}
+
+    for segment_number, segment in enumerate(segments):
+        for word in segment.get("words", []):
+            text = word.get("word", "")
+            if text not in string_index:
+                string_index[text] = len(strings)
+                strings.append(text)
+
+            speaker = word.get("speaker")
+            if speaker is not None and speaker not in speaker_index:
+                speaker_index[speaker] = len(speakers)
+                speakers.append(speaker)
+
+            columns["start"].append(_round(word.get("start")))
+            columns["end"].append(_round(word.get("end")))
+            columns["score"].append(_round(word.get("score")))
+            columns["word"].append(string_index[text])
+            columns["speaker"].append(speaker_index[speaker] if speaker is not None else -1)
+            columns["segment"].append(segment_number)
+
+    columns["strings"] = strings
+    columns["speakers"] = speakers
+    return columns
+
+
+def strip_segment_words(segments: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Копии сегментов без пословных данных (они хранятся в колонках)"""
+    return [
+        {key: value for key, value in segment.items() if key not in ("words", "chars")}
+        for segment in segments
+    ]
+
+
+class WordIndex:
+    """Ключи двоичного поиска по времени для колонок слов загруженного результата"""
+
+    def __init__(self, columns: Dict[str, list]):
+        self.source = columns
+        # Монотонные ключи: префиксные максимумы начал и концов. Слова без времени
+        # получают время предыдущего слова; начала могут идти назад (невыровненные
+        # слова получают начало сегмента), такие слова выбираются вместе с соседями
+        self.starts, self.ends = [], []
+        last_start = last_end = 0.0
+        for word_start, word_end in zip(columns["start"], columns["end"]):
+            last_start = max(last_start, word_start) if word_start is not None else last_start
+            last_end = max(last_end, word_end if word_end is not None else last_start)
+            self.starts.append(last_start)
+            self.ends.append(last_end)
+
+    def slice(self, start: Optional[float] = None, end: Optional[float] = None) -> Dict[str, list]:
+        """
+        Выборка слов, пересекающихся с интервалом [start, end) в секундах
+
+        Таблица строк в результате содержит только используемые строки.
+        """
+        columns = self.source
+        first = bisect_right(self.ends, start) if start is not None else 0
+        last = bisect_left(self.starts, end) if end is not None else len(self.starts)
+        last = max(first, last)
+
+        result = {name: columns[name][first:last] for name in COLUMNS}
+
+        used_strings = {}
+        for index in result["word"]:
+            if index not in used_strings:
+                used_strings[index] = len(used_strings)
+        result["word"] = [used_strings[index] for index in result["word"]]
+        result["strings"] = [columns["strings"][index] for index in used_strings]
+        result["speakers"] = columns["speakers"]
+        return result
+
+
+def get_word_index(task_id: str, columns: Dict[str, list]) -> WordIndex:
+    """Индекс слов транскрипции (строится один раз для загруженного результата)"""
+    with _cache_lock:
+        index = _cache.get(task_id)
+        if index is not None and index.source is columns:
+            _cache.move_to_end(task_id)
+            return index
+
+    index = WordIndex(columns)
+    with _cache_lock:
+        _cache[task_id] = index
+        _cache.move_to_end(task_id)
+        while len(_cache) > INDEX_CACHE_SIZE:
+            _cache.popitem(last=False)
+    return index
+
+
+def slice_word_columns(task_id: str, columns: Dict[str, list], start: Optional[float] = None,
+                       end: Optional[float] = None) -> Dict[str, list]:
+    """Выборка слов, пересекающихся с интервалом [start, end), по кэшированному индексу"""
+    return get_word_index(task_id, columns).slice(start, end)
+
+
+def invalidate_word_index(task_id: str):
+    with _cache_lock:
+        _cache.pop(task_id, None)
@@ -46,6 +46,26 @@ class ApiManager {
         return await response.json();
     }
 
+    // Легкий статус транскрипции без сегментов (повторные запросы получают 304 по ETag)
+    async getStatusSummary(taskId) {
+        const response = await fetch(`${this.baseUrl}${this.config.ENDPOINTS.STATUS}/${taskId}?fields=`, {
+            credentials: 'include'
+        });
+        
+        if (!response.ok) {
+            throw new Error(`HTTP error! status: ${response.status}`);
+        }
+        
+        return await response.json();
+    }
+
+    // Поток изменений статуса транскрипции (Server-Sent Events)
+    openStatusEvents(taskId) {
+        return new EventSource(`${this.baseUrl}${this.config.ENDPOINTS.STATUS}/${taskId}/events`, {
+            withCredentials: true
+        });
+    }
+
     // Получение списка транскрипций
     async getTranscriptions() {
         const url = `${this.baseUrl}${this.config.ENDPOINTS.TRANSCRIPTIONS}`;
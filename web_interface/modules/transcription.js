@@ -5,6 +5,7 @@ class TranscriptionManager {
         this.uiManager = uiManager;
         this.currentTaskId = null;
         this.progressInterval = null;
+        this.statusEvents = null;
         this.onTranscriptionComplete = null;
         this.onTranscriptionError = null;
     }
@@ -95,54 +96,108 @@ class TranscriptionManager {
         }
     }
 
-    // Начать отслеживание прогресса
+    // Начать отслеживание прогресса: поток событий статуса, без него - опрос
     startProgressTracking() {
-        if (this.progressInterval) {
-            clearInterval(this.progressInterval);
+        this.stopProgressTracking();
+
+        if (typeof EventSource === 'undefined') {
+            this.startProgressPolling();
+            return;
         }
-        
+
+        const taskId = this.currentTaskId;
+        let received = false;
+        const events = this.apiManager.openStatusEvents(taskId);
+        this.statusEvents = events;
+
+        events.addEventListener('status', async (event) => {
+            received = true;
+            await this.handleStatusUpdate(taskId, JSON.parse(event.data));
+        });
+
+        events.onerror = () => {
+            // Поток недоступен (старый сервер, прокси) - переходим на опрос;
+            // после обрыва установленного потока браузер переподключается сам
+            if (this.statusEvents === events && (!received || events.readyState === EventSource.CLOSED)) {
+                this.stopProgressTracking();
+                this.startProgressPolling();
+            }
+        };
+    }
+
+    // Отслеживание прогресса опросом легкого статуса (GET /status?fields=)
+    startProgressPolling() {
+        const taskId = this.currentTaskId;
         this.progressInterval = setInterval(async () => {
             try {
-                const status = await this.apiManager.getStatus(this.currentTaskId);
-                this.updateProgress(status);
-                
-                if (status.status === 'completed') {
-                    this.stopProgressTracking();
-                    await this.showResults(status);
-                } else if (status.status === 'failed' || status.status === 'error') {
-                    this.stopProgressTracking();
-                    
-                    // Обновляем статус в истории
-                    if (window.historyManager) {
-                        window.historyManager.updateTranscriptionStatus(this.currentTaskId, {
-                            status: status.status,
-                            error: status.error || 'Неизвестная ошибка'
-                        });
-                    }
-                    
-                    this.uiManager.showError(`Ошибка транскрипции: ${status.error || 'Неизвестная ошибка'}`);
-                    this.hideProgressSection();
-                }
+                await this.handleStatusUpdate(taskId, await this.apiManager.getStatusSummary(taskId));
             } catch (error) {
-                console.error('Ошибка получения статуса:', error);
-                this.stopProgressTracking();
-                
-                // Обновляем статус в истории при ошибке сети
-                if (window.historyManager && this.currentTaskId) {
-                    window.historyManager.updateTranscriptionStatus(this.currentTaskId, {
-                        status: 'error',
-                        error: `Ошибка получения статуса: ${error.message}`
-                    });
-                }
-                
-                this.uiManager.showError(`Ошибка получения статуса: ${error.message}`);
-                this.hideProgressSection();
+                this.handleStatusError(error);
             }
         }, CONFIG.UI.PROGRESS_UPDATE_INTERVAL);
     }
 
+    // Обработать статус без сегментов: после завершения результат запрашивается один раз
+    async handleStatusUpdate(taskId, status) {
+        if (status.status !== 'completed') {
+            await this.handleStatus(status);
+            return;
+        }
+
+        this.stopProgressTracking();
+        try {
+            await this.handleStatus(await this.apiManager.getStatus(taskId));
+        } catch (error) {
+            this.handleStatusError(error);
+        }
+    }
+
+    // Обработать очередной статус задачи
+    async handleStatus(status) {
+        this.updateProgress(status);
+
+        if (status.status === 'completed') {
+            this.stopProgressTracking();
+            await this.showResults(status);
+        } else if (status.status === 'failed' || status.status === 'error') {
+            this.stopProgressTracking();
+
+            // Обновляем статус в истории
+            if (window.historyManager) {
+                window.historyManager.updateTranscriptionStatus(this.currentTaskId, {
+                    status: status.status,
+                    error: status.error || 'Неизвестная ошибка'
+                });
+            }
+
+            this.uiManager.showError(`Ошибка транскрипции: ${status.error || 'Неизвестная ошибка'}`);
+            this.hideProgressSection();
+        }
+    }
+
+    // Ошибка получения статуса
+    handleStatusError(error) {
+        console.error('Ошибка получения статуса:', error);
+        this.stopProgressTracking();
+
+        // Обновляем статус в истории при ошибке сети
+        if (window.historyManager && this.currentTaskId) {
+            window.historyManager.updateTranscriptionStatus(this.currentTaskId, {
+                status: 'error',
+                error: `Ошибка получения статуса: ${error.message}`
+            });
+        }
+
+        this.uiManager.showError(`Ошибка получения статуса: ${error.message}`);
+        this.hideProgressSection();
+    }
+
     // Остановить отслеживание прогресса
     stopProgressTracking() {
+        if (this.statusEvents) {
+            this.statusEvents.close();
+            this.statusEvents = null;
+        }
         if (this.progressInterval) {
             clearInterval(this.progressInterval);
             this.progressInterval = null;